@@ -0,0 +1,69 @@
+"""Content fingerprints for deduplicating scraped records.
+
+Scrapers see the same pages and repositories on every run.  Each record
+is therefore stored once per source, keyed by a hash of its normalised
+URL (``url_hash``).  It is only rewritten when a hash over the URL and its
+payload (``content_hash``) changes.  Both writers, the unified scraper
+(``scraper_results``) and the GitHub scanner (``knowledge_base``), go
+through ``upsert_changed`` in ``supabase_utils`` or ``supabase_async``.
+That function looks up the stored hashes for a batch and upserts only the
+new and changed rows in one request.  The unique indexes are created by
+``migrations/content_dedup.sql``, and rows stored before them are keyed by
+``workers/content_backfill.py``.
+
+URLs are normalised before hashing: the scheme and host are lower‑cased,
+default ports, fragments and ``utm_*`` tracking parameters are dropped,
+and query parameters are sorted.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Stored hashes are looked up with ``in.(...)`` in the query string; 80
+# SHA‑256 hex digests keep the URL well under common 8 KiB limits.
+LOOKUP_CHUNK = 80
+
+
+def normalize_url(url: str) -> str:
+    """Return a canonical form of ``url`` so equivalent URLs hash alike."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not k.startswith("utm_"))
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_url(url: str) -> str:
+    """Return the ``url_hash`` of ``url``."""
+    return _digest(normalize_url(url))
+
+
+def fingerprint(url: str, payload: Any) -> Tuple[str, str]:
+    """Return ``(url_hash, content_hash)`` for a record.
+
+    The payload is serialised with sorted keys, so key order does not
+    change the hash.
+    """
+    normalized = normalize_url(url)
+    content = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return _digest(normalized), _digest(normalized + "\n" + content)
+
+
+def changed_rows(rows: List[Dict[str, Any]], stored: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Return the rows whose ``content_hash`` differs from ``stored[url_hash]``.
+
+    Rows repeating a ``url_hash`` within the batch are collapsed to the
+    last one, since a single upsert cannot touch the same row twice.
+    """
+    latest = {row["url_hash"]: row for row in rows}
+    return [row for key, row in latest.items() if stored.get(key) != row["content_hash"]]
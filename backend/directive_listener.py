@@ -0,0 +1,139 @@
+"""Push notifications for new directives via Postgres LISTEN/NOTIFY.
+
+Workers used to sleep for a fixed interval (up to a day) between directive
+polls.  With ``migrations/directive_notify.sql`` applied, Postgres emits a
+notification on the ``agent_directives`` channel whenever a directive
+becomes pending.  :func:`wait_for_directive` blocks until such a
+notification arrives for the given agent or the timeout elapses, so a worker
+can keep its long idle interval as a polling fallback while still starting
+new work within milliseconds.
+
+The listener needs a direct database connection, configured with:
+
+* `SUPABASE_DB_URL` – Postgres connection string (e.g. the Supabase
+  connection pooler in session mode)
+
+If the variable is unset or ``psycopg`` is not installed,
+:func:`wait_for_directive` degrades to a plain sleep.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import psycopg  # type: ignore
+except ImportError:
+    psycopg = None  # type: ignore
+
+CHANNEL = "agent_directives"
+
+
+class DirectiveListener:
+    """Background LISTEN loop that wakes waiters per agent.
+
+    A single connection serves every agent in the process.  Notifications
+    that arrive before a worker starts waiting are remembered, so a
+    directive inserted between a poll and the following wait is not missed.
+    """
+
+    def __init__(self, dsn: str, reconnect_delay: float = 5.0) -> None:
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self._events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.connected = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="directive-listener", daemon=True)
+        self._thread.start()
+
+    def _event(self, agent: str) -> threading.Event:
+        with self._lock:
+            return self._events.setdefault(agent, threading.Event())
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    self.connected.set()
+                    # Directives inserted while we were not listening would
+                    # otherwise wait for the fallback timeout; re-poll now.
+                    self._wake_all()
+                    while not self._stopped.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            self._dispatch(notify.payload)
+            except Exception as exc:
+                print(f"[directive_listener] connection lost: {exc}")
+            finally:
+                self.connected.clear()
+            self._stopped.wait(self.reconnect_delay)
+
+    def _wake_all(self) -> None:
+        with self._lock:
+            for event in self._events.values():
+                event.set()
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            agent = json.loads(payload).get("agent")
+        except ValueError:
+            return
+        if agent:
+            self._event(agent).set()
+
+    def wait(self, agent: str, timeout: float) -> bool:
+        """Block until a directive for ``agent`` is announced or ``timeout`` passes.
+
+        Returns:
+            ``True`` if woken by a notification, ``False`` on timeout.
+        """
+        event = self._event(agent)
+        woken = event.wait(timeout)
+        event.clear()
+        return woken
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+
+_listener: Optional[DirectiveListener] = None
+_listener_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    global _listener, _listener_lock
+    _listener = None
+    _listener_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_listener() -> Optional[DirectiveListener]:
+    """Return the process‑wide listener, or ``None`` when push is unavailable."""
+    global _listener
+    dsn = os.getenv("SUPABASE_DB_URL")
+    if not dsn or psycopg is None:
+        return None
+    with _listener_lock:
+        if _listener is None:
+            _listener = DirectiveListener(dsn)
+        return _listener
+
+
+def wait_for_directive(agent: str, timeout: float) -> bool:
+    """Sleep up to ``timeout`` seconds, returning early when ``agent`` gets work.
+
+    Returns:
+        ``True`` if a directive notification woke the caller.
+    """
+    listener = get_listener()
+    if listener is None:
+        time.sleep(timeout)
+        return False
+    return listener.wait(agent, timeout)
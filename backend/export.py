@@ -0,0 +1,154 @@
+"""Streaming table exports for the handshake server.
+
+Accounting needs complete extracts of the ledgers, which can run to millions
+of rows.  :func:`export_stream` walks a table by primary key one page at a
+time (see ``pagination``) and yields encoded NDJSON or CSV, optionally gzip
+compressed, so the server only ever holds a page or two in memory.  The next
+page is requested while the current one is being sent, which keeps the
+database and the client busy at the same time.
+
+Only the tables in :data:`EXPORT_TABLES` can be exported; each maps to the
+column used for ``since``/``until`` filtering and whether that column stores
+epoch seconds instead of a timestamp.
+"""
+
+import asyncio
+import csv
+import datetime
+import io
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from .pagination import check_column, select_columns
+
+EXPORT_TABLES: Dict[str, Tuple[str, bool]] = {
+    "profit_ledger": ("ts", False),
+    "revenues": ("timestamp", True),
+    "wallet_balances": ("ts", False),
+    "scraper_results": ("fetched_at", False),
+}
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+DEFAULT_EXPORT_PAGE = 1000
+MAX_EXPORT_PAGE = 10000
+
+
+def parse_filters(filters: Sequence[str]) -> List[Tuple[str, str]]:
+    """Parse ``column:value`` equality filters.
+
+    Raises:
+        ValueError: if a filter is malformed or names an invalid column.
+    """
+    parsed = []
+    for item in filters:
+        column, sep, value = item.partition(":")
+        if not sep:
+            raise ValueError(f"filter {item!r} must look like column:value")
+        parsed.append((check_column(column.strip()), value))
+    return parsed
+
+
+def _bound(value: datetime.datetime, epoch: bool) -> Any:
+    return value.timestamp() if epoch else value.isoformat()
+
+
+class _Encoder:
+    """Turn pages of rows into NDJSON or CSV text."""
+
+    def __init__(self, fmt: str) -> None:
+        self.fmt = fmt
+        self.header: Optional[List[str]] = None
+
+    def encode(self, rows: List[Dict[str, Any]]) -> str:
+        if self.fmt == "ndjson":
+            return "".join(json.dumps(row, default=str) + "\n" for row in rows)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self.header is None:
+            self.header = list(rows[0].keys())
+            writer.writerow(self.header)
+        for row in rows:
+            writer.writerow([_csv_value(row.get(column)) for column in self.header])
+        return buffer.getvalue()
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return "" if value is None else value
+
+
+def export_stream(
+    client: Any,
+    table: str,
+    fmt: str = "ndjson",
+    fields: Optional[str] = None,
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    filters: Sequence[Tuple[str, str]] = (),
+    page_size: int = DEFAULT_EXPORT_PAGE,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """Return an async iterator over ``table`` as encoded byte chunks, one per page.
+
+    Raises:
+        ValueError: for an unknown table or format, or invalid fields.  These
+            are checked before the first chunk is produced.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"table must be one of {sorted(EXPORT_TABLES)}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {sorted(EXPORT_FORMATS)}")
+    columns = select_columns(fields, "*")
+    time_column, epoch = EXPORT_TABLES[table]
+    return _generate(client, table, columns, time_column, epoch, fmt, since, until, filters, page_size, compress)
+
+
+async def _generate(
+    client: Any,
+    table: str,
+    columns: str,
+    time_column: str,
+    epoch: bool,
+    fmt: str,
+    since: Optional[datetime.datetime],
+    until: Optional[datetime.datetime],
+    filters: Sequence[Tuple[str, str]],
+    page_size: int,
+    compress: bool,
+) -> AsyncIterator[bytes]:
+    def fetch(after: Any):
+        query = client.table(table).select(columns)
+        if since is not None:
+            query = query.gte(time_column, _bound(since, epoch))
+        if until is not None:
+            query = query.lt(time_column, _bound(until, epoch))
+        for column, value in filters:
+            query = query.eq(column, value)
+        if after is not None:
+            query = query.gt("id", after)
+        return asyncio.ensure_future(query.order("id", desc=False).limit(page_size).execute())
+
+    encoder = _Encoder(fmt)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending = fetch(None)
+    try:
+        while True:
+            rows = (await pending).data or []
+            if not rows:
+                pending = None
+                break
+            # Request the next page before encoding and sending this one.  A
+            # short page does not mean the end: PostgREST may cap the limit
+            # below ``page_size``, so stop only on an empty page.
+            pending = fetch(rows[-1]["id"])
+            chunk = encoder.encode(rows).encode()
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,364 @@
+"""Incremental GitHub repository search for the scanner workers.
+
+The GitHub scanner and the core improver look for repositories through the
+search API.  Each of their queries keeps a ``since`` cursor in the
+``github_scan_cursors`` table (see ``migrations/github_scan_cursors.sql``).
+A run only asks for repositories pushed (or created) after the cursor, less
+a small overlap for the search index lag.  The cursor then moves to the
+newest timestamp the run saw.  While nothing new turns up the cursor stays
+put, so every request is repeated verbatim and revalidated with its ETag
+(see ``scraper_http``).  GitHub does not count ``304`` answers against the
+rate limit.
+
+Search returns at most 1,000 results per query.  A time window with more
+matches is split in half until each part fits, and the windows are crawled
+oldest first.  The pages of a window are fetched concurrently, a bounded
+number at a time.  Every response updates a :class:`RateGate` from its
+``X-RateLimit-*`` headers.  Requests wait for the reset once the quota is
+used up, and ``403``/``429`` answers are retried after ``Retry-After``.  If
+the reset is further off than `GITHUB_RATE_MAX_WAIT`, or the run's page
+budget is spent, the crawl stops.  The cursor then records how far the
+finished windows got, and the next run resumes from there.
+
+Responses can be recorded to and replayed from a directory of fixtures
+(:class:`FixtureTransport`), so a scan can be run offline.
+
+Configuration (environment):
+
+* `GITHUB_TOKEN` – Token for the GitHub API (30 searches per minute instead of 10)
+* `GITHUB_API_URL` – API root (default ``https://api.github.com``)
+* `GITHUB_SCAN_LOOKBACK` – Days searched for a query that has no cursor yet (default 7)
+* `GITHUB_SCAN_OVERLAP` – Seconds re‑searched before a cursor (default 3600)
+* `GITHUB_SCAN_CONCURRENCY` – Result pages fetched in parallel (default 3)
+* `GITHUB_SCAN_MAX_PAGES` – Result pages requested per run (default 200)
+* `GITHUB_RATE_MAX_WAIT` – Longest wait in seconds for a rate limit reset (default 90)
+* `GITHUB_FIXTURES` – Replay recorded responses from this directory instead of calling GitHub
+* `GITHUB_RECORD_FIXTURES` – Record the responses of a live run into this directory
+"""
+
+import asyncio
+import datetime
+import hashlib
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .scraper_http import FetchResult, ScraperHttp, default_cache
+from .scraper_schedule import HostLimiter, run_bounded
+from .supabase_async import get_client
+
+try:
+    import httpx  # type: ignore
+except ImportError:
+    httpx = None  # type: ignore
+
+PER_PAGE = 100
+SEARCH_CAP = 1000
+# Windows are not split below this span, even if they still hold more than
+# SEARCH_CAP matches; the excess is logged and skipped.
+MIN_WINDOW = datetime.timedelta(minutes=1)
+MAX_RETRIES = 3
+_TIME_FIELDS = {"pushed": "pushed_at", "created": "created_at"}
+
+
+class ScanStopped(Exception):
+    """The crawl ran out of page budget or rate limit for this run."""
+
+
+class RateGate:
+    """Client‑side view of one GitHub rate limit bucket.
+
+    ``remaining`` and ``reset`` come from the ``X-RateLimit-Remaining`` and
+    ``X-RateLimit-Reset`` headers.  Each request takes one unit before it is
+    sent, so concurrent requests do not overshoot the quota.
+    """
+
+    def __init__(self, max_wait: Optional[float] = None) -> None:
+        self.max_wait = float(max_wait if max_wait is not None else os.getenv("GITHUB_RATE_MAX_WAIT", "90"))
+        self.remaining: Optional[int] = None
+        self.reset = 0.0
+        self.waits = 0
+        self._lock = asyncio.Lock()
+
+    def update(self, headers: Any) -> None:
+        remaining, reset = headers.get("x-ratelimit-remaining"), headers.get("x-ratelimit-reset")
+        if remaining is None or reset is None:
+            return
+        remaining, reset = int(remaining), float(reset)
+        # Responses can arrive out of order; within one window trust the lowest count.
+        if reset != self.reset or self.remaining is None:
+            self.remaining, self.reset = remaining, reset
+        else:
+            self.remaining = min(self.remaining, remaining)
+
+    async def sleep(self, seconds: float) -> None:
+        if seconds > self.max_wait:
+            raise ScanStopped(f"rate limited for {seconds:.0f}s")
+        self.waits += 1
+        await asyncio.sleep(max(seconds, 0))
+
+    async def acquire(self) -> None:
+        """Wait until the quota allows one more request, then take it."""
+        async with self._lock:
+            if self.remaining is not None and self.remaining <= 0:
+                await self.sleep(self.reset - time.time() + 1)
+                self.remaining = None
+            if self.remaining is not None:
+                self.remaining -= 1
+
+    def retry_after(self, response: Any) -> Optional[float]:
+        """Seconds to wait before retrying a rate limited response, else ``None``."""
+        if response.status_code not in (403, 429):
+            return None
+        if response.headers.get("retry-after"):
+            return float(response.headers["retry-after"])
+        if response.headers.get("x-ratelimit-remaining") == "0":
+            return float(response.headers.get("x-ratelimit-reset", time.time())) - time.time() + 1
+        return None
+
+
+class Window(NamedTuple):
+    """A span of ``pushed``/``created`` times; ``end`` ``None`` is open‑ended."""
+
+    start: datetime.datetime
+    end: Optional[datetime.datetime]
+
+    def qualifier(self, field: str) -> str:
+        start = _iso(self.start)
+        return f"{field}:>={start}" if self.end is None else f"{field}:{start}..{_iso(self.end)}"
+
+
+class CrawlResult(NamedTuple):
+    repos: List[Dict[str, Any]]
+    cursors: Dict[str, datetime.datetime]
+    stats: Dict[str, int]
+    complete: bool
+
+
+def _iso(moment: datetime.datetime) -> str:
+    return moment.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_time(text: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+
+
+class GitHubSearch:
+    """Windowed, rate‑limited repository search over a shared :class:`ScraperHttp`."""
+
+    def __init__(self, http: ScraperHttp, gate: Optional[RateGate] = None, token: Optional[str] = None,
+                 concurrency: Optional[int] = None, max_pages: Optional[int] = None) -> None:
+        self.http = http
+        self.gate = gate or RateGate()
+        self.api = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+        self.headers = {"Accept": "application/vnd.github+json"}
+        token = token or os.getenv("GITHUB_TOKEN")
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        self.concurrency = int(concurrency or os.getenv("GITHUB_SCAN_CONCURRENCY", "3"))
+        self.pages_left = int(max_pages or os.getenv("GITHUB_SCAN_MAX_PAGES", "200"))
+        # A page may sit out a rate limit reset and a few retries.
+        self.page_timeout = (self.gate.max_wait + float(os.getenv("SCRAPER_HTTP_TIMEOUT", "30"))) * (MAX_RETRIES + 1)
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0, "splits": 0, "truncated": 0}
+
+    async def page(self, query: str, window: Window, field: str, number: int) -> Dict[str, Any]:
+        """Return one page of search results for ``query`` within ``window``."""
+        params = {
+            "q": f"{query} {window.qualifier(field)}",
+            "sort": "updated",
+            "order": "asc",
+            "per_page": PER_PAGE,
+            "page": number,
+        }
+        for attempt in range(MAX_RETRIES + 1):
+            if self.pages_left <= 0:
+                raise ScanStopped("page budget spent")
+            self.pages_left -= 1
+            await self.gate.acquire()
+            try:
+                result: FetchResult = await self.http.get(f"{self.api}/search/repositories", params, self.headers)
+            except httpx.HTTPStatusError as exc:
+                self.gate.update(exc.response.headers)
+                delay = self.gate.retry_after(exc.response)
+                if delay is None or attempt == MAX_RETRIES:
+                    raise
+                self.stats["retries"] += 1
+                await self.gate.sleep(delay)
+                continue
+            self.stats["requests"] += 1
+            self.stats["not_modified"] += result.not_modified
+            self.gate.update(result.response_headers)
+            return result.json()
+        raise AssertionError("unreachable")
+
+    async def search(self, query: str, field: str, since: datetime.datetime,
+                     now: datetime.datetime) -> Tuple[List[Dict[str, Any]], Optional[datetime.datetime], bool]:
+        """Return the repositories matching ``query`` with ``field`` at or after ``since``.
+
+        Returns:
+            The repositories, the newest ``<field>_at`` among them and
+            whether every window was crawled.  When the crawl stops early the
+            repositories and timestamp cover the windows that finished.
+        """
+        time_field = _TIME_FIELDS[field]
+        found: Dict[str, Dict[str, Any]] = {}
+        newest: Optional[datetime.datetime] = None
+        windows = [Window(since, None)]
+        try:
+            while windows:
+                window = windows.pop()
+                first = await self.page(query, window, field, 1)
+                total = first.get("total_count", 0)
+                span = (window.end or now) - window.start
+                if total > SEARCH_CAP and span > MIN_WINDOW:
+                    middle = window.start + datetime.timedelta(seconds=span.total_seconds() // 2)
+                    # Pushed last, so the older half is crawled first.
+                    windows.append(Window(middle, window.end))
+                    windows.append(Window(window.start, middle))
+                    self.stats["splits"] += 1
+                    continue
+                if total > SEARCH_CAP:
+                    print(f"[github_crawler] {query!r}: {total} matches in {window.qualifier(field)}; keeping {SEARCH_CAP}")
+                    self.stats["truncated"] += total - SEARCH_CAP
+                pages = [first]
+                numbers = list(range(2, math.ceil(min(total, SEARCH_CAP) / PER_PAGE) + 1))
+                for _, outcome in await run_bounded(
+                    numbers,
+                    lambda number: self.page(query, window, field, number),
+                    concurrency=self.concurrency,
+                    timeout=self.page_timeout,
+                ):
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+                    pages.append(outcome)
+                for page in pages:
+                    for repo in page.get("items", []):
+                        found[repo["html_url"]] = repo
+                        if repo.get(time_field):
+                            stamp = _parse_time(repo[time_field])
+                            newest = stamp if newest is None or stamp > newest else newest
+        except ScanStopped as exc:
+            print(f"[github_crawler] {query!r}: stopped early ({exc})")
+            return list(found.values()), newest, False
+        return list(found.values()), newest, True
+
+
+class FixtureTransport(httpx.AsyncBaseTransport if httpx is not None else object):  # type: ignore[misc]
+    """Records GitHub responses to a directory, or replays them from it.
+
+    Each response is a ``<sha256 of URL>.json`` file holding the URL,
+    status, relevant headers and body.  On replay a request whose
+    ``If-None-Match`` equals the recorded ETag is answered with ``304``, so
+    conditional requests behave as they do against GitHub.  Requests without
+    a recording get a ``404``.
+    """
+
+    _KEPT = ("content-type", "etag", "last-modified", "link", "x-ratelimit-remaining", "x-ratelimit-reset")
+
+    def __init__(self, directory: str, upstream: Any = None, record: bool = False) -> None:
+        self.directory = directory
+        self.record = record
+        self.upstream = upstream or (httpx.AsyncHTTPTransport() if record else None)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    async def handle_async_request(self, request: Any) -> Any:
+        url = str(request.url)
+        if self.record:
+            response = await self.upstream.handle_async_request(request)
+            body = await response.aread()
+            await response.aclose()
+            headers = {name: response.headers[name] for name in self._KEPT if name in response.headers}
+            if 200 <= response.status_code < 300:
+                entry = {"url": url, "status": response.status_code, "headers": headers, "body": body.decode("utf-8")}
+                with open(self._path(url), "w") as handle:
+                    json.dump(entry, handle)
+            return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+        try:
+            with open(self._path(url)) as handle:
+                entry = json.load(handle)
+        except FileNotFoundError:
+            return httpx.Response(404, json={"message": f"no recorded fixture for {url}"}, request=request)
+        etag = entry["headers"].get("etag")
+        if etag and request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers=entry["headers"], request=request)
+        return httpx.Response(entry["status"], headers=entry["headers"], content=entry["body"].encode("utf-8"),
+                              request=request)
+
+
+def open_http(upstream: Any = None) -> ScraperHttp:
+    """Return the :class:`ScraperHttp` for a scan, honouring the fixture settings."""
+    transport = upstream
+    if os.getenv("GITHUB_FIXTURES"):
+        transport = FixtureTransport(os.environ["GITHUB_FIXTURES"])
+    elif os.getenv("GITHUB_RECORD_FIXTURES"):
+        transport = FixtureTransport(os.environ["GITHUB_RECORD_FIXTURES"], upstream=upstream, record=True)
+    # Pacing comes from the rate gate; the host limiter only caps requests in flight.
+    limiter = HostLimiter(interval=0, concurrency=int(os.getenv("GITHUB_SCAN_CONCURRENCY", "3")))
+    return ScraperHttp(limiter, default_cache(), transport=transport)
+
+
+async def load_cursors(scanner: str) -> Dict[str, datetime.datetime]:
+    client = await get_client()
+    response = await client.table("github_scan_cursors").select("query, since").eq("scanner", scanner).execute()
+    return {row["query"]: _parse_time(row["since"]) for row in response.data or []}
+
+
+async def save_cursors(scanner: str, cursors: Dict[str, datetime.datetime]) -> None:
+    """Persist the cursors of a crawl once its results are stored."""
+    if not cursors:
+        return
+    client = await get_client()
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    rows = [{"scanner": scanner, "query": query, "since": since.isoformat(), "updated_at": now}
+            for query, since in cursors.items()]
+    await client.table("github_scan_cursors").upsert(rows, on_conflict="scanner,query").execute()
+
+
+async def crawl(scanner: str, queries: List[str], field: str = "pushed", upstream: Any = None,
+                now: Optional[datetime.datetime] = None) -> CrawlResult:
+    """Search every query from its cursor.
+
+    The new cursors are returned, not saved; call :func:`save_cursors` once
+    the repositories have been written, so a failed write is retried.
+
+    Args:
+        scanner: Name the cursors are stored under, such as ``github_scanner``.
+        queries: GitHub search queries, without a ``pushed``/``created`` qualifier.
+        field: ``pushed`` for recently active repositories or ``created`` for new ones.
+        upstream: Optional ``httpx`` transport to use instead of the network.
+        now: Time the crawl runs at.  Windows are derived from it, so a replay
+            of recorded fixtures must pass the time they were recorded at.
+    """
+    stored = await load_cursors(scanner)
+    now = now or datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    lookback = datetime.timedelta(days=float(os.getenv("GITHUB_SCAN_LOOKBACK", "7")))
+    overlap = datetime.timedelta(seconds=float(os.getenv("GITHUB_SCAN_OVERLAP", "3600")))
+    repos: Dict[str, Dict[str, Any]] = {}
+    cursors: Dict[str, datetime.datetime] = {}
+    complete = True
+    failed = 0
+    async with open_http(upstream) as http:
+        search = GitHubSearch(http)
+        for query in queries:
+            since = stored[query] - overlap if query in stored else now - lookback
+            try:
+                found, newest, finished = await search.search(query, field, since, now)
+            except (httpx.HTTPError, asyncio.TimeoutError, ValueError) as exc:
+                # Leave the cursor alone so the next run retries the query.
+                print(f"[github_crawler] {query!r} failed: {exc!r}")
+                failed += 1
+                continue
+            for repo in found:
+                repos[repo["html_url"]] = repo
+            if newest is not None and (query not in stored or newest > stored[query]):
+                cursors[query] = newest
+            complete = complete and finished
+            if not finished:
+                break
+    stats = {**search.stats, "rate_waits": search.gate.waits, "failed_queries": failed, "repos": len(repos)}
+    return CrawlResult(list(repos.values()), cursors, stats, complete and not failed)
@@ -3,7 +3,12 @@
 This service acts as the central coordinator for the agent swarm.  It provides
 REST endpoints for worker registration, directive submission and retrieval,
 logging and protocol activation.  The server writes all state into Supabase
-tables.  WebSocket support is stubbed out for future chat integration.
+tables through the non‑blocking helpers in ``supabase_async`` so that a slow
+query never stalls other requests on the event loop.  Live swarm updates are
+pushed to dashboards over ``/ws`` (WebSocket) and ``/api/stream`` (Server‑Sent
+Events) from a single shared change feed; see ``realtime_hub``.
+Prometheus metrics are served on ``/metrics``; see ``telemetry``.  Requests
+are traced with OpenTelemetry when `TRACE_EXPORTER` is set; see ``tracing``.
 
 Run this module with Uvicorn:
 
@@ -15,14 +20,37 @@ The `/initiate_protocol` endpoint can be used to send Omega/Infinity Alpha
 Prime directives to the swarm.  See the README for usage.
 """
 
+import asyncio
 import json
 import os
 import datetime
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
-from .supabase_utils import insert_log, get_client
+from .export import (
+    DEFAULT_EXPORT_PAGE,
+    EXPORT_FORMATS,
+    MAX_EXPORT_PAGE,
+    export_stream,
+    parse_filters,
+)
+from .pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    fetch_page,
+    select_columns,
+)
+from .parse_rules import compile_rules
+from .realtime_hub import TOPICS, FeedHub, parse_topics
+from .response_cache import CacheMiddleware, ResponseCache
+from .scraper_schedule import parse_frequency
+from .supabase_async import close_clients, dispatch_directives, insert_log, get_client
+from .telemetry import MetricsMiddleware, refresh_queue_metrics, render_metrics
+from .tracing import TracingMiddleware, configure_tracing, shutdown_tracing
 
 # Ensure the Rosetta prompt is loaded before anything else.  The loader
 # reads a prompt file under ``prompts/rosetta_prompt.txt`` and prints a
@@ -35,7 +63,42 @@ except Exception as _exc:
     # Do not let Rosetta failures interrupt the server startup.
     print("[warning] Failed to inject Rosetta prompt", _exc)
 
-app = FastAPI(title="Infinity X One Handshake Server")
+
+hub = FeedHub()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the realtime feed and tracing; release pooled Supabase connections on shutdown."""
+    try:
+        configure_tracing("handshake-server")
+    except RuntimeError as exc:
+        print(f"[handshake_server] tracing disabled: {exc}")
+    hub.start()
+    yield
+    await hub.stop()
+    await close_clients()
+    shutdown_tracing()
+
+
+app = FastAPI(title="Infinity X One Handshake Server", lifespan=lifespan)
+
+# Seconds each dashboard route may be served from memory.  Writes below
+# invalidate the routes they affect; see ``response_cache`` for overrides.
+CACHE_TTLS = {
+    "/api/faucets": 30,
+    "/api/wallets": 30,
+    "/api/metrics": 60,
+    "/api/agents": 5,
+    "/api/predictions": 30,
+    "/api/scraper-jobs": 30,
+    "/api/knowledge/search": 60,
+}
+response_cache = ResponseCache(CACHE_TTLS)
+app.add_middleware(CacheMiddleware, cache=response_cache)
+# Added last so they are outermost and also cover responses served from cache.
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 
 class Directive(BaseModel):
@@ -50,11 +113,11 @@ class ScraperJobModel(BaseModel):
     """Schema for creating a new scraper job via the API.
 
     ``source`` should be one of ``web``, ``github`` or ``darkweb``.  ``url`` or
-    ``query`` are optional depending on the source type.  ``parse_rules`` is a
-    dictionary of custom parsing instructions, such as CSS selectors or
-    JSON paths.  ``frequency`` indicates how often the job should run
-    (e.g. ``hourly``, ``daily``).  ``results_table`` defaults to
-    ``scraper_results`` when not provided.
+    ``query`` are optional depending on the source type.  ``parse_rules`` maps
+    field names to CSS selectors or JSON paths for ``web`` jobs (see
+    ``parse_rules``).  ``frequency`` indicates how often the job should run
+    (``hourly``, ``daily``, ``15m``; see ``scraper_schedule``).
+    ``results_table`` defaults to ``scraper_results`` when not provided.
     """
     source: str
     url: str | None = None
@@ -71,9 +134,26 @@ async def status():
         "status": "ok",
         "time": datetime.datetime.utcnow().isoformat(),
         "supabase_url": os.getenv("SUPABASE_URL", "unset"),
+        "cache": response_cache.stats(),
+        "realtime": hub.stats(),
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for this server process; see ``telemetry``."""
+    try:
+        await refresh_queue_metrics(await get_client())
+    except Exception as exc:
+        # Still serve latency metrics when Supabase is unreachable.
+        print(f"[handshake_server] could not refresh queue metrics: {exc}")
+    try:
+        body, content_type = render_metrics()
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    return Response(body, media_type=content_type)
+
+
 @app.post("/directive")
 async def post_directive(directive: Directive):
     """Insert a directive into the `agent_directives` table.
@@ -81,16 +161,11 @@ async def post_directive(directive: Directive):
     Payload is arbitrary JSON that will be delivered to the named agent.
     The directive is marked as pending until a worker marks it complete.
     """
-    data = {
-        "agent": directive.agent,
-        "command": directive.command,
-        "payload": directive.payload,
-        "status": "pending",
-        "timestamp": datetime.datetime.utcnow().timestamp(),
-    }
-    client = get_client()
-    client.table("agent_directives").insert(data).execute()
-    return {"status": "queued", "directive": data}
+    rows = await dispatch_directives([
+        {"agent": directive.agent, "command": directive.command, "payload": directive.payload}
+    ])
+    response_cache.invalidate("/api/agents")
+    return {"status": "queued", "directive": rows[0] if rows else None}
 
 
 @app.get("/directive/{agent}")
@@ -99,8 +174,8 @@ async def fetch_directive(agent: str):
 
     Workers call this route in polling loops to retrieve work.
     """
-    client = get_client()
-    response = (
+    client = await get_client()
+    response = await (
         client.table("agent_directives")
         .select("id, command, payload")
         .eq("agent", agent)
@@ -118,9 +193,9 @@ async def fetch_directive(agent: str):
 @app.post("/complete/{directive_id}")
 async def complete_directive(directive_id: int):
     """Mark a directive as complete and write an entry to the `agent_logs` table."""
-    client = get_client()
+    client = await get_client()
     # Update directive status
-    client.table("agent_directives").update({"status": "complete"}).eq("id", directive_id).execute()
+    await client.table("agent_directives").update({"status": "complete"}).eq("id", directive_id).execute()
     return {"status": "completed", "directive_id": directive_id}
 
 
@@ -138,15 +213,8 @@ async def initiate_protocol(request: Request):
     layers = payload.get("layers", [])
 
     # Insert directive for PromptWriter
-    directive_data = {
-        "agent": "PromptWriter",
-        "command": "INITIATE_PROTOCOL",
-        "payload": payload,
-        "status": "pending",
-        "timestamp": datetime.datetime.utcnow().timestamp(),
-    }
-    client = get_client()
-    client.table("agent_directives").insert(directive_data).execute()
+    await dispatch_directives([{"agent": "PromptWriter", "command": "INITIATE_PROTOCOL", "payload": payload}])
+    client = await get_client()
 
     # Record swarm_state snapshot
     swarm_data = {
@@ -156,7 +224,8 @@ async def initiate_protocol(request: Request):
         "notes": f"Doctrines={doctrines}, Layers={layers}",
         "timestamp": datetime.datetime.utcnow().timestamp(),
     }
-    client.table("swarm_state").insert(swarm_data).execute()
+    await client.table("swarm_state").insert(swarm_data).execute()
+    response_cache.invalidate("/api/agents")
 
     return {
         "status": "protocol_initiated",
@@ -170,71 +239,142 @@ async def initiate_protocol(request: Request):
 #
 # These routes provide aggregated metrics and data for the front‑end UI.  They
 # read directly from Supabase tables and return JSON payloads that can be
-# consumed by the Next.js dashboard.  In production you may wish to add
-# pagination, caching and error handling.
+# consumed by the Next.js dashboard.  List endpoints are paginated by key
+# (see ``pagination``): pass the returned ``next_cursor`` back as ``cursor``
+# to fetch the following page.
 # -----------------------------------------------------------------------------
 
+async def _page(table: str, default_columns: str, fields, cursor, limit, count):
+    """Fetch a keyset page of ``table``, mapping bad input to HTTP 400."""
+    client = await get_client()
+    try:
+        columns = select_columns(fields, default_columns)
+        return await fetch_page(client.table(table), columns, cursor, limit, count=count)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
 @app.get("/api/faucets")
-async def get_faucets():
-    """Return the current faucet registry and recent yields.
+async def get_faucets(
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    count: bool = False,
+):
+    """Return a page of the faucet registry and recent yields.
 
     This endpoint reads the ``faucets`` and ``faucet_yields`` tables to
-    provide a list of all known faucet sources and their recent yield
-    metrics.  Yields are returned in reverse chronological order and
-    limited to the 30 most recent entries.
+    provide the known faucet sources and their recent yield metrics.
+    ``fields`` restricts the faucet columns returned and ``count=true`` adds
+    the total number of faucets.  Yields are returned in reverse
+    chronological order and limited to the 30 most recent entries.
     """
-    client = get_client()
-    faucets_resp = client.table("faucets").select("*", count="exact").execute()
-    yield_resp = (
+    client = await get_client()
+    page, yield_resp = await asyncio.gather(
+        _page("faucets", "*", fields, cursor, limit, count),
         client.table("faucet_yields")
         .select("id, yield_usd, timestamp")
         .order("timestamp", desc=True)
         .limit(30)
-        .execute()
+        .execute(),
     )
-    return {
-        "faucets": faucets_resp.data or [],
+    result = {
+        "faucets": page.rows,
         "yields": yield_resp.data or [],
+        "next_cursor": page.next_cursor,
     }
+    if count:
+        result["total"] = page.total
+    return result
 
 
 @app.get("/api/wallets")
-async def get_wallets():
-    """Return all wallets and their portfolio assets.
+async def get_wallets(
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    count: bool = False,
+):
+    """Return a page of wallets and their portfolio assets.
 
     Reads the ``wallets`` and ``portfolio_assets`` tables.  Note that
-    ``portfolio_assets`` has a foreign key reference to the wallets table.
+    ``portfolio_assets`` has a foreign key reference to the wallets table;
+    only the assets of the wallets on the current page are returned.
     """
-    client = get_client()
-    wallets = client.table("wallets").select("id, address, balance, chain").execute().data or []
-    assets = client.table("portfolio_assets").select("wallet_id, coin, balance, usd_value").execute().data or []
-    return {"wallets": wallets, "assets": assets}
+    page = await _page("wallets", "id, address, balance, chain", fields, cursor, limit, count)
+    assets = []
+    wallet_ids = [wallet["id"] for wallet in page.rows]
+    if wallet_ids:
+        client = await get_client()
+        assets_resp = await (
+            client.table("portfolio_assets")
+            .select("wallet_id, coin, balance, usd_value")
+            .in_("wallet_id", wallet_ids)
+            .execute()
+        )
+        assets = assets_resp.data or []
+    result = {"wallets": page.rows, "assets": assets, "next_cursor": page.next_cursor}
+    if count:
+        result["total"] = page.total
+    return result
+
+
+# Supported ``interval`` values for /api/metrics mapped to the Postgres
+# ``date_trunc`` unit and the approximate length of one bucket.
+METRIC_INTERVALS = {
+    "daily": ("day", datetime.timedelta(days=1)),
+    "weekly": ("week", datetime.timedelta(weeks=1)),
+    "monthly": ("month", datetime.timedelta(days=31)),
+}
 
 
 @app.get("/api/metrics")
-async def get_metrics(interval: str = "daily"):
-    """Return financial metrics.
-
-    This endpoint fetches raw profit and revenue entries.  In the future it
-    can perform aggregation based on the ``interval`` parameter ("daily",
-    "weekly", or "monthly").
+async def get_metrics(
+    interval: str = "daily",
+    periods: int = Query(30, ge=1, le=1000),
+    since: datetime.datetime | None = None,
+    until: datetime.datetime | None = None,
+):
+    """Return financial metrics aggregated per ``interval`` bucket.
+
+    Profits and revenues are bucketed by day, week or month inside Postgres
+    (see ``migrations/metrics_rollup.sql``) so only one row per bucket is
+    transferred.  Each profit bucket carries its total, entry count and a
+    per‑chain breakdown.  The window defaults to the last ``periods``
+    buckets and can be pinned with ``since``/``until``.
     """
-    client = get_client()
-    profits = (
-        client.table("profit_ledger")
-        .select("id, wallet, chain, faucet, amount, txid, ts")
-        .order("ts", desc=True)
-        .limit(100)
-        .execute()
+    if interval not in METRIC_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {sorted(METRIC_INTERVALS)}")
+    unit, step = METRIC_INTERVALS[interval]
+    until = until or datetime.datetime.now(datetime.timezone.utc)
+    since = since or until - step * periods
+    params = {"p_interval": unit, "p_since": since.isoformat(), "p_until": until.isoformat()}
+    client = await get_client()
+    profit_rows, revenue_rows = await asyncio.gather(
+        client.rpc("metrics_profit_buckets", params).execute(),
+        client.rpc("metrics_revenue_buckets", params).execute(),
     )
-    revenues = (
-        client.table("revenues")
-        .select("id, wallet, site, reward, timestamp")
-        .order("timestamp", desc=True)
-        .limit(100)
-        .execute()
-    )
-    return {"profits": profits.data or [], "revenues": revenues.data or []}
+
+    profits: dict = {}
+    for row in profit_rows.data or []:
+        bucket = profits.setdefault(
+            row["bucket"], {"bucket": row["bucket"], "total": 0.0, "count": 0, "chains": {}}
+        )
+        total = float(row["total"] or 0)
+        bucket["total"] += total
+        bucket["count"] += row["entries"]
+        bucket["chains"][row["chain"]] = {"total": total, "count": row["entries"]}
+    revenues = [
+        {"bucket": row["bucket"], "total": float(row["total"] or 0), "count": row["entries"]}
+        for row in revenue_rows.data or []
+    ]
+    return {
+        "interval": interval,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "profits": list(profits.values()),
+        "revenues": revenues,
+    }
 
 
 @app.get("/api/agents")
@@ -246,40 +386,149 @@ async def get_agents():
     to display current active agent counts, tasks completed and success
     ratios.
     """
-    client = get_client()
-    state_resp = (
+    client = await get_client()
+    state_resp, activity_resp = await asyncio.gather(
         client.table("swarm_state")
         .select("id, active_agents, swarm_mode, heartbeat, notes, timestamp")
         .order("timestamp", desc=True)
         .limit(1)
-        .execute()
-    )
-    activity_resp = (
+        .execute(),
         client.table("swarm_activity")
         .select("id, nodes, tasks_completed, success_ratio")
         .order("id", desc=True)
         .limit(10)
-        .execute()
+        .execute(),
     )
     state = state_resp.data[0] if state_resp.data else {}
     return {"state": state, "activity": activity_resp.data or []}
 
 
+# ``kind`` values accepted by /api/knowledge/search and the tables they cover.
+SEARCH_KINDS = {
+    "all": ["knowledge", "innovation"],
+    "knowledge": ["knowledge"],
+    "innovation": ["innovation"],
+}
+MAX_SEARCH_PAGE = 100
+# Id bands of the tier a search page ends in; carried in its cursor.
+SEARCH_BANDS = ("knowledge_floor", "knowledge_ceiling", "innovation_floor", "innovation_ceiling")
+
+
+@app.get("/api/knowledge/search")
+async def search_knowledge(
+    q: str = Query(..., min_length=1, max_length=256),
+    kind: str = "all",
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_PAGE),
+    cursor: str | None = None,
+):
+    """Full‑text search over ``knowledge_base`` and ``innovation_queue``.
+
+    ``q`` uses web search syntax: ``"quoted phrases"``, ``or`` and
+    ``-excluded`` words.  Results are ranked and matched inside Postgres by
+    ``search_knowledge`` (see ``migrations/knowledge_search.sql``); each
+    carries a ``snippet`` with the matched words wrapped in ``<mark>``.
+    ``kind`` limits the search to ``knowledge`` or ``innovation`` rows.  Pass
+    ``next_cursor`` back as ``cursor`` for the following page.  Very common
+    terms are ranked among the most recent rows first; later pages go on
+    through older rows, so every match is reached.
+    """
+    if kind not in SEARCH_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {sorted(SEARCH_KINDS)}")
+    params = {"p_query": q, "p_kinds": SEARCH_KINDS[kind], "p_limit": limit + 1}
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+            params.update(
+                p_after_tier=int(position["tier"]),
+                p_after_rank=float(position["rank"]),
+                p_after_kind=str(position["kind"]),
+                p_after_id=int(position["id"]),
+                **{f"p_{band}": position[band] for band in SEARCH_BANDS},
+            )
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="invalid cursor")
+    client = await get_client()
+    response = await client.rpc("search_knowledge", params).execute()
+    rows = response.data or []
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            {key: last[key] for key in ("tier", "rank", "kind", "id", *SEARCH_BANDS)}
+        )
+    results = [
+        {key: row[key] for key in ("kind", "id", "title", "url", "source", "rank", "snippet")}
+        for row in rows
+    ]
+    return {"query": q, "results": results, "next_cursor": next_cursor}
+
+
+@app.get("/api/export/{table}")
+async def export_table(
+    table: str,
+    format: str = "ndjson",
+    fields: str | None = None,
+    since: datetime.datetime | None = None,
+    until: datetime.datetime | None = None,
+    eq: list[str] = Query([]),
+    page_size: int = Query(DEFAULT_EXPORT_PAGE, ge=1, le=MAX_EXPORT_PAGE),
+    gzip: bool = False,
+):
+    """Stream a full export of a ledger table as NDJSON or CSV.
+
+    Supported tables are ``profit_ledger``, ``revenues``, ``wallet_balances``
+    and ``scraper_results``.  ``since``/``until`` bound the table's time
+    column, ``fields`` selects columns and each ``eq=column:value`` adds an
+    equality filter.  Rows are read page by page, so memory use does not grow
+    with the size of the export.  With ``gzip=true`` the body is a ``.gz``
+    file.
+    """
+    client = await get_client()
+    try:
+        chunks = export_stream(
+            client,
+            table,
+            fmt=format,
+            fields=fields,
+            since=since,
+            until=until,
+            filters=parse_filters(eq),
+            page_size=page_size,
+            compress=gzip,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    filename = f"{table}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 # -----------------------------------------------------------------------------
 # New endpoints for unified scraping, predictions and agent deployment
 # -----------------------------------------------------------------------------
 
 @app.get("/api/scraper-jobs")
-async def get_scraper_jobs():
-    """Return all configured scraper jobs.
-
-    This endpoint reads the ``scraper_jobs`` table and returns a list of jobs
-    with their parameters and status.  Jobs can be created via the POST
-    endpoint.
+async def get_scraper_jobs(
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    count: bool = False,
+):
+    """Return a page of configured scraper jobs.
+
+    This endpoint reads the ``scraper_jobs`` table and returns jobs with
+    their parameters and status, ordered by id.  Jobs can be created via
+    the POST endpoint.
     """
-    client = get_client()
-    resp = client.table("scraper_jobs").select("*").execute()
-    return {"jobs": resp.data or []}
+    page = await _page("scraper_jobs", "*", fields, cursor, limit, count)
+    result = {"jobs": page.rows, "next_cursor": page.next_cursor}
+    if count:
+        result["total"] = page.total
+    return result
 
 
 @app.post("/api/scraper-jobs")
@@ -287,24 +536,33 @@ async def create_scraper_job(job: ScraperJobModel):
     """Create a new scraping job.
 
     Inserts the job definition into the ``scraper_jobs`` table.  The job
-    will be executed by the unified scraper worker according to the
-    configured Cron schedule.  If ``results_table`` is omitted it defaults
-    to ``scraper_results``.
+    is due immediately and then runs every ``frequency`` (see
+    ``scraper_schedule``).  An unknown frequency or a malformed
+    ``parse_rules`` selector is rejected with 400.  If ``results_table`` is
+    omitted it defaults to ``scraper_results``.
     """
+    try:
+        parse_frequency(job.frequency)
+        if job.parse_rules:
+            compile_rules(job.parse_rules)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     data = job.dict()
     if not data.get("results_table"):
         data["results_table"] = "scraper_results"
     data["status"] = "scheduled"
-    client = get_client()
-    client.table("scraper_jobs").insert(data).execute()
+    client = await get_client()
+    await client.table("scraper_jobs").insert(data).execute()
+    response_cache.invalidate("/api/scraper-jobs")
     return {"status": "created", "job": data}
 
 
 @app.delete("/api/scraper-jobs/{job_id}")
 async def delete_scraper_job(job_id: int):
     """Remove a scraping job by its identifier."""
-    client = get_client()
-    client.table("scraper_jobs").delete().eq("id", job_id).execute()
+    client = await get_client()
+    await client.table("scraper_jobs").delete().eq("id", job_id).execute()
+    response_cache.invalidate("/api/scraper-jobs")
     return {"status": "deleted", "job_id": job_id}
 
 
@@ -317,11 +575,11 @@ async def get_predictions(symbol: str | None = None):
     that asset are returned.  Otherwise the 50 most recent predictions
     are returned.
     """
-    client = get_client()
+    client = await get_client()
     query = client.table("predictions").select("id, symbol, prediction, predicted_at").order("predicted_at", desc=True)
     if symbol:
         query = query.eq("symbol", symbol)
-    resp = query.limit(50).execute()
+    resp = await query.limit(50).execute()
     return {"predictions": resp.data or []}
 
 
@@ -329,28 +587,113 @@ async def get_predictions(symbol: str | None = None):
 async def deploy_agent(request: Request):
     """Request deployment of one or more agents.
 
-    Expects a JSON payload with at least ``agent`` and ``count`` keys.  The
-    request is translated into an ``agent_directives`` entry for the
-    Replicator worker.  Additional parameters can be passed through
-    verbatim in the payload.
+    Expects a JSON payload with at least ``agent`` and ``count`` keys, or a
+    ``deployments`` list of such objects to scale several agents at once.
+    Each deployment is translated into an ``agent_directives`` entry for
+    the Replicator worker; a batch is inserted atomically in one request.
     """
     payload = await request.json()
-    agent_name = payload.get("agent")
-    count = payload.get("count", 1)
-    if not agent_name:
-        raise HTTPException(status_code=400, detail="Missing 'agent' in request payload")
-    directive = {
-        "agent": "Replicator",
-        "command": "SCALE",
-        "payload": {"target_agent": agent_name, "replicas": count},
-        "status": "pending",
-        "timestamp": datetime.datetime.utcnow().timestamp(),
-    }
-    client = get_client()
-    client.table("agent_directives").insert(directive).execute()
-    return {"status": "enqueued", "directive": directive}
+    deployments = payload.get("deployments") or [payload]
+    directives = []
+    for deployment in deployments:
+        agent_name = deployment.get("agent")
+        if not agent_name:
+            raise HTTPException(status_code=400, detail="Missing 'agent' in request payload")
+        directives.append({
+            "agent": "Replicator",
+            "command": "SCALE",
+            "payload": {"target_agent": agent_name, "replicas": deployment.get("count", 1)},
+        })
+    rows = await dispatch_directives(directives)
+    response_cache.invalidate("/api/agents")
+    if "deployments" in payload:
+        return {"status": "enqueued", "directives": rows}
+    return {"status": "enqueued", "directive": rows[0] if rows else None}
+
+
+# -----------------------------------------------------------------------------
+# Realtime streaming
+#
+# Dashboards subscribe to ``agent_logs``, ``swarm_state`` and ``swarm_activity``
+# instead of polling.  Each message is ``{"topic": ..., "row": {...}}``; a
+# ``{"topic": "lagged", "dropped": n}`` message tells a slow client that older
+# events were discarded.
+# -----------------------------------------------------------------------------
 
+@app.websocket("/ws")
+@app.websocket("/ws/{agent}")
+async def stream_websocket(websocket: WebSocket, agent: str | None = None, topics: str | None = None):
+    """Stream swarm events over a WebSocket.
 
-# Note: WebSocket implementation is left as an exercise for the front‑end.
-# FastAPI supports websockets via the `@app.websocket` decorator.  You can define
-# a route `/ws/{agent}` that broadcasts logs or real‑time messages to the UI.
+    ``topics`` is a comma separated subset of the available topics (all by
+    default) and ``agent`` restricts ``agent_logs`` to one agent.  Clients
+    can change their topics by sending ``{"subscribe": [...]}`` or
+    ``{"unsubscribe": [...]}``.
+    """
+    try:
+        wanted = parse_topics(topics)
+    except ValueError as exc:
+        await websocket.close(code=1008, reason=str(exc))
+        return
+    await websocket.accept()
+    subscription = hub.subscribe(wanted, agent)
+
+    async def receive_commands():
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                continue
+            subscription.topics.update(t for t in message.get("subscribe", []) if t in TOPICS)
+            subscription.topics.difference_update(message.get("unsubscribe", []))
+
+    async def send_events():
+        while True:
+            _topic, text = await subscription.next_event()
+            await websocket.send_text(text)
+
+    tasks = [asyncio.create_task(receive_commands()), asyncio.create_task(send_events())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.unsubscribe(subscription)
+        for task in tasks:
+            if task.done() and not task.cancelled() and not isinstance(task.exception(), WebSocketDisconnect):
+                print(f"[handshake] websocket stream ended: {task.exception()}")
+
+
+@app.get("/api/stream")
+async def stream_events(topics: str | None = None, agent: str | None = None):
+    """Stream swarm events as Server‑Sent Events.
+
+    Accepts the same ``topics`` and ``agent`` filters as ``/ws``.  Each event
+    is sent with the topic as its SSE ``event`` name, and a comment is sent
+    every 15 seconds to keep proxies from closing an idle stream.
+    """
+    try:
+        wanted = parse_topics(topics)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    subscription = hub.subscribe(wanted, agent)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    topic, text = await asyncio.wait_for(subscription.next_event(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {topic}\ndata: {text}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,182 @@
+"""Parquet cold storage for ``agent_logs``.
+
+Old ``agent_logs`` rows are moved out of Postgres by the ``log_archiver``
+job into zstd‑compressed Parquet files, one directory per UTC day::
+
+    <ARCHIVE_ROOT>/agent_logs/date=2025-01-31/part-<first id>-<last id>.parquet
+
+``ARCHIVE_ROOT`` may be a local path or any URI understood by
+``pyarrow.fs`` (e.g. ``s3://bucket/prefix`` or ``gs://bucket/prefix``).
+:func:`query_archive` and :func:`iter_archive` read the archive back with
+partition pruning on the day and predicate pushdown on ``ts``, ``agent`` and
+``event``, so an audit of one agent over a week only opens that week's
+files and skips row groups that cannot match.
+
+``details`` is stored as JSON text because its shape varies between agents.
+
+Configuration (environment):
+
+* `ARCHIVE_ROOT` – Archive location (default ``./archive``)
+* `ARCHIVE_COMPRESSION` – Parquet codec (default ``zstd``)
+"""
+
+import datetime
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.dataset as ds  # type: ignore
+    import pyarrow.fs as pafs  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:
+    pa = None  # type: ignore
+
+TABLE = "agent_logs"
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed; add `pyarrow` to your dependencies to use the log archive")
+
+
+def _schema() -> Any:
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("agent", pa.string()),
+            ("event", pa.string()),
+            ("details", pa.string()),
+            ("ts", pa.timestamp("us", tz="UTC")),
+        ]
+    )
+
+
+def _filesystem(root: Optional[str]) -> Any:
+    """Return ``(filesystem, base path)`` for the archive root."""
+    root = root or os.getenv("ARCHIVE_ROOT", "./archive")
+    if "://" not in root:
+        root = os.path.abspath(root)
+        return pafs.LocalFileSystem(), f"{root}/{TABLE}"
+    filesystem, path = pafs.FileSystem.from_uri(root)
+    return filesystem, f"{path.rstrip('/')}/{TABLE}"
+
+
+def parse_ts(value: Any) -> datetime.datetime:
+    """Parse a PostgREST timestamp into an aware UTC datetime."""
+    if isinstance(value, datetime.datetime):
+        parsed = value
+    else:
+        parsed = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
+def write_rows(rows: Sequence[Dict[str, Any]], root: Optional[str] = None) -> List[str]:
+    """Write ``agent_logs`` rows to the archive, one file per day.
+
+    File names are derived from the id range, so re‑archiving the same rows
+    after an interrupted run overwrites the earlier file instead of
+    duplicating it.
+
+    Returns:
+        The paths written.
+    """
+    _require_pyarrow()
+    filesystem, base = _filesystem(root)
+    by_day: Dict[datetime.date, List[Dict[str, Any]]] = {}
+    for row in rows:
+        ts = parse_ts(row["ts"])
+        details = row.get("details")
+        by_day.setdefault(ts.date(), []).append(
+            {
+                "id": row["id"],
+                "agent": row.get("agent"),
+                "event": row.get("event"),
+                "details": details if details is None or isinstance(details, str) else json.dumps(details),
+                "ts": ts,
+            }
+        )
+    written = []
+    compression = os.getenv("ARCHIVE_COMPRESSION", "zstd")
+    for day, day_rows in sorted(by_day.items()):
+        day_rows.sort(key=lambda r: r["id"])
+        directory = f"{base}/date={day.isoformat()}"
+        filesystem.create_dir(directory, recursive=True)
+        path = f"{directory}/part-{day_rows[0]['id']}-{day_rows[-1]['id']}.parquet"
+        table = pa.Table.from_pylist(day_rows, schema=_schema())
+        pq.write_table(table, path, filesystem=filesystem, compression=compression)
+        written.append(path)
+    return written
+
+
+def _dataset(root: Optional[str]) -> Any:
+    _require_pyarrow()
+    filesystem, base = _filesystem(root)
+    partitioning = ds.partitioning(pa.schema([("date", pa.date32())]), flavor="hive")
+    return ds.dataset(base, filesystem=filesystem, format="parquet", partitioning=partitioning)
+
+
+def _filter(
+    since: Optional[datetime.datetime],
+    until: Optional[datetime.datetime],
+    agents: Optional[Sequence[str]],
+    events: Optional[Sequence[str]],
+) -> Any:
+    expression = None
+
+    def both(current: Any, extra: Any) -> Any:
+        return extra if current is None else current & extra
+
+    if since is not None:
+        since = parse_ts(since)
+        # The partition predicate lets the scanner skip whole days.
+        expression = both(expression, ds.field("date") >= since.date())
+        expression = both(expression, ds.field("ts") >= pa.scalar(since, pa.timestamp("us", tz="UTC")))
+    if until is not None:
+        until = parse_ts(until)
+        expression = both(expression, ds.field("date") <= until.date())
+        expression = both(expression, ds.field("ts") < pa.scalar(until, pa.timestamp("us", tz="UTC")))
+    if agents:
+        expression = both(expression, ds.field("agent").isin(list(agents)))
+    if events:
+        expression = both(expression, ds.field("event").isin(list(events)))
+    return expression
+
+
+def iter_archive(
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    agents: Optional[Sequence[str]] = None,
+    events: Optional[Sequence[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+    root: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield archived log rows matching the filters, batch by batch.
+
+    Memory use is bounded by the Parquet batch size, so this is suitable for
+    scanning long periods.
+    """
+    scanner = _dataset(root).scanner(
+        columns=list(columns) if columns else list(_schema().names),
+        filter=_filter(since, until, agents, events),
+    )
+    for batch in scanner.to_batches():
+        yield from batch.to_pylist()
+
+
+def query_archive(
+    since: Optional[datetime.datetime] = None,
+    until: Optional[datetime.datetime] = None,
+    agents: Optional[Sequence[str]] = None,
+    events: Optional[Sequence[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+    root: Optional[str] = None,
+) -> Any:
+    """Return archived log rows matching the filters as a ``pyarrow.Table``."""
+    return _dataset(root).to_table(
+        columns=list(columns) if columns else list(_schema().names),
+        filter=_filter(since, until, agents, events),
+    )
@@ -0,0 +1,125 @@
+"""Keyset pagination helpers for the handshake server list endpoints.
+
+List routes page through tables by primary key instead of returning every
+row: each page is fetched with ``id > <last id>`` ordered by ``id``, which
+PostgREST serves from the primary key index no matter how deep the page.
+Callers receive an opaque ``next_cursor`` string and pass it back unchanged
+to fetch the following page; it is ``None`` on the last page.
+
+Usage::
+
+    page = await fetch_page(client.table("wallets"), "id, address", cursor, limit)
+    return {"wallets": page.rows, "next_cursor": page.next_cursor}
+"""
+
+import base64
+import binascii
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """Encode a keyset position as an opaque, URL‑safe cursor."""
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by :func:`encode_cursor`.
+
+    Raises:
+        ValueError: if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if not isinstance(position, dict):
+        raise ValueError("invalid cursor")
+    return position
+
+
+def check_column(name: str) -> str:
+    """Return ``name`` if it is a plain column name.
+
+    Raises:
+        ValueError: otherwise.
+    """
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"invalid field {name!r}")
+    return name
+
+
+def select_columns(fields: Optional[str], default: str, key: str = "id") -> str:
+    """Build a PostgREST select list from a comma separated ``fields`` parameter.
+
+    The keyset column is always included so the next cursor can be built.
+
+    Raises:
+        ValueError: if a field is not a plain column name.
+    """
+    if not fields:
+        return default
+    columns: List[str] = []
+    for name in (part.strip() for part in fields.split(",")):
+        if not name:
+            continue
+        check_column(name)
+        if name not in columns:
+            columns.append(name)
+    if key not in columns:
+        columns.insert(0, key)
+    return ", ".join(columns)
+
+
+class Page:
+    """One page of rows plus the cursor for the next page."""
+
+    def __init__(self, rows: Sequence[Dict[str, Any]], next_cursor: Optional[str], total: Optional[int]) -> None:
+        self.rows = list(rows)
+        self.next_cursor = next_cursor
+        self.total = total
+
+
+async def fetch_page(
+    table: Any,
+    columns: str,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    key: str = "id",
+    count: bool = False,
+) -> Page:
+    """Fetch one keyset page from an async PostgREST table builder.
+
+    Args:
+        table: The result of ``client.table(name)``.
+        columns: Select list; must contain ``key``.
+        cursor: Cursor returned with the previous page, if any.
+        limit: Page size.
+        key: Unique, ordered column to page on.
+        count: Also return the exact row count (an extra full scan).
+
+    Raises:
+        ValueError: if ``cursor`` is malformed.
+    """
+    query = table.select(columns, count="exact") if count else table.select(columns)
+    if cursor:
+        position = decode_cursor(cursor)
+        if key not in position:
+            raise ValueError("invalid cursor")
+        query = query.gt(key, position[key])
+    # One extra row tells us whether another page exists without a count.
+    response = await query.order(key, desc=False).limit(limit + 1).execute()
+    rows = response.data or []
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor({key: rows[-1][key]})
+    return Page(rows, next_cursor, response.count if count else None)
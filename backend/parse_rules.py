@@ -0,0 +1,575 @@
+"""Compiled ``parse_rules`` for scraper jobs.
+
+A job's ``parse_rules`` maps output field names to selectors::
+
+    {
+        "title": "head > title::text",
+        "prices": {"selector": "div.product span.price::text", "all": true},
+        "logo": "img#logo::attr(src)",
+        "total": "$.meta.total",
+        "names": {"selector": "$.items[*].name", "all": true}
+    }
+
+Selectors starting with ``$`` are JSON paths and apply to JSON responses;
+anything else is a CSS selector and applies to HTML.  A field takes the
+first match, or ``None`` if nothing matches.  With ``"all": true`` it takes
+a list of every match.
+
+The CSS subset covers type, ``#id``, ``.class`` and ``[attr]`` selectors
+(``=``, ``~=``, ``^=``, ``$=`` and ``*=`` comparisons) joined by descendant
+or ``>`` child combinators.  A trailing ``::text`` (the default) extracts
+the element's text and ``::attr(name)`` an attribute.  The JSON path subset
+covers ``.key``, ``['key']``, ``[n]``, ``[*]`` and ``.*`` steps.
+
+Rules are compiled once and kept in a small cache keyed by the SHA‑256 of
+their canonical JSON, so a job that runs every few minutes reuses its
+compiled selectors.  Documents are never turned into a tree.  HTML is fed
+through ``html.parser`` in chunks and matched against the stack of open
+elements.  JSON is scanned in place down to the values a path selects.
+Array elements are decoded one at a time, and the rest of the path is
+applied to each before it is dropped, so memory is bounded by the largest
+element rather than the document.  Both stop reading as soon as every
+first‑match field has a value.
+"""
+
+import codecs
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+from json.decoder import scanstring
+from typing import Any, Dict, List, Optional, Tuple
+
+CACHE_SIZE = 256
+CHUNK_SIZE = 64 * 1024
+
+# Elements that never have content or an end tag.
+_VOID = frozenset(
+    "area base br col embed hr img input link meta param source track wbr".split()
+)
+# Elements whose end tag may be omitted: an open one is closed by the next
+# sibling of the same kind, as in ``<li>a<li>b``.
+_IMPLIED_END = {
+    "li": ("li",), "p": ("p",), "option": ("option",), "tr": ("tr",),
+    "td": ("td", "th"), "th": ("td", "th"), "dt": ("dt", "dd"), "dd": ("dt", "dd"),
+}
+
+
+class _Done(Exception):
+    """Raised inside a parser once every first‑match field is filled."""
+
+
+# -- CSS ----------------------------------------------------------------------
+
+_PSEUDO = re.compile(r"::(?:(text)|attr\(\s*([\w:-]+)\s*\))\s*$")
+_CSS_TOKEN = re.compile(
+    r"""\s*(?P<child>>)\s*
+      | (?P<space>\s+)
+      | (?P<tag>[A-Za-z][\w-]*|\*)
+      | \#(?P<id>[\w-]+)
+      | \.(?P<cls>[\w-]+)
+      | \[\s*(?P<attr>[\w:-]+)\s*
+          (?:(?P<op>[~^$*]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\]\s]+))\s*)?
+        \]""",
+    re.VERBOSE,
+)
+
+
+class _Compound:
+    """One compound selector such as ``div.card[data-id]``."""
+
+    __slots__ = ("tag", "id", "classes", "attrs", "combinator", "universal")
+
+    def __init__(self) -> None:
+        self.universal = False
+        self.tag: Optional[str] = None
+        self.id: Optional[str] = None
+        self.classes: Tuple[str, ...] = ()
+        self.attrs: Tuple[Tuple[str, Optional[str], Optional[str]], ...] = ()
+        # How this compound relates to the one before it: " " or ">".
+        self.combinator = " "
+
+    def empty(self) -> bool:
+        return not self.universal and self.tag is None and self.id is None and not self.classes and not self.attrs
+
+    def matches(self, tag: str, attrs: Dict[str, Optional[str]]) -> bool:
+        if self.tag is not None and self.tag != tag:
+            return False
+        if self.id is not None and attrs.get("id") != self.id:
+            return False
+        if self.classes:
+            present = (attrs.get("class") or "").split()
+            if any(name not in present for name in self.classes):
+                return False
+        for name, op, value in self.attrs:
+            if name not in attrs:
+                return False
+            if op is None:
+                continue
+            actual = attrs[name] or ""
+            if op == "=" and actual != value:
+                return False
+            if op == "~=" and value not in actual.split():
+                return False
+            if op == "^=" and not actual.startswith(value):
+                return False
+            if op == "$=" and not actual.endswith(value):
+                return False
+            if op == "*=" and value not in actual:
+                return False
+        return True
+
+
+class CssSelector:
+    """A compiled CSS selector with its extraction (text or an attribute)."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.attribute: Optional[str] = None
+        pseudo = _PSEUDO.search(text)
+        body = text[: pseudo.start()] if pseudo else text
+        if pseudo and pseudo.group(2):
+            self.attribute = pseudo.group(2).lower()
+        self.parts = self._parse(body.strip())
+
+    def _parse(self, body: str) -> List[_Compound]:
+        if not body:
+            raise ValueError(f"empty CSS selector {self.text!r}")
+        parts = [_Compound()]
+        pos = 0
+        while pos < len(body):
+            match = _CSS_TOKEN.match(body, pos)
+            if match is None or match.end() == pos:
+                raise ValueError(f"unsupported CSS selector {self.text!r} at {body[pos:]!r}")
+            pos = match.end()
+            kind = match.lastgroup if match.lastgroup not in ("op", "dq", "sq", "bare") else "attr"
+            current = parts[-1]
+            if kind in ("child", "space"):
+                if current.empty():
+                    raise ValueError(f"dangling combinator in CSS selector {self.text!r}")
+                parts.append(_Compound())
+                parts[-1].combinator = ">" if kind == "child" else " "
+            elif kind == "tag":
+                if not current.empty():
+                    raise ValueError(f"type selector must come first in {self.text!r}")
+                current.universal = match.group("tag") == "*"
+                current.tag = None if current.universal else match.group("tag").lower()
+            elif kind == "id":
+                current.id = match.group("id")
+            elif kind == "cls":
+                current.classes = current.classes + (match.group("cls"),)
+            else:
+                value = next((v for v in match.group("dq", "sq", "bare") if v is not None), None)
+                current.attrs = current.attrs + ((match.group("attr").lower(), match.group("op"), value),)
+        if parts[-1].empty():
+            raise ValueError(f"dangling combinator in CSS selector {self.text!r}")
+        return parts
+
+    @property
+    def key_tag(self) -> Optional[str]:
+        """Type of the element the selector picks, or ``None`` for any."""
+        return self.parts[-1].tag
+
+    def matches(self, stack: List[Tuple[str, Dict[str, Optional[str]]]]) -> bool:
+        """Whether the innermost element of ``stack`` is selected."""
+        return self._match(len(self.parts) - 1, stack, len(stack) - 1)
+
+    def _match(self, i: int, stack: List[Tuple[str, Dict[str, Optional[str]]]], j: int) -> bool:
+        if not self.parts[i].matches(*stack[j]):
+            return False
+        if i == 0:
+            return True
+        if self.parts[i].combinator == ">":
+            return j > 0 and self._match(i - 1, stack, j - 1)
+        return any(self._match(i - 1, stack, k) for k in range(j - 1, -1, -1))
+
+
+class _HtmlExtractor(HTMLParser):
+    """Streams HTML and records matches without building a tree."""
+
+    def __init__(self, rules: "RuleSet") -> None:
+        super().__init__(convert_charrefs=True)
+        self.rules = rules
+        self.all_fields = rules.css_all
+        self.values: Dict[str, Any] = {name: [] for name in self.all_fields}
+        self.pending = set(rules.css_first)
+        self.stack: List[Tuple[str, Dict[str, Optional[str]]]] = []
+        # Open text captures: [field, stack depth, list slot or None, text pieces].
+        # A capture claims its slot at the start tag, so values keep document order.
+        self.captures: List[List[Any]] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        implied = _IMPLIED_END.get(tag)
+        if implied:
+            for depth in range(len(self.stack) - 1, -1, -1):
+                if self.stack[depth][0] in implied:
+                    self._close(depth)
+                    break
+                if tag != "tr" or self.stack[depth][0] not in ("td", "th"):
+                    break
+        self.stack.append((tag, dict(attrs)))
+        selectors = self.rules.css_by_tag.get(tag)
+        if selectors:
+            self._select(selectors)
+        if self.rules.css_any:
+            self._select(self.rules.css_any)
+        if tag in _VOID:
+            self._close(len(self.stack) - 1)
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID:
+            self._close(len(self.stack) - 1)
+
+    def handle_endtag(self, tag: str) -> None:
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth][0] == tag:
+                self._close(depth)
+                return
+
+    def handle_data(self, data: str) -> None:
+        for capture in self.captures:
+            capture[3].append(data)
+
+    def _select(self, selectors: List[Tuple[str, CssSelector]]) -> None:
+        attrs = self.stack[-1][1]
+        for name, selector in selectors:
+            many = name in self.all_fields
+            if not many and name not in self.pending:
+                continue
+            if not selector.matches(self.stack):
+                continue
+            if selector.attribute is not None:
+                value = attrs.get(selector.attribute)
+                if value is None:
+                    continue
+                if many:
+                    self.values[name].append(value)
+                else:
+                    self.values[name] = value
+                    self.pending.discard(name)
+                continue
+            slot = None
+            if many:
+                slot = len(self.values[name])
+                self.values[name].append("")
+            else:
+                self.pending.discard(name)
+            self.captures.append([name, len(self.stack), slot, []])
+        self._check_done()
+
+    def _close(self, depth: int) -> None:
+        """Pop the stack back to ``depth``, finishing captures inside it."""
+        del self.stack[depth:]
+        while self.captures and self.captures[-1][1] > depth:
+            name, _, slot, pieces = self.captures.pop()
+            text = " ".join("".join(pieces).split())
+            if slot is None:
+                self.values[name] = text
+            else:
+                self.values[name][slot] = text
+        self._check_done()
+
+    def _check_done(self) -> None:
+        if not self.pending and not self.captures and not self.all_fields:
+            raise _Done
+
+    def finish(self) -> None:
+        self._close(0)
+
+
+# -- JSON ---------------------------------------------------------------------
+
+_JSON_STEP = re.compile(r"""\.(?P<key>[A-Za-z_][\w-]*)|\.\*|\[\s*(?:(?P<index>\d+)|\*|'(?P<sq>[^']*)'|"(?P<dq>[^"]*)")\s*\]""")
+_WILD = ("*",)
+_WS = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+_DECODER = json.JSONDecoder()
+
+
+def compile_json_path(text: str) -> Tuple[Any, ...]:
+    """Return the steps of a JSON path: keys, indexes and ``("*",)``."""
+    if not text.startswith("$"):
+        raise ValueError(f"JSON path {text!r} must start with $")
+    steps: List[Any] = []
+    pos = 1
+    while pos < len(text):
+        match = _JSON_STEP.match(text, pos)
+        if match is None:
+            raise ValueError(f"unsupported JSON path {text!r} at {text[pos:]!r}")
+        pos = match.end()
+        if match.group("key") is not None:
+            steps.append(match.group("key"))
+        elif match.group("index") is not None:
+            steps.append(int(match.group("index")))
+        elif match.group("sq") is not None or match.group("dq") is not None:
+            steps.append(match.group("sq") if match.group("sq") is not None else match.group("dq"))
+        else:
+            steps.append(_WILD)
+    return tuple(steps)
+
+
+class _PathNode:
+    """Trie of compiled JSON paths; ``fields`` end at this node."""
+
+    __slots__ = ("children", "fields")
+
+    def __init__(self) -> None:
+        self.children: Dict[Any, "_PathNode"] = {}
+        self.fields: List[str] = []
+
+
+class _JsonExtractor:
+    """Scans JSON text, decoding only the values a path selects."""
+
+    def __init__(self, rules: "RuleSet", text: str) -> None:
+        self.rules = rules
+        self.text = text
+        self.all_fields = rules.json_all
+        self.values: Dict[str, Any] = {name: [] for name in self.all_fields}
+        self.pending = set(rules.json_first)
+
+    def run(self) -> None:
+        self.value(_WS.match(self.text, 0).end(), [self.rules.json_root])
+
+    def value(self, pos: int, nodes: List[_PathNode]) -> int:
+        """Consume the value at ``pos`` for the trie ``nodes`` it is reached by."""
+        if not any(node.fields for node in nodes):
+            char = self.text[pos:pos + 1]
+            if char == "{":
+                return self._object(pos, nodes)
+            if char == "[":
+                return self._array(pos, nodes)
+        return self._decode(pos, nodes)
+
+    def _object(self, pos: int, nodes: List[_PathNode]) -> int:
+        pos = _WS.match(self.text, pos + 1).end()
+        if self.text[pos] == "}":
+            return pos + 1
+        while True:
+            key, pos = scanstring(self.text, self._expect(pos, '"'))
+            pos = _WS.match(self.text, self._expect(_WS.match(self.text, pos).end(), ":")).end()
+            children = [c for node in nodes for c in (node.children.get(key), node.children.get(_WILD)) if c]
+            pos = self.value(pos, children) if children else self._skip(pos)
+            pos = _WS.match(self.text, pos).end()
+            if self.text[pos] == "}":
+                return pos + 1
+            pos = _WS.match(self.text, self._expect(pos, ",")).end()
+
+    def _array(self, pos: int, nodes: List[_PathNode]) -> int:
+        pos = _WS.match(self.text, pos + 1).end()
+        if self.text[pos] == "]":
+            return pos + 1
+        index = 0
+        while True:
+            children = [c for node in nodes for c in (node.children.get(index), node.children.get(_WILD)) if c]
+            if not children:
+                pos = self._skip(pos)
+            elif self.text[pos] == "[":
+                pos = self.value(pos, children)
+            else:
+                # Elements are small next to the array: decoding one in C and
+                # walking the rest of the path in memory beats scanning it.
+                pos = self._decode(pos, children)
+            pos = _WS.match(self.text, pos).end()
+            if self.text[pos] == "]":
+                return pos + 1
+            pos = _WS.match(self.text, self._expect(pos, ",")).end()
+            index += 1
+
+    def _expect(self, pos: int, char: str) -> int:
+        """Return the position after ``char``, which must be at ``pos``.
+
+        Raises:
+            ValueError: if something else is there.
+        """
+        if self.text[pos] != char:
+            raise ValueError(f"malformed JSON document: expected {char!r} at offset {pos}")
+        return pos + 1
+
+    def _decode(self, pos: int, nodes: List[_PathNode]) -> int:
+        """Decode the value at ``pos`` and apply the rest of each path to it."""
+        decoded, end = _DECODER.raw_decode(self.text, pos)
+        for node in nodes:
+            self._apply(decoded, node)
+        return end
+
+    def _apply(self, value: Any, node: _PathNode) -> None:
+        for name in node.fields:
+            self._record(name, value)
+        for step, child in node.children.items():
+            if step is _WILD:
+                items = value.values() if isinstance(value, dict) else value if isinstance(value, list) else ()
+            elif isinstance(step, int):
+                items = value[step:step + 1] if isinstance(value, list) else ()
+            else:
+                items = (value[step],) if isinstance(value, dict) and step in value else ()
+            for item in items:
+                self._apply(item, child)
+
+    def _skip(self, pos: int) -> int:
+        """Return the end of the value at ``pos`` without keeping it.
+
+        Arrays are stepped through element by element, so at most one
+        element (or one object) of a skipped value is decoded at a time.
+        """
+        char = self.text[pos:pos + 1]
+        if char == '"':
+            return _STRING.match(self.text, pos).end()
+        if char != "[":
+            return _DECODER.raw_decode(self.text, pos)[1]
+        pos = _WS.match(self.text, pos + 1).end()
+        if self.text[pos] == "]":
+            return pos + 1
+        while True:
+            pos = _WS.match(self.text, self._skip(pos)).end()
+            if self.text[pos] == "]":
+                return pos + 1
+            pos = _WS.match(self.text, self._expect(pos, ",")).end()
+
+    def _record(self, name: str, value: Any) -> None:
+        if name in self.all_fields:
+            self.values[name].append(value)
+        elif name in self.pending:
+            self.values[name] = value
+            self.pending.discard(name)
+            if not self.pending and not self.all_fields:
+                raise _Done
+
+
+# -- Rule sets ----------------------------------------------------------------
+
+_JSON_START = re.compile(rb"\s*[\[{]")
+
+
+def _rule_parts(name: Any, rule: Any) -> Tuple[str, bool]:
+    if not isinstance(name, str) or not name:
+        raise ValueError("parse_rules field names must be non-empty strings")
+    if isinstance(rule, str):
+        return rule.strip(), False
+    if isinstance(rule, dict) and isinstance(rule.get("selector"), str) and set(rule) <= {"selector", "all"}:
+        if not isinstance(rule.get("all", False), bool):
+            raise ValueError(f"parse_rules field {name!r}: 'all' must be true or false")
+        return rule["selector"].strip(), rule.get("all", False)
+    raise ValueError(f"parse_rules field {name!r} must be a selector string or {{\"selector\": ..., \"all\": ...}}")
+
+
+class RuleSet:
+    """The compiled ``parse_rules`` of a job.
+
+    A rule set holds no per‑document state, so one instance is shared by
+    every run (and thread) that uses the same rules.
+    """
+
+    def __init__(self, rules: Dict[str, Any], digest: str) -> None:
+        self.digest = digest
+        self.css_by_tag: Dict[str, List[Tuple[str, CssSelector]]] = {}
+        self.css_any: List[Tuple[str, CssSelector]] = []
+        self.json_root = _PathNode()
+        css_first, css_all, json_first, json_all = set(), set(), set(), set()
+        for name, rule in rules.items():
+            selector, many = _rule_parts(name, rule)
+            if selector.startswith("$"):
+                node = self.json_root
+                for step in compile_json_path(selector):
+                    node = node.children.setdefault(step, _PathNode())
+                node.fields.append(name)
+                (json_all if many else json_first).add(name)
+            else:
+                css = CssSelector(selector)
+                if css.key_tag is None:
+                    self.css_any.append((name, css))
+                else:
+                    self.css_by_tag.setdefault(css.key_tag, []).append((name, css))
+                (css_all if many else css_first).add(name)
+        self.css_first, self.css_all = frozenset(css_first), frozenset(css_all)
+        self.json_first, self.json_all = frozenset(json_first), frozenset(json_all)
+
+    def apply(self, content: bytes, content_type: str = "", charset: str = "utf-8") -> Dict[str, Any]:
+        """Extract every field from a response body.
+
+        JSON paths run on JSON bodies (by ``content_type``, or by the first
+        byte when no type is given) and CSS selectors on everything else.
+        Fields of the other kind come back empty.
+
+        Raises:
+            ValueError: if a JSON body is malformed.
+        """
+        try:
+            codecs.lookup(charset)
+        except LookupError:
+            charset = "utf-8"
+        result: Dict[str, Any] = {}
+        for name in self.css_first | self.json_first:
+            result[name] = None
+        for name in self.css_all | self.json_all:
+            result[name] = []
+        is_json = "json" in content_type.lower() if content_type else bool(_JSON_START.match(content))
+        if is_json and (self.json_first or self.json_all):
+            result.update(self._apply_json(content.decode(charset, errors="replace")))
+        elif not is_json and (self.css_first or self.css_all):
+            result.update(self._apply_html(content, charset))
+        return result
+
+    def _apply_html(self, content: bytes, charset: str) -> Dict[str, Any]:
+        parser = _HtmlExtractor(self)
+        decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+        view = memoryview(content)
+        try:
+            for start in range(0, len(view), CHUNK_SIZE):
+                parser.feed(decoder.decode(view[start:start + CHUNK_SIZE]))
+            parser.feed(decoder.decode(b"", final=True))
+            parser.close()
+            parser.finish()
+        except _Done:
+            pass
+        return parser.values
+
+    def _apply_json(self, text: str) -> Dict[str, Any]:
+        extractor = _JsonExtractor(self, text)
+        try:
+            extractor.run()
+        except _Done:
+            pass
+        except IndexError:
+            raise ValueError("truncated JSON document")
+        return extractor.values
+
+
+_cache: "OrderedDict[str, RuleSet]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def rules_digest(rules: Dict[str, Any]) -> str:
+    """Return the SHA‑256 of the canonical JSON form of ``rules``."""
+    try:
+        canonical = json.dumps(rules, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"parse_rules must be JSON: {exc}")
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def compile_rules(rules: Dict[str, Any]) -> RuleSet:
+    """Return the compiled form of ``rules``, compiling them on first use.
+
+    The last `CACHE_SIZE` rule sets are kept, keyed by :func:`rules_digest`.
+
+    Raises:
+        ValueError: if a rule or selector is malformed or unsupported.
+    """
+    if not isinstance(rules, dict):
+        raise ValueError("parse_rules must be an object mapping field names to selectors")
+    digest = rules_digest(rules)
+    with _cache_lock:
+        compiled = _cache.get(digest)
+        if compiled is not None:
+            _cache.move_to_end(digest)
+            return compiled
+    compiled = RuleSet(rules, digest)
+    with _cache_lock:
+        _cache[digest] = compiled
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
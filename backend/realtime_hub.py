@@ -0,0 +1,200 @@
+"""Fan‑out hub streaming swarm changes to dashboard clients.
+
+Every open cockpit used to poll Supabase on its own.  :class:`FeedHub` keeps a
+single upstream change feed per handshake server process and multiplexes it
+to any number of WebSocket and Server‑Sent Events clients, each subscribed to
+the topics (and optionally the agent) it cares about.
+
+The upstream feed is Postgres ``LISTEN swarm_feed`` (see
+``migrations/realtime_feed.sql``) when `SUPABASE_DB_URL` is set and
+``psycopg`` is installed.  Otherwise the hub polls the tables for rows with a
+higher ``id`` than the last one seen, once for all clients and only while
+someone is subscribed.
+
+Each client has a bounded queue.  When a slow consumer's queue is full the
+oldest event is discarded and the client is told how many it missed, so a
+stalled browser tab never holds up delivery to the others.
+
+Configuration (environment):
+
+* `SUPABASE_DB_URL` – Postgres connection string for ``LISTEN``
+* `REALTIME_QUEUE_SIZE` – Events buffered per client (default 100)
+* `REALTIME_POLL_INTERVAL` – Seconds between polls without ``LISTEN`` (default 2)
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from .supabase_async import get_client
+
+try:
+    import psycopg  # type: ignore
+except ImportError:
+    psycopg = None  # type: ignore
+
+CHANNEL = "swarm_feed"
+TOPICS = ("agent_logs", "swarm_state", "swarm_activity")
+
+# (topic, JSON text).  Events are serialised once when published rather than
+# once per client.
+Event = Tuple[str, str]
+
+
+def parse_topics(spec: Optional[str]) -> Set[str]:
+    """Parse a comma separated topic list; empty means all topics.
+
+    Raises:
+        ValueError: if an unknown topic is requested.
+    """
+    if not spec:
+        return set(TOPICS)
+    topics = {topic.strip() for topic in spec.split(",") if topic.strip()}
+    unknown = topics - set(TOPICS)
+    if unknown:
+        raise ValueError(f"unknown topics {sorted(unknown)}; expected {list(TOPICS)}")
+    return topics
+
+
+class Subscription:
+    """A client's topic filter and bounded event queue."""
+
+    def __init__(self, topics: Iterable[str], agent: Optional[str], queue_size: int) -> None:
+        self.topics = set(topics)
+        self.agent = agent
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def wants(self, topic: str, row: Dict[str, Any]) -> bool:
+        if topic not in self.topics:
+            return False
+        # The agent filter only applies to per‑agent topics.
+        return self.agent is None or topic != "agent_logs" or row.get("agent") == self.agent
+
+    def offer(self, event: Event) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def next_event(self) -> Event:
+        """Return the next event, preceded by a ``lagged`` notice after drops."""
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            return "lagged", json.dumps({"topic": "lagged", "dropped": dropped})
+        return await self.queue.get()
+
+
+class FeedHub:
+    """One upstream change feed multiplexed to many subscribers."""
+
+    def __init__(self, queue_size: Optional[int] = None, poll_interval: Optional[float] = None) -> None:
+        self.queue_size = queue_size or int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
+        self.poll_interval = poll_interval or float(os.getenv("REALTIME_POLL_INTERVAL", "2"))
+        self._subscribers: Set[Subscription] = set()
+        self._has_subscribers = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"published": 0, "delivered": 0, "dropped": 0}
+
+    # -- subscribers ----------------------------------------------------------
+
+    def subscribe(self, topics: Iterable[str], agent: Optional[str] = None) -> Subscription:
+        subscription = Subscription(topics, agent, self.queue_size)
+        self._subscribers.add(subscription)
+        self._has_subscribers.set()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+        if not self._subscribers:
+            self._has_subscribers.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "subscribers": len(self._subscribers)}
+
+    def publish(self, topic: str, row: Dict[str, Any]) -> None:
+        """Deliver a row to every subscriber of ``topic`` without blocking."""
+        self.counters["published"] += 1
+        event: Optional[Event] = None
+        for subscription in list(self._subscribers):
+            if subscription.wants(topic, row):
+                if event is None:
+                    event = (topic, json.dumps({"topic": topic, "row": row}, default=str))
+                before = subscription.dropped
+                subscription.offer(event)
+                self.counters["delivered"] += 1
+                self.counters["dropped"] += subscription.dropped - before
+
+    # -- upstream -------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the upstream feed on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        dsn = os.getenv("SUPABASE_DB_URL")
+        while True:
+            try:
+                if dsn and psycopg is not None:
+                    await self._listen(dsn)
+                else:
+                    await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[realtime_hub] feed interrupted: {exc}")
+            await asyncio.sleep(5)
+
+    async def _listen(self, dsn: str) -> None:
+        conn = await psycopg.AsyncConnection.connect(dsn, autocommit=True)
+        async with conn:
+            await conn.execute(f"LISTEN {CHANNEL}")
+            async for notify in conn.notifies():
+                try:
+                    message = json.loads(notify.payload)
+                except ValueError:
+                    continue
+                row = message.get("row")
+                if row is None:
+                    row = await self._fetch_row(message.get("topic"), message.get("id"))
+                if row is not None and message.get("topic") in TOPICS:
+                    self.publish(message["topic"], row)
+
+    async def _fetch_row(self, topic: Optional[str], row_id: Any) -> Optional[Dict[str, Any]]:
+        if topic not in TOPICS or row_id is None:
+            return None
+        client = await get_client()
+        response = await client.table(topic).select("*").eq("id", row_id).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    async def _poll(self) -> None:
+        client = await get_client()
+        last_ids: Dict[str, Any] = {}
+        while True:
+            if not self._has_subscribers.is_set():
+                # Nobody is listening; forget our position so a new client
+                # does not receive a backlog of stale rows.
+                last_ids.clear()
+                await self._has_subscribers.wait()
+            for topic in TOPICS:
+                query = client.table(topic).select("*")
+                if topic not in last_ids:
+                    response = await query.order("id", desc=True).limit(1).execute()
+                    last_ids[topic] = response.data[0]["id"] if response.data else 0
+                    continue
+                response = await query.gt("id", last_ids[topic]).order("id", desc=False).limit(500).execute()
+                for row in response.data or []:
+                    last_ids[topic] = row["id"]
+                    self.publish(topic, row)
+            await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,213 @@
+"""In‑memory response cache for the handshake server's dashboard routes.
+
+The Next.js cockpit polls the same handful of read endpoints from every open
+dashboard, and most polls return identical data.  :class:`ResponseCache`,
+installed with :class:`CacheMiddleware`, keeps successful ``GET`` responses
+of configured routes for a per‑route TTL, bounded by total body size with
+least‑recently‑used eviction.  Concurrent misses for the same URL share one upstream request.
+
+Every cached or freshly computed response carries an ``ETag``; a request whose
+``If-None-Match`` matches gets ``304 Not Modified`` without a body.  Routes
+that write data call :meth:`ResponseCache.invalidate` with the paths they
+affect.  Invalidation is per process, so with several replicas the TTL bounds
+how long another replica may serve the previous data.
+
+Configuration (environment):
+
+* `RESPONSE_CACHE_TTLS` – Overrides for route TTLs in seconds, e.g.
+  ``/api/metrics=120,/api/agents=0`` (0 disables caching for a route)
+* `RESPONSE_CACHE_MAX_BYTES` – Memory bound for cached bodies (default 16 MiB)
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+CacheKey = Tuple[str, str]
+
+
+def _parse_ttls(spec: str) -> Dict[str, float]:
+    ttls: Dict[str, float] = {}
+    for item in spec.split(","):
+        path, sep, seconds = item.strip().partition("=")
+        if sep and path:
+            try:
+                ttls[path.strip()] = float(seconds)
+            except ValueError:
+                print(f"[response_cache] ignoring invalid TTL {item!r}")
+    return ttls
+
+
+class _Entry:
+    __slots__ = ("expires", "status", "headers", "body", "etag")
+
+    def __init__(self, expires: float, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, etag: str) -> None:
+        self.expires = expires
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+
+
+class ResponseCache:
+    """Cache of ``GET`` responses per route with TTL and LRU bounds."""
+
+    def __init__(self, ttls: Dict[str, float], max_bytes: Optional[int] = None) -> None:
+        self.ttls = {**ttls, **_parse_ttls(os.getenv("RESPONSE_CACHE_TTLS", ""))}
+        self.max_bytes = max_bytes or int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        # Bumped on invalidation so a fetch that started before a write does
+        # not store its (possibly stale) result afterwards.
+        self._generations: Dict[str, int] = {}
+        self.counters = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0, "invalidations": 0}
+
+    # -- bookkeeping ----------------------------------------------------------
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current cache size."""
+        return {**self.counters, "entries": len(self._entries), "bytes": self._size}
+
+    def invalidate(self, *paths: str) -> None:
+        """Drop every cached response for ``paths`` (all query strings)."""
+        for path in paths:
+            self._generations[path] = self._generations.get(path, 0) + 1
+            for key in [k for k in self._entries if k[0] == path]:
+                self._remove(key)
+                self.counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        self.invalidate(*{key[0] for key in self._entries})
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry.body)
+
+    def _store(self, key: CacheKey, entry: _Entry) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = entry
+        self._size += len(entry.body)
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.counters["evictions"] += 1
+
+    def _lookup(self, key: CacheKey) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    # -- ASGI -----------------------------------------------------------------
+
+    async def serve(self, app: Any, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        """Answer ``scope`` from the cache or by running ``app``."""
+        if scope["type"] != "http" or scope["method"] != "GET" or self.ttls.get(scope["path"], 0) <= 0:
+            await app(scope, receive, send)
+            return
+        path = scope["path"]
+        query = b"&".join(sorted(scope.get("query_string", b"").split(b"&"))).decode("latin-1")
+        key = (path, query)
+        if_none_match = None
+        for name, value in scope.get("headers", []):
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+
+        entry = self._lookup(key)
+        while entry is None and key in self._inflight:
+            # Another request is already fetching this URL; share its result.
+            await asyncio.shield(self._inflight[key])
+            entry = self._lookup(key)
+        if entry is not None:
+            self.counters["hits"] += 1
+            await self._send_entry(entry, if_none_match, send)
+            return
+
+        self.counters["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generations.get(path, 0)
+        try:
+            entry = await self._fetch(app, scope, receive, path)
+            if entry is not None and entry.status == 200 and self._generations.get(path, 0) == generation:
+                self._store(key, entry)
+        finally:
+            del self._inflight[key]
+            future.set_result(None)
+        if entry is None:
+            return
+        await self._send_entry(entry, if_none_match, send)
+
+    async def _fetch(self, app: Any, scope: Dict[str, Any], receive: Any, path: str) -> Optional[_Entry]:
+        """Run the route and capture its response.
+
+        Non‑200 responses are captured too so the caller can relay them, but
+        they are never stored.
+        """
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+
+        async def capture(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await app(scope, receive, capture)
+        if not start:
+            return None
+        body = b"".join(chunks)
+        headers = [
+            (name, value)
+            for name, value in start.get("headers", [])
+            if name.lower() not in (b"content-length", b"etag", b"cache-control")
+        ]
+        status = start.get("status", 200)
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        expires = time.monotonic() + self.ttls[path] if status == 200 else 0.0
+        return _Entry(expires, status, headers, body, etag)
+
+    async def _send_entry(self, entry: _Entry, if_none_match: Optional[str], send: Any) -> None:
+        if entry.status == 200 and if_none_match is not None and entry.etag in (
+            tag.strip() for tag in if_none_match.split(",")
+        ):
+            self.counters["not_modified"] += 1
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", entry.etag.encode()), (b"cache-control", b"no-cache")],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = list(entry.headers)
+        headers.append((b"content-length", str(len(entry.body)).encode()))
+        if entry.status == 200:
+            # Let browsers keep the body but revalidate on every poll so
+            # invalidated data is never served from their cache.
+            headers.append((b"etag", entry.etag.encode()))
+            headers.append((b"cache-control", b"no-cache"))
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
+
+
+class CacheMiddleware:
+    """ASGI middleware routing requests through a shared :class:`ResponseCache`."""
+
+    def __init__(self, app: Any, cache: ResponseCache) -> None:
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        await self.cache.serve(self.app, scope, receive, send)
@@ -0,0 +1,300 @@
+"""HTTP layer for the unified scraper: shared pool, conditional GET and disk cache.
+
+Every scraper job fetches through one :class:`ScraperHttp` per run.  It holds
+a single keep‑alive ``httpx.AsyncClient``, so jobs against the same host
+reuse connections, and it paces requests per host with
+``scraper_schedule.HostLimiter``.
+
+Responses that carry an ``ETag`` or ``Last-Modified`` header are kept in a
+:class:`DiskCache`.  The next request for the same URL sends
+``If-None-Match`` / ``If-Modified-Since``.  A ``304 Not Modified`` answer
+has no body, and the result is flagged ``not_modified`` so callers can skip
+parsing and writing altogether.  The cached body is still available if a
+caller needs it.  A caller that must store what it fetched before the
+validators are trusted passes ``hold=<key>`` and later calls
+:meth:`ScraperHttp.commit` (or :meth:`ScraperHttp.discard`) with that key;
+otherwise a failed store would be followed by a 304 and never retried.
+The cache evicts the least recently used entries once it exceeds its size
+bound, and stores bodies gzip‑compressed.  ``gzip`` and
+``deflate`` responses are decoded by ``httpx``.  ``br`` and ``zstd`` are
+also accepted when the ``brotli`` or ``zstandard`` packages are installed.
+
+Configuration (environment):
+
+* `SCRAPER_CACHE_DIR` – Cache directory (default ``infinityx-scraper-cache``
+  under the system temp dir; set to ``off`` to disable caching)
+* `SCRAPER_CACHE_MAX_BYTES` – Size bound of the cache on disk (default 256 MiB)
+* `SCRAPER_MAX_CONNECTIONS` – Connections in the shared pool (default 20)
+* `SCRAPER_HTTP_TIMEOUT` – Per‑request timeout in seconds (default 30)
+* `SCRAPER_USER_AGENT` – ``User-Agent`` sent with every request
+"""
+
+import asyncio
+import codecs
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .scraper_schedule import HostLimiter
+
+try:
+    import httpx  # type: ignore
+except ImportError:
+    httpx = None  # type: ignore
+
+
+class DiskCache:
+    """Size‑bounded, least‑recently‑used cache of HTTP responses on disk.
+
+    Each entry is a ``<key>.json`` file with the URL, validators and headers,
+    and a ``<key>.body.gz`` file with the compressed body.  The key is the
+    SHA‑256 of the URL.  Recency is the file modification time, so the LRU
+    order survives restarts.
+    """
+
+    def __init__(self, root: str, max_bytes: Optional[int] = None) -> None:
+        self.root = root
+        self.max_bytes = max_bytes or int(os.getenv("SCRAPER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+        self._lock = threading.Lock()
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        os.makedirs(root, exist_ok=True)
+        entries = []
+        for item in os.scandir(root):
+            if item.name.endswith(".body.gz"):
+                key = item.name[: -len(".body.gz")]
+                stat = item.stat()
+                entries.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+            self._total += size
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        return os.path.join(self.root, key + ".json"), os.path.join(self.root, key + ".body.gz")
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the stored metadata for ``url``, or ``None``."""
+        meta_path, _ = self._paths(self.key(url))
+        try:
+            with open(meta_path) as handle:
+                meta = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url else None
+
+    def body(self, url: str) -> bytes:
+        """Return the stored body for ``url`` and mark the entry as recently used."""
+        key = self.key(url)
+        _, body_path = self._paths(key)
+        with open(body_path, "rb") as handle:
+            content = gzip.decompress(handle.read())
+        self.touch(url)
+        return content
+
+    def touch(self, url: str) -> None:
+        key = self.key(url)
+        try:
+            os.utime(self._paths(key)[1])
+        except OSError:
+            return
+        with self._lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+
+    def store(self, url: str, meta: Dict[str, Any], content: bytes) -> None:
+        """Store a response, evicting old entries to stay within ``max_bytes``."""
+        key = self.key(url)
+        meta_path, body_path = self._paths(key)
+        compressed = gzip.compress(content, compresslevel=6)
+        if len(compressed) > self.max_bytes:
+            return
+        for path, data in ((body_path, compressed), (meta_path, json.dumps({**meta, "url": url}).encode())):
+            # Write to a temporary file first so a crash never leaves a torn entry.
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as handle:
+                handle.write(data)
+            os.replace(temporary, path)
+        with self._lock:
+            self._total += len(compressed) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(compressed)
+            while self._total > self.max_bytes and self._sizes:
+                oldest, size = self._sizes.popitem(last=False)
+                self._total -= size
+                for path in self._paths(oldest):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+
+def default_cache() -> Optional[DiskCache]:
+    """Return the cache configured by `SCRAPER_CACHE_DIR`, or ``None`` if disabled."""
+    root = os.getenv("SCRAPER_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "infinityx-scraper-cache")
+    if root.lower() in ("off", "none"):
+        return None
+    return DiskCache(root)
+
+
+class FetchResult:
+    """A fetched (or revalidated) response.
+
+    ``url`` is the final URL after redirects.  ``not_modified`` is ``True``
+    when the server answered 304; ``content`` is then read from the cache
+    entry for ``cache_url`` on first access.  ``headers`` describe the
+    content, while ``response_headers`` are those of the response actually
+    received (such as rate limit headers on a 304).
+    """
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], content: Optional[bytes],
+                 not_modified: bool = False, cache: Optional[DiskCache] = None, cache_url: str = "",
+                 response_headers: Any = None) -> None:
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.response_headers = response_headers if response_headers is not None else {}
+        self.not_modified = not_modified
+        self._content = content
+        self._cache = cache
+        self._cache_url = cache_url
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = self._cache.body(self._cache_url) if self._cache is not None else b""
+        return self._content
+
+    @property
+    def charset(self) -> str:
+        """Charset from the ``Content-Type`` header.
+
+        ``utf-8`` when the header names none, or one Python does not know.
+        """
+        for part in self.headers.get("content-type", "").split(";")[1:]:
+            name, _, value = part.strip().partition("=")
+            if name.lower() == "charset" and value:
+                charset = value.strip('"')
+                try:
+                    codecs.lookup(charset)
+                except LookupError:
+                    break
+                return charset
+        return "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.charset, errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class ScraperHttp:
+    """Shared HTTP client for one scraper run.
+
+    Use as an async context manager::
+
+        async with ScraperHttp(HostLimiter()) as http:
+            result = await http.get("https://example.com/")
+    """
+
+    def __init__(self, limiter: HostLimiter, cache: Optional[DiskCache] = None, client: Any = None,
+                 transport: Any = None) -> None:
+        if httpx is None:
+            raise RuntimeError("httpx is not installed; add `httpx` to your dependencies")
+        self.limiter = limiter
+        self.cache = cache
+        self.client = client or httpx.AsyncClient(
+            headers={"User-Agent": os.getenv("SCRAPER_USER_AGENT", "InfinityXOne-Scraper/1.0")},
+            limits=httpx.Limits(max_connections=int(os.getenv("SCRAPER_MAX_CONNECTIONS", "20"))),
+            timeout=float(os.getenv("SCRAPER_HTTP_TIMEOUT", "30")),
+            follow_redirects=True,
+            transport=transport,
+        )
+        self.stats = {"requests": 0, "not_modified": 0, "bytes": 0}
+        self._held: Dict[Any, List[Tuple[str, Dict[str, Any], bytes]]] = {}
+
+    async def __aenter__(self) -> "ScraperHttp":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.client.aclose()
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                  headers: Optional[Dict[str, str]] = None, variant: str = "", hold: Any = None) -> FetchResult:
+        """``GET`` a URL, revalidating a cached copy when there is one.
+
+        Cache entries are kept per ``variant`` as well as per URL.  A 304
+        only means the body was already seen under the same variant, so a
+        caller passes a different variant wherever the body ends up
+        somewhere else (another job or results table) or is processed
+        differently (such as new ``parse_rules``); its first fetch is then
+        a full one.  With
+        ``hold`` a new entry is not stored until :meth:`commit` is called
+        with the same key.
+
+        Raises:
+            httpx.HTTPStatusError: for error responses.
+        """
+        full_url = str(httpx.URL(url, params=params)) if params else url
+        cache_url = f"{full_url}#{variant}" if variant else full_url
+        cached = await asyncio.to_thread(self.cache.lookup, cache_url) if self.cache is not None else None
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached.get("etag"):
+                request_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                request_headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self.limiter.slot(urlsplit(full_url).hostname or ""):
+            response = await self.client.get(full_url, headers=request_headers)
+        self.stats["requests"] += 1
+
+        if response.status_code == 304 and cached is not None:
+            self.stats["not_modified"] += 1
+            await asyncio.to_thread(self.cache.touch, cache_url)
+            return FetchResult(
+                cached["final_url"], cached["status"], cached["headers"], None,
+                not_modified=True, cache=self.cache, cache_url=cache_url, response_headers=response.headers,
+            )
+        response.raise_for_status()
+        self.stats["bytes"] += len(response.content)
+        result_headers = {
+            name: response.headers[name] for name in ("content-type", "etag", "last-modified") if name in response.headers
+        }
+        validated = response.headers.get("etag") or response.headers.get("last-modified")
+        if self.cache is not None and validated and "no-store" not in response.headers.get("cache-control", ""):
+            meta = {
+                "final_url": str(response.url),
+                "status": response.status_code,
+                "headers": result_headers,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "stored_at": time.time(),
+            }
+            if hold is None:
+                await asyncio.to_thread(self.cache.store, cache_url, meta, response.content)
+            else:
+                self._held.setdefault(hold, []).append((cache_url, meta, response.content))
+        return FetchResult(
+            str(response.url), response.status_code, result_headers, response.content, response_headers=response.headers
+        )
+
+    async def commit(self, hold: Any) -> None:
+        """Store the cache entries fetched with ``hold=hold``."""
+        for cache_url, meta, content in self._held.pop(hold, []):
+            await asyncio.to_thread(self.cache.store, cache_url, meta, content)
+
+    def discard(self, hold: Any) -> None:
+        """Drop the cache entries fetched with ``hold=hold``; they are fetched in full next time."""
+        self._held.pop(hold, None)
@@ -0,0 +1,119 @@
+"""Scheduling primitives for the unified scraper.
+
+``scraper_jobs.frequency`` says how often a job should run.  It is either
+a named interval (``hourly``, ``daily``, ``weekly``, ``monthly``) or a count
+and unit such as ``15m``, ``6h`` or ``2d``.  A job is due once ``next_run_at``
+has passed.  The scraper worker sets ``next_run_at`` to ``last_run`` plus
+the frequency after every run, so the worker's CronJob only has to select
+due rows (see ``migrations/scraper_schedule.sql``).
+
+Jobs run concurrently under :func:`run_bounded`, which caps the number in
+flight and abandons any job that exceeds its timeout.  Requests are paced
+per target host by :class:`HostLimiter`, so many jobs against the same site
+do not hammer it, and a slow site only delays its own jobs.
+
+Configuration (environment):
+
+* `SCRAPER_CONCURRENCY` – Jobs run in parallel (default 8)
+* `SCRAPER_JOB_TIMEOUT` – Seconds before a job is abandoned (default 60)
+* `SCRAPER_HOST_INTERVAL` – Minimum seconds between requests to one host (default 1)
+* `SCRAPER_HOST_CONCURRENCY` – Requests in flight per host (default 2)
+"""
+
+import asyncio
+import datetime
+import os
+import re
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+NAMED_FREQUENCIES = {
+    "hourly": datetime.timedelta(hours=1),
+    "daily": datetime.timedelta(days=1),
+    "weekly": datetime.timedelta(weeks=1),
+    "monthly": datetime.timedelta(days=30),
+}
+_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+_COMPACT = re.compile(r"^(\d+)\s*([mhdw])$")
+
+
+def parse_frequency(frequency: str) -> datetime.timedelta:
+    """Return the interval between runs for a job ``frequency``.
+
+    Raises:
+        ValueError: if ``frequency`` is neither a named interval nor a
+            positive count with unit ``m``, ``h``, ``d`` or ``w``.
+    """
+    text = (frequency or "").strip().lower()
+    if text in NAMED_FREQUENCIES:
+        return NAMED_FREQUENCIES[text]
+    match = _COMPACT.match(text)
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(
+            f"invalid frequency {frequency!r}; use {', '.join(NAMED_FREQUENCIES)} or a count and unit such as 15m or 6h"
+        )
+    return datetime.timedelta(**{_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def next_run(frequency: str, last_run: datetime.datetime) -> datetime.datetime:
+    """Return when a job that last ran at ``last_run`` is due again."""
+    return last_run + parse_frequency(frequency)
+
+
+class HostLimiter:
+    """Per‑host politeness for concurrent scraping.
+
+    At most ``concurrency`` requests to a host are in flight, and request
+    starts to the same host are spaced at least ``interval`` seconds apart.
+    Different hosts never wait on each other.
+    """
+
+    def __init__(self, interval: Optional[float] = None, concurrency: Optional[int] = None) -> None:
+        self.interval = float(interval if interval is not None else os.getenv("SCRAPER_HOST_INTERVAL", "1"))
+        self.concurrency = int(concurrency or os.getenv("SCRAPER_HOST_CONCURRENCY", "2"))
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        """Wait for a turn to send one request to ``host``."""
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.concurrency))
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            start = max(now, self._next_start.get(host, now))
+            # Reserve the slot before sleeping so concurrent callers queue up behind it.
+            self._next_start[host] = start + self.interval
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+
+async def run_bounded(
+    items: List[Any],
+    worker: Callable[[Any], Awaitable[Any]],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> List[Tuple[Any, Any]]:
+    """Run ``worker(item)`` for every item, a bounded number at a time.
+
+    Args:
+        items: Work items, such as ``scraper_jobs`` rows.
+        worker: Coroutine function processing one item.
+        concurrency: Items in flight; defaults to `SCRAPER_CONCURRENCY`.
+        timeout: Seconds per item; defaults to `SCRAPER_JOB_TIMEOUT`.
+
+    Returns:
+        ``(item, outcome)`` pairs in input order.  The outcome is the
+        worker's return value, or the exception it raised
+        (``asyncio.TimeoutError`` when the item ran out of time).
+    """
+    semaphore = asyncio.Semaphore(int(concurrency or os.getenv("SCRAPER_CONCURRENCY", "8")))
+    seconds = float(timeout or os.getenv("SCRAPER_JOB_TIMEOUT", "60"))
+
+    async def one(item: Any) -> Any:
+        async with semaphore:
+            return await asyncio.wait_for(worker(item), seconds)
+
+    outcomes = await asyncio.gather(*(one(item) for item in items), return_exceptions=True)
+    return list(zip(items, outcomes))
@@ -0,0 +1,188 @@
+"""Asyncio variant of :mod:`supabase_utils`.
+
+The FastAPI handshake server runs every route on a single event loop, so it
+must not call the blocking Supabase client.  This module mirrors the helpers
+in ``supabase_utils`` with coroutine equivalents backed by supabase-py's
+``AsyncClient`` and a shared ``httpx.AsyncClient`` connection pool.  It reads
+the same environment variables, including the ``SUPABASE_POOL_*`` limits.
+
+Usage::
+
+    client = await get_client()
+    await insert_log("agent_logs", {"agent": "Guardian", "event": "ping"})
+"""
+
+import asyncio
+import datetime
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from .content_hash import LOOKUP_CHUNK, changed_rows
+from .supabase_utils import build_directive
+from .telemetry import instrument_async_transport
+from .tracing import inject_context, span
+
+try:
+    from supabase import AsyncClientOptions, acreate_client  # type: ignore
+except ImportError:
+    acreate_client = None  # type: ignore
+    AsyncClientOptions = None  # type: ignore
+
+try:
+    import httpx  # type: ignore
+except ImportError:
+    httpx = None  # type: ignore
+
+
+# One client per (url, key, pid).  Async clients are bound to the loop they
+# were created on, which for the handshake server is the Uvicorn loop.
+_clients: Dict[Tuple[str, str, int], Tuple[Any, Any]] = {}
+_clients_lock = asyncio.Lock()
+
+
+def _build_http_client() -> Any:
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30")),
+    )
+    return httpx.AsyncClient(
+        transport=instrument_async_transport(httpx.AsyncHTTPTransport(limits=limits)),
+        timeout=float(os.getenv("SUPABASE_HTTP_TIMEOUT", "30")),
+        follow_redirects=True,
+    )
+
+
+async def get_client():
+    """Return the process‑wide async Supabase client, creating it on first use.
+
+    Raises:
+        RuntimeError: if required environment variables are missing or the library is unavailable.
+    """
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in the environment")
+    if acreate_client is None or httpx is None:
+        raise RuntimeError(
+            "supabase library is not installed; add `supabase-py` to your dependencies"
+        )
+    registry_key = (url, key, os.getpid())
+    entry = _clients.get(registry_key)
+    if entry is not None:
+        return entry[0]
+    async with _clients_lock:
+        entry = _clients.get(registry_key)
+        if entry is None:
+            http_client = _build_http_client()
+            client = await acreate_client(url, key, options=AsyncClientOptions(httpx_client=http_client))
+            entry = (client, http_client)
+            _clients[registry_key] = entry
+    return entry[0]
+
+
+async def close_clients() -> None:
+    """Close the pooled HTTP connections of every client owned by this process."""
+    pid = os.getpid()
+    async with _clients_lock:
+        for registry_key, (_client, http_client) in list(_clients.items()):
+            if registry_key[2] == pid:
+                await http_client.aclose()
+            del _clients[registry_key]
+
+
+async def insert_log(table: str, data: Dict[str, Any]) -> None:
+    """Insert a row into a Supabase table, adding a `ts` timestamp.
+
+    Args:
+        table: The name of the Supabase table.
+        data: A dictionary of values to insert.  A `ts` field will be added automatically.
+    """
+    client = await get_client()
+    payload = data.copy()
+    payload.setdefault("ts", datetime.datetime.utcnow().isoformat())
+    await client.table(table).insert(payload).execute()
+
+
+async def upsert_changed(table: str, rows: List[Dict[str, Any]], scope: Dict[str, Any]) -> int:
+    """Write the new and changed rows of a fingerprinted batch in one upsert.
+
+    See :func:`supabase_utils.upsert_changed`; the stored hashes are looked
+    up with concurrent requests.
+    """
+    if not rows:
+        return 0
+    client = await get_client()
+    keys = list(dict.fromkeys(row["url_hash"] for row in rows))
+
+    async def lookup(chunk: List[str]) -> List[Dict[str, Any]]:
+        query = client.table(table).select("url_hash, content_hash")
+        for column, value in scope.items():
+            query = query.eq(column, value)
+        response = await query.in_("url_hash", chunk).execute()
+        return response.data or []
+
+    found = await asyncio.gather(*(lookup(keys[i:i + LOOKUP_CHUNK]) for i in range(0, len(keys), LOOKUP_CHUNK)))
+    stored = {row["url_hash"]: row["content_hash"] for chunk in found for row in chunk}
+    changed = changed_rows(rows, stored)
+    if changed:
+        await client.table(table).upsert(
+            changed, on_conflict=",".join([*scope, "url_hash"]), returning="minimal", default_to_null=False
+        ).execute()
+    return len(changed)
+
+
+async def fetch_pending_directives(agent: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Fetch pending directives for an agent ordered by creation time.
+
+    Args:
+        agent: The agent name to filter on.
+        limit: Optional maximum number of directives to return.
+    """
+    client = await get_client()
+    query = (
+        client.table("agent_directives")
+        .select("id, command, payload")
+        .eq("agent", agent)
+        .eq("status", "pending")
+        .order("timestamp", desc=False)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    response = await query.execute()
+    return response.data or []
+
+
+async def mark_directive_complete(directive_id: int, worker_id: Optional[str] = None) -> bool:
+    """Mark a directive as complete.
+
+    Args:
+        directive_id: The primary key of the directive to update.
+        worker_id: If given, only complete the directive while this worker
+            holds its lease.
+
+    Returns:
+        ``False`` if no row was updated, e.g. because the lease was lost.
+    """
+    client = await get_client()
+    query = client.table("agent_directives").update({"status": "complete"}).eq("id", directive_id)
+    if worker_id is not None:
+        query = query.eq("status", "claimed").eq("lease_owner", worker_id)
+    return bool((await query.execute()).data)
+
+
+async def dispatch_directives(directives: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert a fan‑out of directives in one request and return the stored rows.
+
+    See :func:`supabase_utils.dispatch_directives`; the whole batch is
+    written by a single statement, so it is queued atomically.
+    """
+    if not directives:
+        return []
+    rows = [{**build_directive(d["agent"], d["command"], d.get("payload")), **d} for d in directives]
+    with span("dispatch directives", {"directive.count": len(rows)}, kind="producer"):
+        for row in rows:
+            row["payload"] = inject_context(row.get("payload"))
+        client = await get_client()
+        response = await client.table("agent_directives").insert(rows).execute()
+    return response.data or []
@@ -7,11 +7,41 @@ certain environment variables to be defined at runtime:
 * `SUPABASE_URL` – The base URL of your Supabase project
 * `SUPABASE_SERVICE_ROLE_KEY` – A service‑role API key with read/write access
 * `SUPABASE_ANON_KEY` – Optional anonymous key for client‑side usage
+
+Clients are pooled per process.  The first call to :func:`get_client` builds
+a Supabase client backed by a keep‑alive ``httpx`` connection pool and every
+later call in the same process reuses it.  The pool can be tuned with:
+
+* `SUPABASE_POOL_MAX_CONNECTIONS` – Maximum open connections (default 20)
+* `SUPABASE_POOL_MAX_KEEPALIVE` – Idle connections kept alive (default 10)
+* `SUPABASE_POOL_KEEPALIVE_EXPIRY` – Seconds an idle connection is kept (default 30)
+* `SUPABASE_HTTP_TIMEOUT` – Per‑request timeout in seconds (default 30)
+
+Log writes can optionally be buffered and flushed as bulk inserts, one per
+table, instead of one request per row.  Enable it with
+`SUPABASE_LOG_BUFFER=1` or by calling :func:`enable_log_buffer`:
+
+* `SUPABASE_LOG_BATCH_ROWS` – Rows per table that trigger a flush (default 500)
+* `SUPABASE_LOG_BATCH_SECONDS` – Maximum age of a buffered row (default 2)
+* `SUPABASE_LOG_BACKLOG` – Rows held in memory before writers block (default 10000)
+
+Directives can be consumed through a lease‑based queue (see
+``migrations/directive_queue.sql``): :func:`claim_directives` atomically
+hands pending rows to one worker for `DIRECTIVE_VISIBILITY_TIMEOUT` seconds
+(default 300), after which unfinished directives become claimable again.
 """
 
+import atexit
 import os
 import datetime
-from typing import Any, Dict, List, Optional
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .content_hash import LOOKUP_CHUNK, changed_rows
+from .telemetry import LOG_BUFFER_ROWS, instrument_transport
+from .tracing import inject_context, span
 
 try:
     from supabase import create_client  # type: ignore
@@ -19,9 +49,89 @@ except ImportError:
     # In case supabase library is not installed.  The worker should install it via requirements.
     create_client = None  # type: ignore
 
+try:
+    import httpx  # type: ignore
+    from supabase import ClientOptions  # type: ignore
+except ImportError:
+    # Older supabase releases cannot accept a shared httpx client; fall back
+    # to caching the client alone, which still reuses its internal session.
+    httpx = None  # type: ignore
+    ClientOptions = None  # type: ignore
+
+
+# Registry of pooled clients keyed by (url, key).  Each entry records the pid
+# that created it so that a forked child never reuses its parent's sockets.
+_clients: Dict[Tuple[str, str], Tuple[int, Any, Any]] = {}
+_clients_lock = threading.Lock()
+_pool_stats: Dict[str, int] = {"clients_created": 0, "requests": 0, "new_connections": 0}
+_stats_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    """Drop inherited clients, locks and log buffer in a freshly forked child."""
+    global _clients_lock, _stats_lock, _log_buffer, _log_buffer_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    # The parent still owns (and will flush) the rows buffered before the fork.
+    _log_buffer = None
+    _log_buffer_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _bump(counter: str) -> None:
+    with _stats_lock:
+        _pool_stats[counter] += 1
+
+
+def _trace(event_name: str, info: Dict[str, Any]) -> None:
+    # httpcore only emits connect events when it opens a new connection, so
+    # every request without one was served from the keep‑alive pool.
+    if event_name == "connection.connect_tcp.complete":
+        _bump("new_connections")
+
+
+def _on_request(request: Any) -> None:
+    _bump("requests")
+    request.extensions["trace"] = _trace
+
+
+def _build_http_client() -> Any:
+    """Create the shared keep‑alive ``httpx.Client`` used by a Supabase client."""
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("SUPABASE_POOL_KEEPALIVE_EXPIRY", "30")),
+    )
+    return httpx.Client(
+        transport=instrument_transport(httpx.HTTPTransport(limits=limits)),
+        timeout=float(os.getenv("SUPABASE_HTTP_TIMEOUT", "30")),
+        follow_redirects=True,
+        event_hooks={"request": [_on_request]},
+    )
+
+
+def _create_pooled_client(url: str, key: str) -> Tuple[Any, Any]:
+    if httpx is None or ClientOptions is None:
+        return create_client(url, key), None
+    http_client = _build_http_client()
+    try:
+        options = ClientOptions(httpx_client=http_client)
+    except TypeError:
+        # supabase-py predating the ``httpx_client`` option
+        http_client.close()
+        return create_client(url, key), None
+    return create_client(url, key, options=options), http_client
+
 
 def get_client():
-    """Create and return a Supabase client.
+    """Return the process‑wide Supabase client, creating it on first use.
+
+    The client is shared by every caller in the process and is safe to use
+    from multiple threads.  After a fork the child builds its own client.
 
     Raises:
         RuntimeError: if required environment variables are missing or the library is unavailable.
@@ -34,21 +144,267 @@ def get_client():
         raise RuntimeError(
             "supabase library is not installed; add `supabase-py` to your dependencies"
         )
-    return create_client(url, key)
+    pid = os.getpid()
+    entry = _clients.get((url, key))
+    if entry is not None and entry[0] == pid:
+        return entry[1]
+    with _clients_lock:
+        entry = _clients.get((url, key))
+        if entry is None or entry[0] != pid:
+            client, http_client = _create_pooled_client(url, key)
+            entry = (pid, client, http_client)
+            _clients[(url, key)] = entry
+            _bump("clients_created")
+    return entry[1]
+
+
+def close_clients() -> None:
+    """Close every pooled client owned by this process and empty the registry."""
+    pid = os.getpid()
+    with _clients_lock:
+        for owner, _client, http_client in _clients.values():
+            if owner == pid and http_client is not None:
+                http_client.close()
+        _clients.clear()
+
+
+def get_pool_stats() -> Dict[str, int]:
+    """Return connection pool counters for this process.
+
+    ``reused_connections`` counts HTTP requests served over an existing
+    keep‑alive connection; ``new_connections`` counts fresh TCP connects.
+    """
+    with _stats_lock:
+        stats = dict(_pool_stats)
+    stats["reused_connections"] = max(0, stats["requests"] - stats["new_connections"])
+    return stats
+
+
+def insert_rows(table: str, rows: List[Dict[str, Any]]) -> None:
+    """Insert several rows into a Supabase table with a single request.
+
+    Columns missing from a row fall back to their database defaults rather
+    than ``NULL``, so rows with different keys can share one insert.
+    """
+    if not rows:
+        return
+    client = get_client()
+    client.table(table).insert(rows, returning="minimal", default_to_null=False).execute()
+
+
+def upsert_changed(table: str, rows: List[Dict[str, Any]], scope: Dict[str, Any]) -> int:
+    """Write the new and changed rows of a fingerprinted batch in one upsert.
+
+    Every row carries ``url_hash`` and ``content_hash`` (see
+    ``content_hash.fingerprint``) and the ``scope`` columns, which with
+    ``url_hash`` form the table's unique key.  The stored hashes are read
+    first, so rows whose content is unchanged are never written.
+
+    Args:
+        table: Target table, e.g. ``scraper_results``.
+        rows: Rows to store.
+        scope: Columns shared by every row, e.g. ``{"job_id": 7}``.
+
+    Returns:
+        The number of rows inserted or updated.
+    """
+    if not rows:
+        return 0
+    client = get_client()
+    keys = list(dict.fromkeys(row["url_hash"] for row in rows))
+    stored: Dict[str, str] = {}
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        query = client.table(table).select("url_hash, content_hash")
+        for column, value in scope.items():
+            query = query.eq(column, value)
+        response = query.in_("url_hash", keys[start:start + LOOKUP_CHUNK]).execute()
+        stored.update((row["url_hash"], row["content_hash"]) for row in response.data or [])
+    changed = changed_rows(rows, stored)
+    if changed:
+        client.table(table).upsert(
+            changed, on_conflict=",".join([*scope, "url_hash"]), returning="minimal", default_to_null=False
+        ).execute()
+    return len(changed)
+
+
+class LogBuffer:
+    """Bounded in‑memory buffer that batches log rows per table.
+
+    Rows are flushed as one bulk insert per table when a table reaches
+    ``max_rows`` buffered rows or when the oldest buffered row is older than
+    ``max_latency`` seconds.  At most ``max_backlog`` rows are held; once the
+    backlog is full, :meth:`add` blocks until a flush frees space.  Failed
+    flushes are retried on the next cycle.
+    """
+
+    def __init__(self, max_rows: int = 500, max_latency: float = 2.0, max_backlog: int = 10000) -> None:
+        self.max_rows = max(1, max_rows)
+        self.max_latency = max_latency
+        self.max_backlog = max(self.max_rows, max_backlog)
+        self._rows: Dict[str, List[Dict[str, Any]]] = {}
+        self._size = 0
+        self._oldest: Optional[float] = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="supabase-log-buffer", daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, table: str, row: Dict[str, Any], timeout: Optional[float] = None) -> None:
+        """Queue a row for ``table``, blocking while the backlog is full.
+
+        Raises:
+            RuntimeError: if the buffer has been closed.
+            TimeoutError: if ``timeout`` elapses before space becomes available.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._size >= self.max_backlog and not self._closed:
+                self._cond.notify_all()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("log buffer backlog is full")
+                self._cond.wait(remaining)
+            if self._closed:
+                raise RuntimeError("log buffer is closed")
+            self._rows.setdefault(table, []).append(row)
+            self._size += 1
+            if self._oldest is None:
+                # Wake the flusher so it starts the latency timer.
+                self._oldest = time.monotonic()
+                self._cond.notify_all()
+            elif len(self._rows[table]) >= self.max_rows:
+                self._cond.notify_all()
+
+    def _due(self) -> bool:
+        if self._size >= self.max_backlog:
+            return True
+        if any(len(rows) >= self.max_rows for rows in self._rows.values()):
+            return True
+        return self._oldest is not None and time.monotonic() - self._oldest >= self.max_latency
+
+    def flush(self) -> int:
+        """Write every buffered row now.  Returns the number of rows written."""
+        with self._flush_lock:
+            with self._cond:
+                pending, self._rows = self._rows, {}
+                self._oldest = None
+            written = 0
+            failed: Dict[str, List[Dict[str, Any]]] = {}
+            for table, rows in pending.items():
+                for start in range(0, len(rows), self.max_rows):
+                    chunk = rows[start:start + self.max_rows]
+                    try:
+                        insert_rows(table, chunk)
+                        written += len(chunk)
+                    except Exception as exc:
+                        print(f"[supabase_utils] failed to flush {len(chunk)} rows to {table}: {exc}")
+                        failed.setdefault(table, []).extend(chunk)
+            with self._cond:
+                self._size -= written
+                for table, rows in failed.items():
+                    self._rows[table] = rows + self._rows.get(table, [])
+                if failed and self._oldest is None:
+                    self._oldest = time.monotonic()
+                self._cond.notify_all()
+            return written
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    if self._oldest is None:
+                        self._cond.wait()
+                    else:
+                        self._cond.wait(max(0.0, self.max_latency - (time.monotonic() - self._oldest)))
+                if self._closed:
+                    return
+            if self.flush() == 0:
+                # Nothing could be written; avoid spinning while Supabase is down.
+                time.sleep(self.max_latency)
+
+    def close(self) -> None:
+        """Stop the background flusher and write any remaining rows."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+
+
+_log_buffer: Optional[LogBuffer] = None
+_log_buffer_lock = threading.Lock()
+LOG_BUFFER_ROWS.set_function(lambda: len(_log_buffer) if _log_buffer is not None else 0)
+
+
+def enable_log_buffer(
+    max_rows: Optional[int] = None,
+    max_latency: Optional[float] = None,
+    max_backlog: Optional[int] = None,
+) -> LogBuffer:
+    """Route :func:`insert_log` through a process‑wide :class:`LogBuffer`.
+
+    Unspecified limits are read from the ``SUPABASE_LOG_*`` environment
+    variables.  Calling this again returns the already active buffer.
+    """
+    global _log_buffer
+    with _log_buffer_lock:
+        if _log_buffer is None:
+            _log_buffer = LogBuffer(
+                max_rows=max_rows or int(os.getenv("SUPABASE_LOG_BATCH_ROWS", "500")),
+                max_latency=max_latency or float(os.getenv("SUPABASE_LOG_BATCH_SECONDS", "2")),
+                max_backlog=max_backlog or int(os.getenv("SUPABASE_LOG_BACKLOG", "10000")),
+            )
+        return _log_buffer
+
+
+def disable_log_buffer() -> None:
+    """Flush and remove the process‑wide log buffer, if one is active."""
+    global _log_buffer
+    with _log_buffer_lock:
+        buffer, _log_buffer = _log_buffer, None
+    if buffer is not None:
+        buffer.close()
+
+
+def flush_logs() -> int:
+    """Flush buffered log rows immediately.  Returns the number of rows written."""
+    buffer = _log_buffer
+    return buffer.flush() if buffer is not None else 0
+
+
+def _active_log_buffer() -> Optional[LogBuffer]:
+    if _log_buffer is None and os.getenv("SUPABASE_LOG_BUFFER", "").lower() in ("1", "true", "yes"):
+        return enable_log_buffer()
+    return _log_buffer
+
+
+atexit.register(disable_log_buffer)
 
 
 def insert_log(table: str, data: Dict[str, Any]) -> None:
     """Insert a row into a Supabase table.
 
     This helper wraps `supabase.table(...).insert(...).execute()` and adds a timestamp.
+    When the log buffer is enabled the row is queued and written later as
+    part of a bulk insert.
 
     Args:
         table: The name of the Supabase table.
         data: A dictionary of values to insert.  A `ts` field will be added automatically.
     """
-    client = get_client()
     payload = data.copy()
     payload.setdefault("ts", datetime.datetime.utcnow().isoformat())
+    buffer = _active_log_buffer()
+    if buffer is not None:
+        buffer.add(table, payload)
+        return
+    client = get_client()
     client.table(table).insert(payload).execute()
 
 
@@ -73,11 +429,162 @@ def fetch_pending_directives(agent: str) -> List[Dict[str, Any]]:
     return response.data or []
 
 
-def mark_directive_complete(directive_id: int) -> None:
+def _set_directive_status(directive_id: int, status: str, worker_id: Optional[str]) -> bool:
+    client = get_client()
+    query = client.table("agent_directives").update({"status": status}).eq("id", directive_id)
+    if worker_id is not None:
+        # Only the current lease owner may settle a claimed directive.
+        query = query.eq("status", "claimed").eq("lease_owner", worker_id)
+    return bool(query.execute().data)
+
+
+def mark_directive_complete(directive_id: int, worker_id: Optional[str] = None) -> bool:
     """Mark a directive as complete.
 
     Args:
         directive_id: The primary key of the directive to update.
+        worker_id: If given, only complete the directive while this worker
+            holds its lease.
+
+    Returns:
+        ``False`` if no row was updated, e.g. because the lease was lost.
+    """
+    return _set_directive_status(directive_id, "complete", worker_id)
+
+
+def build_directive(agent: str, command: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Return an ``agent_directives`` row for a new pending directive."""
+    return {
+        "agent": agent,
+        "command": command,
+        "payload": payload or {},
+        "status": "pending",
+        "timestamp": time.time(),
+    }
+
+
+def dispatch_directives(directives: List[Dict[str, Any]]) -> List[int]:
+    """Insert a fan‑out of directives in a single request.
+
+    PostgREST executes a bulk insert as one statement, so either every
+    directive is queued or none is.  Rows only need ``agent``, ``command``
+    and ``payload``; ``status`` and ``timestamp`` are filled in, and the
+    active trace context is added to each payload (see ``tracing``).
+
+    Args:
+        directives: Directive dictionaries to insert.
+
+    Returns:
+        The ids of the new directives, in input order.
+    """
+    if not directives:
+        return []
+    rows = [{**build_directive(d["agent"], d["command"], d.get("payload")), **d} for d in directives]
+    with span("dispatch directives", {"directive.count": len(rows)}, kind="producer"):
+        # Workers continue the trace from the context stored in the payload.
+        for row in rows:
+            row["payload"] = inject_context(row.get("payload"))
+        client = get_client()
+        response = client.table("agent_directives").insert(rows).execute()
+    return [row["id"] for row in response.data or []]
+
+
+def mark_directive_failed(directive_id: int, worker_id: Optional[str] = None) -> bool:
+    """Mark a directive as failed so it is not claimed again.
+
+    Args:
+        directive_id: The primary key of the directive to update.
+        worker_id: If given, only fail the directive while this worker
+            holds its lease.
+
+    Returns:
+        ``False`` if no row was updated, e.g. because the lease was lost.
+    """
+    return _set_directive_status(directive_id, "failed", worker_id)
+
+
+def default_worker_id() -> str:
+    """Return an identifier for this worker process, used as lease owner."""
+    return os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _visibility_timeout(seconds: Optional[int]) -> int:
+    return int(seconds if seconds is not None else os.getenv("DIRECTIVE_VISIBILITY_TIMEOUT", "300"))
+
+
+def claim_directives(
+    agent: str,
+    limit: int = 1,
+    visibility_timeout: Optional[int] = None,
+    worker_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Atomically lease up to ``limit`` pending directives for an agent.
+
+    Claimed rows are hidden from other workers until the lease expires or
+    the directive is completed or released.  Concurrent claimers never
+    receive the same row.
+
+    Args:
+        agent: The agent name to claim directives for.
+        limit: Maximum number of directives to claim.
+        visibility_timeout: Lease length in seconds.
+        worker_id: Lease owner; defaults to :func:`default_worker_id`.
+
+    Returns:
+        A list of directive objects with ``id``, ``command``, ``payload``,
+        ``attempts`` and ``lease_expires_at``.
+    """
+    client = get_client()
+    response = client.rpc(
+        "claim_directives",
+        {
+            "p_agent": agent,
+            "p_worker": worker_id or default_worker_id(),
+            "p_limit": limit,
+            "p_visibility_seconds": _visibility_timeout(visibility_timeout),
+        },
+    ).execute()
+    return response.data or []
+
+
+def extend_directive_lease(
+    directive_id: int,
+    visibility_timeout: Optional[int] = None,
+    worker_id: Optional[str] = None,
+) -> bool:
+    """Extend the lease on a claimed directive.
+
+    Returns:
+        ``False`` if the lease was already lost to another worker.
+    """
+    client = get_client()
+    response = client.rpc(
+        "extend_directive_lease",
+        {
+            "p_id": directive_id,
+            "p_worker": worker_id or default_worker_id(),
+            "p_visibility_seconds": _visibility_timeout(visibility_timeout),
+        },
+    ).execute()
+    return bool(response.data)
+
+
+def release_directive(directive_id: int, worker_id: Optional[str] = None) -> bool:
+    """Return a claimed directive to the pending queue immediately."""
+    client = get_client()
+    response = client.rpc(
+        "release_directive",
+        {"p_id": directive_id, "p_worker": worker_id or default_worker_id()},
+    ).execute()
+    return bool(response.data)
+
+
+def requeue_expired_directives(agent: Optional[str] = None) -> int:
+    """Move directives with expired leases back to pending.
+
+    :func:`claim_directives` already does this for its own agent; call this
+    from a maintenance job to sweep every agent.  Returns the row count.
     """
     client = get_client()
-    client.table("agent_directives").update({"status": "complete"}).eq("id", directive_id).execute()
+    response = client.rpc("requeue_expired_directives", {"p_agent": agent}).execute()
+    return int(response.data or 0)
@@ -0,0 +1,287 @@
+"""Prometheus metrics for the handshake server and the workers.
+
+The handshake server exposes these on ``GET /metrics``.  A worker serves them
+on its own port when `WORKER_METRICS_PORT` is set.  Series:
+
+* ``infinityx_http_request_duration_seconds`` – Handshake server latency by
+  method, route template and status (see :class:`MetricsMiddleware`)
+* ``infinityx_supabase_request_duration_seconds`` and
+  ``infinityx_supabase_errors_total`` – Every PostgREST call made through the
+  pooled clients, by table (or RPC function) and operation.  The same hook
+  opens a client span per call when tracing is on (see ``tracing``)
+* ``infinityx_directive_queue_depth``, ``infinityx_directive_queue_claimed``
+  and ``infinityx_directive_queue_oldest_age_seconds`` – Directive backlog
+  per agent, refreshed by the handshake server from the
+  ``directive_queue_stats`` function (``migrations/directive_queue.sql``)
+* ``infinityx_directive_duration_seconds`` – Handler time per agent, command
+  and outcome, recorded by ``WorkerRuntime``
+* ``infinityx_worker_inflight_directives`` – Directives a worker is running
+* ``infinityx_log_buffer_rows`` – Rows waiting in the ``insert_log`` buffer
+
+``prometheus_client`` is optional.  Without it every metric is a no‑op, so
+instrumented code needs no guards; only serving metrics requires it.
+
+Configuration (environment):
+
+* `WORKER_METRICS_PORT` – Port for a worker's metrics endpoint (disabled when unset)
+* `METRICS_QUEUE_INTERVAL` – Minimum seconds between queue depth refreshes (default 15)
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .tracing import mark_error, span
+
+try:
+    import prometheus_client  # type: ignore
+except ImportError:
+    prometheus_client = None  # type: ignore
+
+try:
+    import httpx  # type: ignore
+except ImportError:
+    httpx = None  # type: ignore
+
+
+class _NoopMetric:
+    """Stand‑in used for every metric when ``prometheus_client`` is missing."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def __getattr__(self, name: str) -> Any:
+        return lambda *args, **kwargs: None
+
+
+def _metric(kind: str, name: str, documentation: str, labels: Tuple[str, ...] = (), **kwargs: Any) -> Any:
+    if prometheus_client is None:
+        return _NoopMetric()
+    return getattr(prometheus_client, kind)(name, documentation, labels, **kwargs)
+
+
+HTTP_REQUEST_SECONDS = _metric(
+    "Histogram",
+    "infinityx_http_request_duration_seconds",
+    "Handshake server request latency",
+    ("method", "route", "status"),
+)
+SUPABASE_REQUEST_SECONDS = _metric(
+    "Histogram",
+    "infinityx_supabase_request_duration_seconds",
+    "Latency of Supabase REST calls until response headers",
+    ("table", "operation"),
+)
+SUPABASE_ERRORS = _metric(
+    "Counter",
+    "infinityx_supabase_errors",
+    "Supabase REST calls that failed, by HTTP status or exception type",
+    ("table", "operation", "reason"),
+)
+DIRECTIVE_QUEUE_DEPTH = _metric(
+    "Gauge", "infinityx_directive_queue_depth", "Pending directives per agent", ("agent",)
+)
+DIRECTIVE_QUEUE_CLAIMED = _metric(
+    "Gauge", "infinityx_directive_queue_claimed", "Directives leased to a worker per agent", ("agent",)
+)
+DIRECTIVE_QUEUE_AGE = _metric(
+    "Gauge",
+    "infinityx_directive_queue_oldest_age_seconds",
+    "Age of the oldest pending directive per agent",
+    ("agent",),
+)
+DIRECTIVE_SECONDS = _metric(
+    "Histogram",
+    "infinityx_directive_duration_seconds",
+    "Directive handler time",
+    ("agent", "command", "outcome"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+WORKER_INFLIGHT = _metric(
+    "Gauge", "infinityx_worker_inflight_directives", "Directives currently being handled", ("agent",)
+)
+LOG_BUFFER_ROWS = _metric("Gauge", "infinityx_log_buffer_rows", "Rows waiting in the insert_log buffer")
+
+_OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+def supabase_target(method: str, url: Any, prefer: str = "") -> Tuple[str, str]:
+    """Return the ``(table, operation)`` labels for a Supabase REST request.
+
+    RPC calls are labelled with the function name and operation ``rpc``;
+    anything outside ``/rest/v1`` (auth, storage) is grouped as ``other``.
+    """
+    parts = urlsplit(str(url)).path.strip("/").split("/")
+    if len(parts) < 3 or parts[:2] != ["rest", "v1"]:
+        return "other", method.lower()
+    if parts[2] == "rpc" and len(parts) > 3:
+        return parts[3], "rpc"
+    operation = _OPERATIONS.get(method, method.lower())
+    if operation == "insert" and "merge-duplicates" in prefer:
+        operation = "upsert"
+    return parts[2], operation
+
+
+@contextmanager
+def _observe(request: Any) -> Iterator[Callable[[int], None]]:
+    """Time a Supabase request and trace it as a client span.
+
+    Yields a callback taking the response status.  Exceptions are counted
+    as errors labelled with their type.
+    """
+    table, operation = supabase_target(request.method, request.url, request.headers.get("prefer", ""))
+    started = time.perf_counter()
+    attributes = {"supabase.table": table, "supabase.operation": operation, "http.request.method": request.method}
+
+    with span(f"supabase {operation} {table}", attributes, kind="client") as current:
+
+        def completed(status: int) -> None:
+            SUPABASE_REQUEST_SECONDS.labels(table, operation).observe(time.perf_counter() - started)
+            if current is not None:
+                current.set_attribute("http.response.status_code", status)
+            if status >= 400:
+                SUPABASE_ERRORS.labels(table, operation, str(status)).inc()
+                mark_error(current, f"HTTP {status}")
+
+        try:
+            yield completed
+        except Exception as exc:
+            SUPABASE_REQUEST_SECONDS.labels(table, operation).observe(time.perf_counter() - started)
+            SUPABASE_ERRORS.labels(table, operation, type(exc).__name__).inc()
+            raise
+
+
+if httpx is not None:
+
+    class _InstrumentedTransport(httpx.BaseTransport):
+        """``httpx`` transport that records Supabase call metrics around another transport."""
+
+        def __init__(self, inner: Any) -> None:
+            self.inner = inner
+
+        def handle_request(self, request: Any) -> Any:
+            with _observe(request) as completed:
+                response = self.inner.handle_request(request)
+                completed(response.status_code)
+            return response
+
+        def close(self) -> None:
+            self.inner.close()
+
+    class _AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+        """Asyncio counterpart of :class:`_InstrumentedTransport`."""
+
+        def __init__(self, inner: Any) -> None:
+            self.inner = inner
+
+        async def handle_async_request(self, request: Any) -> Any:
+            with _observe(request) as completed:
+                response = await self.inner.handle_async_request(request)
+                completed(response.status_code)
+            return response
+
+        async def aclose(self) -> None:
+            await self.inner.aclose()
+
+
+def instrument_transport(inner: Any) -> Any:
+    """Wrap an ``httpx`` transport so every request is recorded as a Supabase call."""
+    return _InstrumentedTransport(inner)
+
+
+def instrument_async_transport(inner: Any) -> Any:
+    """Wrap an ``httpx`` async transport so every request is recorded as a Supabase call."""
+    return _AsyncInstrumentedTransport(inner)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template.
+
+    Routes are labelled by their template (``/directive/{agent}``) so the
+    series count stays bounded.  Responses served by an outer middleware
+    before routing (such as cache hits) fall back to the request path, which
+    for those is a fixed route.  Unmatched 404s share one label.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message: Any) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if route is None:
+                route = scope["path"] if status[0] != 404 else "<unmatched>"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status[0])).observe(
+                time.perf_counter() - started
+            )
+
+
+_queue_refreshed = 0.0
+
+
+async def refresh_queue_metrics(client: Any, force: bool = False) -> None:
+    """Update the directive queue gauges from ``directive_queue_stats``.
+
+    Calls are throttled to one per `METRICS_QUEUE_INTERVAL` seconds so that
+    frequent scrapes from several Prometheus replicas do not add load.
+    """
+    global _queue_refreshed
+    interval = float(os.getenv("METRICS_QUEUE_INTERVAL", "15"))
+    if not force and time.monotonic() - _queue_refreshed < interval:
+        return
+    _queue_refreshed = time.monotonic()
+    response = await client.rpc("directive_queue_stats", {}).execute()
+    # Agents whose queues emptied drop out of the result; clear old series.
+    for gauge in (DIRECTIVE_QUEUE_DEPTH, DIRECTIVE_QUEUE_CLAIMED, DIRECTIVE_QUEUE_AGE):
+        gauge.clear()
+    for row in response.data or []:
+        DIRECTIVE_QUEUE_DEPTH.labels(row["agent"]).set(row["pending"])
+        DIRECTIVE_QUEUE_CLAIMED.labels(row["agent"]).set(row["claimed"])
+        DIRECTIVE_QUEUE_AGE.labels(row["agent"]).set(row["oldest_age_seconds"] or 0)
+
+
+def _require_prometheus() -> None:
+    if prometheus_client is None:
+        raise RuntimeError(
+            "prometheus_client is not installed; add `prometheus-client` to your dependencies to serve metrics"
+        )
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return the current metrics in the Prometheus text format and its content type."""
+    _require_prometheus()
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: Optional[int] = None) -> Optional[int]:
+    """Serve ``/metrics`` on a background thread.
+
+    Args:
+        port: Port to listen on; defaults to `WORKER_METRICS_PORT`.
+
+    Returns:
+        The port, or ``None`` when no port is configured.
+    """
+    if port is None:
+        configured = os.getenv("WORKER_METRICS_PORT")
+        if not configured:
+            return None
+        port = int(configured)
+    _require_prometheus()
+    prometheus_client.start_http_server(port)
+    return port
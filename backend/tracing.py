@@ -0,0 +1,283 @@
+"""OpenTelemetry tracing across the handshake server, Supabase calls and workers.
+
+A protocol activation crosses several processes: ``/initiate_protocol``
+queues a directive, PromptWriter claims it and fans out to six agents, and
+each agent's worker runs its handler.  To show that as one trace, the
+active trace context is stored in the directive ``payload`` under
+:data:`TRACE_KEY` when directives are dispatched.  ``WorkerRuntime``
+restores it before calling the handler.  The payload key also carries the
+dispatch time, so each hop records how long the directive waited in the
+queue as well as how long its handler ran.
+
+Spans are created by:
+
+* :class:`TracingMiddleware` – One server span per handshake server request,
+  continuing any incoming ``traceparent`` header
+* the pooled Supabase clients – One client span per PostgREST call (see
+  ``telemetry``)
+* ``dispatch_directives`` – The fan‑out that carries the context onward
+* ``WorkerRuntime`` – A ``queued`` span and a ``directive`` span per directive
+
+The OpenTelemetry packages are optional.  Without them, or with no exporter
+configured, all of this is a no‑op.  Spans from a file exporter can be
+summarised with ``python -m deployment_package.backend.tracing traces.jsonl``.
+The summary prints each trace's end‑to‑end latency and its slowest hops.
+
+Configuration (environment):
+
+* `TRACE_EXPORTER` – ``otlp``, ``file`` or ``console`` (tracing is off when unset)
+* `TRACE_FILE` – Output of the ``file`` exporter (default ``traces.jsonl``)
+* `TRACE_SAMPLE_RATIO` – Fraction of new traces recorded (default 1)
+* `OTEL_EXPORTER_OTLP_ENDPOINT` – Collector for ``otlp`` (default ``http://localhost:4318``)
+* `OTEL_SERVICE_NAME` – Overrides the service name reported by a process
+"""
+
+import datetime
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from opentelemetry import propagate, trace  # type: ignore
+    from opentelemetry.trace import SpanKind, Status, StatusCode  # type: ignore
+except ImportError:
+    trace = None  # type: ignore
+
+TRACE_KEY = "_trace"
+
+_provider: Any = None
+
+
+def configure_tracing(service_name: str) -> bool:
+    """Install a tracer provider for this process according to `TRACE_EXPORTER`.
+
+    Returns:
+        ``True`` if tracing is active.
+
+    Raises:
+        RuntimeError: if an exporter is requested but the OpenTelemetry SDK
+            (or the OTLP exporter) is not installed, or the exporter is unknown.
+    """
+    global _provider
+    exporter_name = os.getenv("TRACE_EXPORTER", "").lower()
+    if exporter_name in ("", "none"):
+        return False
+    if _provider is not None:
+        return True
+    try:
+        from opentelemetry.sdk.resources import Resource  # type: ignore
+        from opentelemetry.sdk.trace import TracerProvider  # type: ignore
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter  # type: ignore
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased  # type: ignore
+    except ImportError:
+        raise RuntimeError(
+            "opentelemetry-sdk is not installed; add `opentelemetry-sdk` to your dependencies to export traces"
+        )
+    if exporter_name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter  # type: ignore
+        except ImportError:
+            raise RuntimeError(
+                "the OTLP exporter is not installed; add `opentelemetry-exporter-otlp-proto-http` to your dependencies"
+            )
+        exporter = OTLPSpanExporter()
+    elif exporter_name == "file":
+        out = open(os.getenv("TRACE_FILE", "traces.jsonl"), "a", buffering=1)
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+    elif exporter_name == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        raise RuntimeError(f"unknown TRACE_EXPORTER {exporter_name!r}; use otlp, file or console")
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)}),
+        sampler=ParentBased(TraceIdRatioBased(float(os.getenv("TRACE_SAMPLE_RATIO", "1")))),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _provider = provider
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Flush buffered spans and stop the exporter."""
+    global _provider
+    provider, _provider = _provider, None
+    if provider is not None:
+        provider.shutdown()
+
+
+def _tracer() -> Any:
+    return trace.get_tracer("infinityx")
+
+
+_KINDS = {"internal": "INTERNAL", "server": "SERVER", "client": "CLIENT", "producer": "PRODUCER", "consumer": "CONSUMER"}
+
+
+@contextmanager
+def span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    kind: str = "internal",
+    context: Any = None,
+) -> Iterator[Any]:
+    """Run the block inside a new current span.
+
+    Yields the span, or ``None`` when OpenTelemetry is not installed.
+    Exceptions are recorded on the span and re‑raised.
+    """
+    if trace is None:
+        yield None
+        return
+    with _tracer().start_as_current_span(
+        name, context=context, kind=getattr(SpanKind, _KINDS[kind]), attributes=attributes
+    ) as current:
+        yield current
+
+
+def mark_error(current: Any, description: str) -> None:
+    """Flag ``current`` (as yielded by :func:`span`) as failed."""
+    if current is not None:
+        current.set_status(Status(StatusCode.ERROR, description))
+
+
+def inject_context(payload: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Return ``payload`` with the active trace context under :data:`TRACE_KEY`.
+
+    The payload is returned unchanged when no trace is being recorded.
+    """
+    payload = dict(payload or {})
+    if trace is None or not trace.get_current_span().get_span_context().is_valid:
+        return payload
+    carrier: Dict[str, Any] = {}
+    propagate.inject(carrier)
+    carrier["queued_at"] = time.time()
+    payload[TRACE_KEY] = carrier
+    return payload
+
+
+def pop_context(payload: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Split a directive payload into the handler payload and its trace carrier."""
+    payload = dict(payload or {})
+    carrier = payload.pop(TRACE_KEY, None)
+    return payload, carrier if isinstance(carrier, dict) else None
+
+
+@contextmanager
+def directive_span(agent: str, command: str, directive_id: Any, carrier: Optional[Dict[str, Any]]) -> Iterator[Any]:
+    """Trace one directive handled by ``agent``.
+
+    The carrier's dispatch time becomes a ``queued`` span ending now, followed
+    by the ``directive`` span around the handler, both children of the span
+    that dispatched the directive.
+    """
+    if trace is None:
+        yield None
+        return
+    parent = propagate.extract(carrier) if carrier else None
+    attributes = {"agent": agent, "directive.command": command, "directive.id": str(directive_id)}
+    queued_at = (carrier or {}).get("queued_at")
+    if isinstance(queued_at, (int, float)):
+        _tracer().start_span(
+            f"queued {agent}", context=parent, kind=SpanKind.CONSUMER,
+            attributes=attributes, start_time=int(queued_at * 1e9),
+        ).end()
+    with span(f"directive {agent} {command}", attributes, kind="consumer", context=parent) as current:
+        yield current
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per HTTP request.
+
+    The span is renamed after routing to the route template so spans of
+    the same endpoint group together.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or trace is None:
+            await self.app(scope, receive, send)
+            return
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        with span(
+            f"{scope['method']} {scope['path']}",
+            {"http.request.method": scope["method"], "url.path": scope["path"]},
+            kind="server",
+            context=propagate.extract(headers),
+        ) as current:
+
+            async def send_wrapper(message: Any) -> None:
+                if message["type"] == "http.response.start":
+                    current.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        mark_error(current, f"HTTP {message['status']}")
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None:
+                    current.update_name(f"{scope['method']} {route}")
+                    current.set_attribute("http.route", route)
+
+
+def _parse_time(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def summarize(paths: List[str], top: int = 3) -> List[Dict[str, Any]]:
+    """Summarise traces written by the ``file`` exporter.
+
+    Returns:
+        One entry per trace, slowest first, with the root span name, the
+        end‑to‑end latency in milliseconds and the ``top`` slowest hops.
+    """
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    for path in paths:
+        with open(path) as handle:
+            for line in handle:
+                if line.strip():
+                    record = json.loads(line)
+                    traces.setdefault(record["context"]["trace_id"], []).append(record)
+    summaries = []
+    for trace_id, spans in traces.items():
+        ids = {s["context"]["span_id"] for s in spans}
+        roots = [s for s in spans if s.get("parent_id") not in ids]
+        start = min(_parse_time(s["start_time"]) for s in spans)
+        end = max(_parse_time(s["end_time"]) for s in spans)
+        hops = sorted(
+            (
+                {
+                    "name": s["name"],
+                    "service": s.get("resource", {}).get("attributes", {}).get("service.name"),
+                    "ms": (_parse_time(s["end_time"]) - _parse_time(s["start_time"])).total_seconds() * 1000,
+                }
+                for s in spans
+                if s not in roots
+            ),
+            key=lambda hop: hop["ms"],
+            reverse=True,
+        )
+        summaries.append(
+            {
+                "trace_id": trace_id,
+                "root": roots[0]["name"] if roots else None,
+                "spans": len(spans),
+                "total_ms": (end - start).total_seconds() * 1000,
+                "slowest": hops[:top],
+            }
+        )
+    summaries.sort(key=lambda item: item["total_ms"], reverse=True)
+    return summaries
+
+
+if __name__ == "__main__":
+    for item in summarize(sys.argv[1:]):
+        print(f"{item['trace_id']}  {item['root']}  {item['total_ms']:.1f} ms  ({item['spans']} spans)")
+        for hop in item["slowest"]:
+            print(f"    {hop['ms']:9.1f} ms  {hop['name']}  [{hop['service']}]")
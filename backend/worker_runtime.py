@@ -0,0 +1,262 @@
+"""Shared runtime for long‑running directive workers.
+
+Every worker in ``backend/workers`` follows the same shape: claim directives
+for its agent, dispatch on ``command``, mark the directive complete and run
+some default behaviour while idle.  :class:`WorkerRuntime` implements that
+loop once.  A worker only supplies a table of command handlers and an
+optional idle callback::
+
+    HANDLERS = {"RUN_AUDIT": run_audit}
+
+    def run_worker() -> None:
+        WorkerRuntime(AGENT_NAME, HANDLERS, idle=audit_logs, idle_interval=3600).run()
+
+Handlers receive the directive ``payload`` and run on a thread pool, so one
+pod can work on several directives at once.  Coroutine handlers are run on
+their own event loop inside the pool thread.  The runtime keeps directive
+leases alive while handlers run, drains in‑flight work on SIGTERM/SIGINT
+(as sent by Kubernetes during a rollout) and records timing per command.
+With `WORKER_METRICS_PORT` set, the timings and Supabase call metrics are
+also served to Prometheus (see ``telemetry``).  Each directive is traced
+as a continuation of the trace that dispatched it (see ``tracing``).
+
+Configuration (environment):
+
+* `WORKER_CONCURRENCY` – Directives processed in parallel (default 4)
+* `WORKER_MAX_ATTEMPTS` – Attempts before a failing directive is marked failed (default 3)
+* `WORKER_DRAIN_TIMEOUT` – Seconds to wait for in‑flight work on shutdown (default 25)
+* `WORKER_METRICS_PORT` – Port for the Prometheus metrics endpoint (disabled when unset)
+"""
+
+import asyncio
+import inspect
+import os
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+from .directive_listener import wait_for_directive
+from .supabase_utils import (
+    claim_directives,
+    default_worker_id,
+    disable_log_buffer,
+    extend_directive_lease,
+    insert_log,
+    mark_directive_complete,
+    mark_directive_failed,
+    release_directive,
+)
+from .telemetry import DIRECTIVE_SECONDS, WORKER_INFLIGHT, start_metrics_server
+from .tracing import configure_tracing, directive_span, pop_context, shutdown_tracing
+
+Handler = Callable[[Dict[str, Any]], Any]
+
+
+class WorkerRuntime:
+    """Claim, dispatch and complete directives for one agent."""
+
+    def __init__(
+        self,
+        agent: str,
+        handlers: Dict[str, Handler],
+        idle: Optional[Callable[[], None]] = None,
+        idle_interval: float = 60.0,
+        concurrency: Optional[int] = None,
+        visibility_timeout: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        drain_timeout: Optional[float] = None,
+    ) -> None:
+        self.agent = agent
+        self.handlers = handlers
+        self.idle = idle
+        self.idle_interval = idle_interval
+        self.concurrency = max(1, concurrency or int(os.getenv("WORKER_CONCURRENCY", "4")))
+        self.visibility_timeout = int(visibility_timeout or os.getenv("DIRECTIVE_VISIBILITY_TIMEOUT", "300"))
+        self.max_attempts = max_attempts or int(os.getenv("WORKER_MAX_ATTEMPTS", "3"))
+        self.drain_timeout = drain_timeout or float(os.getenv("WORKER_DRAIN_TIMEOUT", "25"))
+        self.worker_id = default_worker_id()
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._timings_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._inflight: Dict[Future, Dict[str, Any]] = {}
+        self._last_idle: Optional[float] = None
+        self._last_lease_renewal = time.monotonic()
+        self._reported = 0
+        WORKER_INFLIGHT.labels(agent).set_function(lambda: len(self._inflight))
+
+    # -- dispatch -------------------------------------------------------------
+
+    def _record(self, command: str, seconds: float, ok: bool) -> None:
+        with self._timings_lock:
+            entry = self.timings.setdefault(
+                command, {"count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            entry["count"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+        # Unknown commands share one label so arbitrary rows cannot add series.
+        label = command if command in self.handlers else "<unknown>"
+        DIRECTIVE_SECONDS.labels(self.agent, label, "ok" if ok else "error").observe(seconds)
+
+    def _unknown(self, command: str) -> None:
+        insert_log("agent_logs", {"agent": self.agent, "event": "unknown_directive", "details": command})
+
+    def _execute(self, directive: Dict[str, Any]) -> None:
+        command = directive["command"]
+        payload, trace_context = pop_context(directive.get("payload"))
+        handler = self.handlers.get(command)
+        with directive_span(self.agent, command, directive["id"], trace_context):
+            start = time.perf_counter()
+            ok = False
+            try:
+                if handler is None:
+                    self._unknown(command)
+                elif inspect.iscoroutinefunction(handler):
+                    asyncio.run(handler(payload))
+                else:
+                    handler(payload)
+                ok = True
+            finally:
+                self._record(command, time.perf_counter() - start, ok)
+            if not mark_directive_complete(directive["id"], worker_id=self.worker_id):
+                print(f"[{self.agent}] lease on directive {directive['id']} was lost; not marking it complete")
+
+    def _handle_failure(self, directive: Dict[str, Any], exc: BaseException) -> None:
+        insert_log(
+            "agent_logs",
+            {
+                "agent": self.agent,
+                "event": "directive_failed",
+                "details": {"id": directive["id"], "command": directive["command"], "error": str(exc)},
+            },
+        )
+        if int(directive.get("attempts") or 1) >= self.max_attempts:
+            mark_directive_failed(directive["id"], worker_id=self.worker_id)
+        else:
+            release_directive(directive["id"], worker_id=self.worker_id)
+
+    def _reap(self) -> None:
+        for future in [f for f in self._inflight if f.done()]:
+            directive = self._inflight.pop(future)
+            exc = future.exception()
+            if exc is not None:
+                print(f"[{self.agent}] directive {directive['id']} failed: {exc}")
+                try:
+                    self._handle_failure(directive, exc)
+                except Exception as report_exc:
+                    print(f"[{self.agent}] could not record failure: {report_exc}")
+
+    def _renew_leases(self) -> None:
+        # Renew well before expiry so slow handlers keep their directives.
+        if time.monotonic() - self._last_lease_renewal < self.visibility_timeout / 3:
+            return
+        self._last_lease_renewal = time.monotonic()
+        for directive in list(self._inflight.values()):
+            try:
+                extend_directive_lease(directive["id"], self.visibility_timeout, worker_id=self.worker_id)
+            except Exception as exc:
+                print(f"[{self.agent}] could not extend lease for {directive['id']}: {exc}")
+
+    # -- idle and reporting ---------------------------------------------------
+
+    def _run_idle(self) -> None:
+        now = time.monotonic()
+        if self._last_idle is not None and now - self._last_idle < self.idle_interval:
+            return
+        self._last_idle = now
+        if self.idle is not None:
+            try:
+                self.idle()
+            except Exception as exc:
+                print(f"[{self.agent}] idle task failed: {exc}")
+        self._report_stats()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return per‑command counters and timings since start."""
+        with self._timings_lock:
+            return {command: dict(entry) for command, entry in self.timings.items()}
+
+    def _report_stats(self) -> None:
+        stats = self.stats()
+        processed = sum(int(entry["count"]) for entry in stats.values())
+        if processed == self._reported:
+            return
+        self._reported = processed
+        try:
+            insert_log("agent_logs", {"agent": self.agent, "event": "runtime_stats", "details": stats})
+        except Exception as exc:
+            print(f"[{self.agent}] could not report stats: {exc}")
+
+    def _sleep_idle(self) -> None:
+        # Wait in short slices so a shutdown signal is honoured promptly.
+        deadline = time.monotonic() + max(0.0, self.idle_interval - (time.monotonic() - (self._last_idle or 0.0)))
+        while not self._stopping.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or wait_for_directive(self.agent, min(1.0, remaining)):
+                return
+
+    # -- lifecycle ------------------------------------------------------------
+
+    def stop(self, *_: Any) -> None:
+        """Stop claiming new directives and begin draining."""
+        self._stopping.set()
+
+    def _install_signal_handlers(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self.stop)
+
+    def _drain(self, pool: ThreadPoolExecutor) -> None:
+        if self._inflight:
+            wait(list(self._inflight), timeout=self.drain_timeout)
+        self._reap()
+        for directive in self._inflight.values():
+            # Still running after the grace period.  Releasing it would let
+            # another replica run it alongside this thread, which cannot be
+            # stopped; its lease is no longer renewed and expires instead.
+            print(f"[{self.agent}] directive {directive['id']} still running at shutdown; leaving it to its lease")
+        pool.shutdown(wait=False, cancel_futures=True)
+        self._report_stats()
+        disable_log_buffer()
+        shutdown_tracing()
+
+    def run(self) -> None:
+        """Run until SIGTERM/SIGINT or :meth:`stop`, then drain in‑flight work."""
+        self._install_signal_handlers()
+        try:
+            start_metrics_server()
+        except Exception as exc:
+            print(f"[{self.agent}] metrics endpoint disabled: {exc}")
+        try:
+            configure_tracing(self.agent)
+        except Exception as exc:
+            print(f"[{self.agent}] tracing disabled: {exc}")
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=self.agent)
+        try:
+            while not self._stopping.is_set():
+                self._reap()
+                self._renew_leases()
+                free = self.concurrency - len(self._inflight)
+                claimed = []
+                if free > 0:
+                    try:
+                        claimed = claim_directives(
+                            self.agent, limit=free, visibility_timeout=self.visibility_timeout, worker_id=self.worker_id
+                        )
+                    except Exception as exc:
+                        print(f"[{self.agent}] failed to claim directives: {exc}")
+                for directive in claimed:
+                    self._inflight[pool.submit(self._execute, directive)] = directive
+                if claimed:
+                    continue
+                if self._inflight:
+                    wait(list(self._inflight), timeout=1.0, return_when=FIRST_COMPLETED)
+                    continue
+                self._run_idle()
+                self._sleep_idle()
+        finally:
+            self._drain(pool)
@@ -3,6 +3,9 @@
 Each module in this package defines a long‑running process that polls
 Supabase for directives targeted at a specific agent.  When a directive
 arrives, the worker executes the requested command and logs the result.
+Long‑running workers declare a ``HANDLERS`` table mapping commands to
+functions and hand it to :class:`backend.worker_runtime.WorkerRuntime`, which
+owns the claim/dispatch loop, concurrency and graceful shutdown.
 
 To launch a worker locally, run the module as a script, for example:
 
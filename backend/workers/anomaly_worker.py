@@ -10,7 +10,8 @@ Supabase.
 import time
 from typing import Dict, List
 
-from ..supabase_utils import fetch_pending_directives, insert_log, mark_directive_complete
+from ..supabase_utils import insert_log
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "AnomalyHunter"
 
@@ -26,31 +27,27 @@ def detect_anomalies() -> List[Dict[str, str]]:
     ]
 
 
-def process_directive(directive: Dict) -> None:
-    directive_id = directive["id"]
-    command = directive["command"]
-    if command == "SCAN_ANOMALIES":
-        anomalies = detect_anomalies()
-        for item in anomalies:
-            insert_log("anomaly_logs", {"agent": AGENT_NAME, **item})
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "anomalies_detected", "details": anomalies})
-    else:
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "unknown_directive", "details": command})
-    mark_directive_complete(directive_id)
+def scan_anomalies(payload: Dict) -> None:
+    """Handle SCAN_ANOMALIES: detect anomalies and log each finding."""
+    anomalies = detect_anomalies()
+    for item in anomalies:
+        insert_log("anomaly_logs", {"agent": AGENT_NAME, **item})
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "anomalies_detected", "details": anomalies})
+
+
+def idle_scan() -> None:
+    """Idle; run anomaly scans hourly."""
+    anomalies = detect_anomalies()
+    for item in anomalies:
+        insert_log("anomaly_logs", {"agent": AGENT_NAME, **item})
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "scanned anomalies"})
+
+
+HANDLERS = {"SCAN_ANOMALIES": scan_anomalies}
 
 
 def run_worker() -> None:
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            process_directive(directives[0])
-        else:
-            # Idle; run anomaly scans hourly
-            anomalies = detect_anomalies()
-            for item in anomalies:
-                insert_log("anomaly_logs", {"agent": AGENT_NAME, **item})
-            insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "scanned anomalies"})
-            time.sleep(3600)
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle=idle_scan, idle_interval=3600).run()
 
 
 if __name__ == "__main__":
@@ -11,7 +11,8 @@ import time
 import random
 from typing import Dict
 
-from ..supabase_utils import fetch_pending_directives, insert_log, mark_directive_complete
+from ..supabase_utils import insert_log
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "Atlas"
 
@@ -29,34 +30,24 @@ def provision_node(region: str) -> Dict[str, str]:
     }
 
 
-def process_directive(directive: Dict) -> None:
-    directive_id = directive["id"]
-    command = directive["command"]
-    payload = directive.get("payload", {})
+def provision_nodes(payload: Dict) -> None:
+    """Handle PROVISION_NODES: provision ``count`` nodes in random regions."""
+    count = payload.get("count", 1)
+    new_nodes = []
+    for i in range(count):
+        region = random.choice(REGIONS)
+        node = provision_node(region)
+        new_nodes.append(node)
+        insert_log("compute_nodes", {"agent": AGENT_NAME, **node})
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "provisioned_nodes", "details": new_nodes})
 
-    if command == "PROVISION_NODES":
-        count = payload.get("count", 1)
-        new_nodes = []
-        for i in range(count):
-            region = random.choice(REGIONS)
-            node = provision_node(region)
-            new_nodes.append(node)
-            insert_log("compute_nodes", {"agent": AGENT_NAME, **node})
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "provisioned_nodes", "details": new_nodes})
-    else:
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "unknown_directive", "details": command})
 
-    mark_directive_complete(directive_id)
+HANDLERS = {"PROVISION_NODES": provision_nodes}
 
 
 def run_worker() -> None:
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            process_directive(directives[0])
-        else:
-            # Idle until requested; Atlas is on‑demand
-            time.sleep(300)
+    # Idle until requested; Atlas is on‑demand
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle_interval=300).run()
 
 
 if __name__ == "__main__":
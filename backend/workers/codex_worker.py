@@ -7,10 +7,10 @@ other workers as needed.  Extend this module to call language models
 such as OpenAI Codex or GPT‑4 for actual code synthesis.
 """
 
-import time
 from typing import Dict, Any
 
-from ..supabase_utils import fetch_pending_directives, insert_log, mark_directive_complete, get_client
+from ..supabase_utils import insert_log, get_client
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "Codex"
 
@@ -24,31 +24,26 @@ def generate_code(spec: Dict[str, Any]) -> str:
     return f"// Generated code for spec: {spec}"
 
 
-def process_directive(directive: Dict[str, Any]) -> None:
-    directive_id = directive["id"]
-    command = directive["command"]
-    payload = directive.get("payload", {})
-    if command == "BUILD_SYSTEM":
-        spec = payload.get("spec", {})
-        code = generate_code(spec)
-        # Write code to Supabase logs for auditing; in reality you would
-        # commit this code to GitHub via the GitHub API.
-        insert_log("generated_code", {"agent": AGENT_NAME, "spec": spec, "code": code})
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "build_system", "details": spec})
-    else:
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "unknown_directive", "details": command})
-    mark_directive_complete(directive_id)
+def build_system(payload: Dict[str, Any]) -> None:
+    """Handle BUILD_SYSTEM: generate code for ``spec`` and record it."""
+    spec = payload.get("spec", {})
+    code = generate_code(spec)
+    # Write code to Supabase logs for auditing; in reality you would
+    # commit this code to GitHub via the GitHub API.
+    insert_log("generated_code", {"agent": AGENT_NAME, "spec": spec, "code": code})
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "build_system", "details": spec})
+
+
+def heartbeat() -> None:
+    """Codex performs maintenance tasks such as generating daily reports."""
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "idle"})
+
+
+HANDLERS = {"BUILD_SYSTEM": build_system}
 
 
 def run_worker() -> None:
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            process_directive(directives[0])
-        else:
-            # Codex performs maintenance tasks such as generating daily reports
-            insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "idle"})
-            time.sleep(600)
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle=heartbeat, idle_interval=600).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+"""Content fingerprint backfill for Infinity X One.
+
+``migrations/content_dedup.sql`` adds ``url_hash`` and ``content_hash`` to
+``scraper_results`` and ``knowledge_base``, with unique keys per job (or
+source) and ``url_hash``.  Rows stored before that have no fingerprint.
+This job keys each of them with ``content_hash.hash_url``, the function the
+writers use.  Only the newest row per key is kept, and a row the writers
+have already fingerprinted always wins.  The kept rows' ``content_hash``
+stays NULL, so the next scrape rewrites each of them once.
+
+Every row without a ``content_hash`` is re-keyed, so the job can be run
+again after an interrupted run.  It also repairs rows keyed by an earlier
+version of the migration.  Run it once after the migration::
+
+    python -m deployment_package.backend.workers.content_backfill
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..content_hash import LOOKUP_CHUNK, hash_url
+from ..supabase_utils import get_client, insert_log
+
+AGENT_NAME = "ContentBackfill"
+PAGE_SIZE = 1000
+
+# Table -> (scope column, columns to read, URL of a row).
+TABLES: Dict[str, Tuple[str, str, Callable[[Dict[str, Any]], Optional[str]]]] = {
+    "scraper_results": ("job_id", "id, job_id, url_hash, data", lambda row: (row.get("data") or {}).get("url")),
+    "knowledge_base": ("source", "id, source, url_hash, url", lambda row: row.get("url")),
+}
+
+
+def _unkeyed_rows(client: Any, table: str, columns: str) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    last_id = 0
+    while True:
+        page = (
+            client.table(table)
+            .select(columns)
+            .is_("content_hash", "null")
+            .gt("id", last_id)
+            .order("id")
+            .limit(PAGE_SIZE)
+            .execute()
+        ).data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        last_id = page[-1]["id"]
+
+
+def backfill_table(table: str) -> Dict[str, int]:
+    """Key the unfingerprinted rows of ``table`` and delete their duplicates.
+
+    Returns:
+        The number of rows ``rekeyed`` and ``deleted``.
+    """
+    client = get_client()
+    scope, columns, url_of = TABLES[table]
+    groups: Dict[Tuple[Any, str], List[Dict[str, Any]]] = {}
+    for row in _unkeyed_rows(client, table, columns):
+        url = url_of(row)
+        if url:
+            groups.setdefault((row[scope], hash_url(url)), []).append(row)
+
+    # Keys the writers have already stored a fingerprinted row under.
+    keys = list(dict.fromkeys(key for _, key in groups))
+    fingerprinted = set()
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        response = (
+            client.table(table)
+            .select(f"{scope}, url_hash, content_hash")
+            .in_("url_hash", keys[start:start + LOOKUP_CHUNK])
+            .execute()
+        )
+        fingerprinted.update((row[scope], row["url_hash"]) for row in response.data or [] if row.get("content_hash"))
+
+    stale: List[Any] = []
+    rekey: List[Tuple[Any, str]] = []
+    for group, rows in groups.items():
+        rows.sort(key=lambda row: row["id"])
+        if group in fingerprinted:
+            stale.extend(row["id"] for row in rows)
+            continue
+        stale.extend(row["id"] for row in rows[:-1])
+        if rows[-1].get("url_hash") != group[1]:
+            rekey.append((rows[-1]["id"], group[1]))
+
+    # Duplicates go first, so no kept row collides with one on its new key.
+    for start in range(0, len(stale), LOOKUP_CHUNK):
+        client.table(table).delete().in_("id", stale[start:start + LOOKUP_CHUNK]).execute()
+    rekeyed = 0
+    for row_id, key in rekey:
+        try:
+            client.table(table).update({"url_hash": key}).eq("id", row_id).execute()
+            rekeyed += 1
+        except Exception as exc:
+            # A writer stored the same URL meanwhile; the next run drops this row.
+            print(f"[content_backfill] could not key {table} row {row_id}: {exc}")
+    return {"rekeyed": rekeyed, "deleted": len(stale)}
+
+
+def main() -> None:
+    details = {table: backfill_table(table) for table in TABLES}
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "content_backfill", "details": details})
+
+
+if __name__ == "__main__":
+    main()
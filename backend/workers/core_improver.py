@@ -2,41 +2,96 @@
 
 The core improver monitors GitHub trending AI repositories, recent
 research publications and community discussions to propose upgrades
-to Infinity X One's architecture.  It writes proposed changes and
+to Infinity X One's architecture.  It writes proposed changes and
 ideas into Supabase and can open GitHub issues via Codex.  Use this
 agent to stay on the cutting edge and incorporate the latest AI
 advances.
+
+Ideas come from GitHub repositories created since the previous run that
+match the innovation queries (see ``github_crawler``).  Each repository
+is queued in ``innovation_queue`` once.
+
+Configuration (environment):
+
+* `CORE_IMPROVER_QUERIES` – Comma‑separated search queries (default well‑starred AI topics)
 """
 
+import asyncio
 import datetime
-from typing import List, Dict, Any
+import os
+from typing import Any, Dict, List, Tuple
 
-from ..supabase_utils import get_client, insert_log
+from ..content_hash import LOOKUP_CHUNK
+from ..github_crawler import crawl, save_cursors
+from ..supabase_async import close_clients, get_client, insert_log
 
+AGENT_NAME = "CoreImprover"
+DEFAULT_QUERIES = "topic:llm stars:>=50,topic:ai-agents stars:>=50,topic:machine-learning stars:>=100"
 
-def fetch_innovations() -> List[Dict[str, Any]]:
-    """Placeholder for retrieving innovation ideas from external sources."""
-    return []
 
+def innovation_queries() -> List[str]:
+    spec = os.getenv("CORE_IMPROVER_QUERIES", DEFAULT_QUERIES)
+    return [query.strip() for query in spec.split(",") if query.strip()]
 
-def run() -> None:
-    """Entry point for the core improver worker."""
-    innovations = fetch_innovations()
-    client = get_client()
-    for idea in innovations:
-        data = {
-            "title": idea.get("title"),
-            "description": idea.get("description"),
-            "source": idea.get("source"),
-            "timestamp": datetime.datetime.utcnow().timestamp(),
+
+async def fetch_innovations() -> Tuple[List[Dict[str, Any]], Dict[str, datetime.datetime]]:
+    """Return ideas from repositories created since the previous run.
+
+    Repositories that are already in ``innovation_queue`` are left out.
+
+    Returns:
+        The ideas and the new query cursors, to be saved with
+        ``github_crawler.save_cursors`` once the ideas are queued.
+    """
+    result = await crawl("core_improver", innovation_queries(), "created")
+    ideas = {
+        repo["html_url"]: {
+            "title": repo.get("full_name") or repo.get("name"),
+            "description": repo.get("description") or "",
+            "source": repo["html_url"],
         }
-        client.table("innovation_queue").insert(data).execute()
-    insert_log(
-        agent="CoreImprover",
-        message=f"Queued {len(innovations)} innovation ideas",
-        level="info",
+        for repo in result.repos
+    }
+    client = await get_client()
+    sources = list(ideas)
+
+    async def queued(chunk: List[str]) -> List[Dict[str, Any]]:
+        response = await client.table("innovation_queue").select("source").in_("source", chunk).execute()
+        return response.data or []
+
+    found = await asyncio.gather(*(queued(sources[i:i + LOOKUP_CHUNK]) for i in range(0, len(sources), LOOKUP_CHUNK)))
+    known = {row["source"] for chunk in found for row in chunk}
+    return [idea for source, idea in ideas.items() if source not in known], result.cursors
+
+
+async def queue_innovations() -> int:
+    """Queue new ideas in one insert and return how many were queued."""
+    innovations, cursors = await fetch_innovations()
+    timestamp = datetime.datetime.utcnow().timestamp()
+    if innovations:
+        client = await get_client()
+        await client.table("innovation_queue").insert(
+            [{**idea, "timestamp": timestamp} for idea in innovations], returning="minimal"
+        ).execute()
+    await save_cursors("core_improver", cursors)
+    await insert_log(
+        "agent_logs",
+        {"agent": AGENT_NAME, "event": "innovations_queued", "details": {"queued": len(innovations)}},
     )
+    return len(innovations)
+
+
+def run() -> None:
+    """Entry point for the core improver worker."""
+
+    async def improve() -> None:
+        try:
+            await queue_innovations()
+        finally:
+            await close_clients()
+
+    asyncio.run(improve())
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
@@ -16,7 +16,8 @@ import os
 import time
 from typing import Dict, Any
 
-from ..supabase_utils import fetch_pending_directives, insert_log, mark_directive_complete
+from ..supabase_utils import insert_log
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "FaucetHunter"
 
@@ -46,29 +47,19 @@ def claim_faucet(faucet: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def process_directive(directive: Dict[str, Any]) -> None:
-    """Execute a directive received from Supabase."""
-    directive_id = directive["id"]
-    command = directive["command"]
-    payload = directive.get("payload", {})
-
-    if command == "CLAIM_FAUCETS":
-        results = []
-        for faucet in FAUCETS:
-            res = claim_faucet(faucet)
-            results.append(res)
-            insert_log("faucet_logs", {"agent": AGENT_NAME, **res})
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "claimed faucets", "details": results})
-
-    elif command == "PING":
-        # Simple heartbeat command
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "ping", "details": payload})
+def claim_faucets(payload: Dict[str, Any]) -> None:
+    """Handle CLAIM_FAUCETS: claim every faucet and log the results."""
+    results = []
+    for faucet in FAUCETS:
+        res = claim_faucet(faucet)
+        results.append(res)
+        insert_log("faucet_logs", {"agent": AGENT_NAME, **res})
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "claimed faucets", "details": results})
 
-    else:
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "unknown_directive", "details": command})
 
-    # Mark directive as complete
-    mark_directive_complete(directive_id)
+def ping(payload: Dict[str, Any]) -> None:
+    """Handle PING: simple heartbeat command."""
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "ping", "details": payload})
 
 
 def default_behaviour() -> None:
@@ -84,18 +75,15 @@ def default_behaviour() -> None:
     insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "claimed default faucets"})
 
 
+HANDLERS = {
+    "CLAIM_FAUCETS": claim_faucets,
+    "PING": ping,
+}
+
+
 def run_worker() -> None:
-    """Main polling loop for the FaucetHunter worker."""
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            # Process the first pending directive
-            process_directive(directives[0])
-        else:
-            # Perform default behaviour
-            default_behaviour()
-        # Sleep briefly before polling again
-        time.sleep(60)
+    """Main loop for the FaucetHunter worker."""
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle=default_behaviour, idle_interval=60).run()
 
 
 if __name__ == "__main__":
@@ -9,10 +9,10 @@ function to call the contract and mint tokens.
 """
 
 import random
-import time
 from typing import Dict
 
-from ..supabase_utils import fetch_pending_directives, insert_log, mark_directive_complete, get_client
+from ..supabase_utils import insert_log, get_client
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "FinSynapse"
 
@@ -38,31 +38,27 @@ def distribute_rewards(profits: Dict[str, float]) -> None:
     insert_log("reward_events", {"agent": AGENT_NAME, "reward": total_reward})
 
 
-def process_directive(directive: Dict) -> None:
-    directive_id = directive["id"]
-    command = directive["command"]
-    if command == "GENERATE_PROFITS":
-        profits = simulate_profit_generation()
-        insert_log("profit_ledger", {"agent": AGENT_NAME, **profits})
-        distribute_rewards(profits)
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "generated_profits", "details": profits})
-    else:
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "unknown_directive", "details": command})
-    mark_directive_complete(directive_id)
+def generate_profits(payload: Dict) -> None:
+    """Handle GENERATE_PROFITS: record a profit cycle and distribute rewards."""
+    profits = simulate_profit_generation()
+    insert_log("profit_ledger", {"agent": AGENT_NAME, **profits})
+    distribute_rewards(profits)
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "generated_profits", "details": profits})
+
+
+def default_profits() -> None:
+    """Default: generate profits every hour."""
+    profits = simulate_profit_generation()
+    insert_log("profit_ledger", {"agent": AGENT_NAME, **profits})
+    distribute_rewards(profits)
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "generated default profits"})
+
+
+HANDLERS = {"GENERATE_PROFITS": generate_profits}
 
 
 def run_worker() -> None:
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            process_directive(directives[0])
-        else:
-            # Default: generate profits every hour
-            profits = simulate_profit_generation()
-            insert_log("profit_ledger", {"agent": AGENT_NAME, **profits})
-            distribute_rewards(profits)
-            insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "generated default profits"})
-            time.sleep(3600)
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle=default_profits, idle_interval=3600).run()
 
 
 if __name__ == "__main__":
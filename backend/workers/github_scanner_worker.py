@@ -2,60 +2,110 @@
 
 This agent runs periodically to discover emerging technologies, code
 repositories, educational articles and public resources that may
-improve the Infinity X One swarm.  It uses the GitHub API (via the
-``github`` connector when running inside AgentGPT) to fetch trending
-repositories, releases, and issues.  Results are written into the
-``knowledge_base`` table in Supabase for other agents to consume.
+improve the Infinity X One swarm.  It searches GitHub for repositories
+pushed to since its last run, one cursor per query (see
+``github_crawler``).  Unchanged result pages are revalidated with their
+ETags and do not count against the rate limit.  Pages are fetched a few
+at a time and the crawl backs off when the rate limit runs low.  Results
+are written into the ``knowledge_base`` table in Supabase for other agents
+to consume, one row per repository that is only rewritten when its content
+changes (see ``content_hash``).
 
 The worker is intentionally lightweight and can be expanded to
-include other sources such as ArXiv, Medium, or Coursera.  It should
-respect API rate limits and gracefully handle network failures.
+include other sources such as ArXiv, Medium, or Coursera.  Set
+`GITHUB_FIXTURES` to run it against recorded responses instead of GitHub.
+
+Configuration (environment):
+
+* `GITHUB_SCAN_QUERIES` – Comma‑separated search queries (default AI and crypto topics)
+
+See ``github_crawler`` for the token, rate limit and page budget settings.
 """
 
-import os
+import asyncio
 import datetime
-from typing import List, Dict, Any
+import os
+from typing import Any, Dict, List, Optional
+
+from ..content_hash import fingerprint
+from ..github_crawler import CrawlResult, crawl, save_cursors
+from ..supabase_async import close_clients, insert_log, upsert_changed
+
+AGENT_NAME = "GitHubScanner"
+DEFAULT_QUERIES = "topic:machine-learning,topic:llm,topic:ai-agents,topic:cryptocurrency,topic:defi"
+
+
+def scan_queries() -> List[str]:
+    spec = os.getenv("GITHUB_SCAN_QUERIES", DEFAULT_QUERIES)
+    return [query.strip() for query in spec.split(",") if query.strip()]
+
 
-from ..supabase_utils import get_client, insert_log
+async def fetch_trending_repos(upstream: Any = None, now: Optional[datetime.datetime] = None) -> CrawlResult:
+    """Search GitHub for repositories pushed to since the last scan.
+
+    The cursors of the result are saved by :func:`run_scan` once the
+    repositories are stored.  ``upstream`` and ``now`` are passed to
+    ``github_crawler.crawl``.
+    """
+    return await crawl("github_scanner", scan_queries(), "pushed", upstream, now)
+
+
+def repo_rows(repos: List[Dict[str, Any]], timestamp: float) -> List[Dict[str, Any]]:
+    """Build fingerprinted ``knowledge_base`` rows for GitHub repositories.
+
+    Only the name, URL and description are hashed, so a repo is rewritten
+    when its description changes but not on every scan.
+    """
+    rows = []
+    for repo in repos:
+        if not repo.get("html_url"):
+            continue
+        data = {"name": repo.get("name"), "summary": repo.get("description") or ""}
+        url_hash, content_hash = fingerprint(repo["html_url"], data)
+        rows.append(
+            {
+                "source": "github",
+                "url": repo["html_url"],
+                **data,
+                "timestamp": timestamp,
+                "url_hash": url_hash,
+                "content_hash": content_hash,
+            }
+        )
+    return rows
 
 
-def fetch_trending_repos() -> List[Dict[str, Any]]:
-    """Placeholder for GitHub trending repository retrieval.
+async def run_scan(upstream: Any = None, now: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+    """Fetch new and updated repositories and store them.
 
-    In a real deployment, this function would call the GitHub API via
-    the AgentGPT ``github`` connector or through a personal access
-    token.  For now, it returns an empty list.  See the README for
-    guidance on enabling the connector.
+    The new or changed ones are written into ``knowledge_base`` with a
+    single bulk upsert.  Only then do the query cursors move on, so a failed
+    write is retried by the next run.
     """
-    # TODO: Implement GitHub API calls using api_tool or PyGithub.
-    return []
+    result = await fetch_trending_repos(upstream, now)
+    rows = repo_rows(result.repos, datetime.datetime.utcnow().timestamp())
+    written = await upsert_changed("knowledge_base", rows, {"source": "github"})
+    await save_cursors("github_scanner", result.cursors)
+    details = {**result.stats, "written": written, "complete": result.complete}
+    await insert_log("agent_logs", {"agent": AGENT_NAME, "event": "github_scan", "details": details})
+    return details
 
 
 def run() -> None:
     """Entry point for the GitHub scanner worker.
 
-    Fetches trending repositories, writes summaries into Supabase and
-    logs the run.  Invoked by a Kubernetes CronJob or run in a loop
-    when deployed as a long‑lived pod.
+    Invoked by a Kubernetes CronJob or run in a loop when deployed as a
+    long‑lived pod.
     """
-    client = get_client()
-    repos = fetch_trending_repos()
-    timestamp = datetime.datetime.utcnow().timestamp()
-    for repo in repos:
-        data = {
-            "source": "github",
-            "name": repo.get("name"),
-            "url": repo.get("html_url"),
-            "summary": repo.get("description", ""),
-            "timestamp": timestamp,
-        }
-        client.table("knowledge_base").insert(data).execute()
-    insert_log(
-        agent="GitHubScanner",
-        message=f"Processed {len(repos)} GitHub repos",
-        level="info",
-    )
+
+    async def scan() -> None:
+        try:
+            await run_scan()
+        finally:
+            await close_clients()
+
+    asyncio.run(scan())
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
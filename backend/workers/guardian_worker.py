@@ -4,13 +4,16 @@ This worker enforces the oath and integrity rules of the Infinity X One
 swarm.  It periodically scans the `agent_logs` table for anomalies,
 missing heartbeats or ethical violations and writes audit events to
 `integrity_events`.  In this stub it randomly flags logs as audits.
+Older logs are audited from the Parquet archive (see ``log_archive``).
 """
 
+import datetime
 import random
-import time
 from typing import Dict
 
-from ..supabase_utils import get_client, insert_log, fetch_pending_directives, mark_directive_complete
+from ..log_archive import iter_archive
+from ..supabase_utils import get_client, insert_log
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "Guardian"
 
@@ -35,27 +38,41 @@ def audit_logs() -> None:
     )
 
 
-def process_directive(directive: Dict) -> None:
-    directive_id = directive["id"]
-    command = directive["command"]
-    if command == "RUN_AUDIT":
-        audit_logs()
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "run_audit", "details": "completed"})
-    else:
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "unknown_directive", "details": command})
-    mark_directive_complete(directive_id)
+def run_audit(payload: Dict) -> None:
+    """Handle RUN_AUDIT: audit recent logs on demand."""
+    audit_logs()
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "run_audit", "details": "completed"})
+
+
+def audit_check() -> None:
+    """Perform audits every hour."""
+    audit_logs()
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "audit check"})
+
+
+def audit_archive(payload: Dict) -> None:
+    """Handle AUDIT_ARCHIVE: summarise archived logs per agent and event.
+
+    The payload may contain ``agent`` and ``days`` (default 7) to limit the
+    scan; the filters are pushed down into the Parquet reader.
+    """
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=float(payload.get("days", 7)))
+    agents = [payload["agent"]] if payload.get("agent") else None
+    counts: Dict[str, int] = {}
+    for row in iter_archive(since=since, agents=agents, columns=["agent", "event"]):
+        key = f"{row['agent']}:{row['event']}"
+        counts[key] = counts.get(key, 0) + 1
+    insert_log(
+        "agent_logs",
+        {"agent": AGENT_NAME, "event": "archive_audit", "details": {"since": since.isoformat(), "counts": counts}},
+    )
+
+
+HANDLERS = {"RUN_AUDIT": run_audit, "AUDIT_ARCHIVE": audit_archive}
 
 
 def run_worker() -> None:
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            process_directive(directives[0])
-        else:
-            # Perform audits every hour
-            audit_logs()
-            insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "audit check"})
-            time.sleep(3600)
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle=audit_check, idle_interval=3600).run()
 
 
 if __name__ == "__main__":
@@ -10,7 +10,8 @@ Moralis, Infura and Alchemy API key.
 import time
 from typing import Dict
 
-from ..supabase_utils import fetch_pending_directives, insert_log, mark_directive_complete
+from ..supabase_utils import insert_log
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "KeyHarvester"
 
@@ -26,35 +27,30 @@ def harvest_keys() -> Dict[str, str]:
     }
 
 
-def process_directive(directive: Dict) -> None:
-    directive_id = directive["id"]
-    command = directive["command"]
+def harvest(payload: Dict) -> None:
+    """Handle HARVEST_KEYS: harvest keys and store them."""
+    keys = harvest_keys()
+    # Insert each key into an `api_keys` table.  The table should be created
+    # in Supabase with columns: provider, key, ts
+    for provider, key in keys.items():
+        insert_log("api_keys", {"provider": provider, "key": key, "agent": AGENT_NAME})
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "harvested_keys", "details": keys})
 
-    if command == "HARVEST_KEYS":
-        keys = harvest_keys()
-        # Insert each key into an `api_keys` table.  The table should be created
-        # in Supabase with columns: provider, key, ts
-        for provider, key in keys.items():
-            insert_log("api_keys", {"provider": provider, "key": key, "agent": AGENT_NAME})
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "harvested_keys", "details": keys})
-    else:
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "unknown_directive", "details": command})
 
-    mark_directive_complete(directive_id)
+def default_harvest() -> None:
+    """In absence of directives, harvest keys periodically."""
+    keys = harvest_keys()
+    for provider, key in keys.items():
+        insert_log("api_keys", {"provider": provider, "key": key, "agent": AGENT_NAME})
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "harvested default keys"})
+
+
+HANDLERS = {"HARVEST_KEYS": harvest}
 
 
 def run_worker() -> None:
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            process_directive(directives[0])
-        else:
-            # In absence of directives, harvest keys periodically
-            keys = harvest_keys()
-            for provider, key in keys.items():
-                insert_log("api_keys", {"provider": provider, "key": key, "agent": AGENT_NAME})
-            insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "harvested default keys"})
-        time.sleep(1800)  # run every 30 minutes
+    # run every 30 minutes
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle=default_harvest, idle_interval=1800).run()
 
 
 if __name__ == "__main__":
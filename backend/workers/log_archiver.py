@@ -0,0 +1,63 @@
+"""Archival job for ``agent_logs``.
+
+Every worker writes heartbeats and detail rows to ``agent_logs``, making it
+the fastest growing table in the project.  This job moves rows older than
+``ARCHIVE_MAX_AGE_DAYS`` into Parquet cold storage (see ``log_archive``) and
+deletes them from Postgres, batch by batch, so the hot table stays roughly
+the same size while history remains queryable with
+:func:`log_archive.query_archive`.
+
+A batch is deleted only after its files have been written, so an
+interrupted run never loses rows; the next run rewrites the same files.
+
+Configuration (environment):
+
+* `ARCHIVE_MAX_AGE_DAYS` – Age after which rows are archived (default 30)
+* `ARCHIVE_BATCH_ROWS` – Rows moved per batch (default 5000)
+* `ARCHIVE_ROOT`, `ARCHIVE_COMPRESSION` – See ``log_archive``
+"""
+
+import datetime
+import os
+
+from ..log_archive import TABLE, write_rows
+from ..supabase_utils import get_client, insert_log
+
+AGENT_NAME = "LogArchiver"
+
+
+def archive_once(max_age_days: float, batch_rows: int) -> int:
+    """Archive and delete every row older than ``max_age_days``.
+
+    Returns:
+        The number of rows archived.
+    """
+    client = get_client()
+    cutoff = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=max_age_days)).isoformat()
+    archived = 0
+    last_id = None
+    while True:
+        query = client.table(TABLE).select("id, agent, event, details, ts").lt("ts", cutoff)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.order("id", desc=False).limit(batch_rows).execute().data or []
+        if not rows:
+            break
+        write_rows(rows)
+        first_id, last_id = rows[0]["id"], rows[-1]["id"]
+        # Every row in this id range older than the cutoff was in the batch.
+        client.table(TABLE).delete().gte("id", first_id).lte("id", last_id).lt("ts", cutoff).execute()
+        archived += len(rows)
+    return archived
+
+
+def main() -> None:
+    archived = archive_once(
+        float(os.getenv("ARCHIVE_MAX_AGE_DAYS", "30")),
+        int(os.getenv("ARCHIVE_BATCH_ROWS", "5000")),
+    )
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "logs_archived", "details": {"rows": archived}})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Partition maintenance job for Infinity X One.
+
+``agent_logs``, ``faucet_logs`` and ``profit_ledger`` are range partitioned
+by ``ts`` (see ``migrations/partition_logs.sql``).  This job calls
+``maintain_time_partitions`` once a day to create the partitions for the
+coming days or months ahead of time and to drop partitions older than each
+table's retention, which is configured in ``time_partitioned_tables``.
+"""
+
+from ..supabase_utils import get_client, insert_log
+
+AGENT_NAME = "PartitionMaintenance"
+
+
+def maintain() -> list:
+    """Run partition maintenance.
+
+    Returns:
+        The ``{"action", "partition_name"}`` rows for partitions created or dropped.
+    """
+    return get_client().rpc("maintain_time_partitions", {}).execute().data or []
+
+
+def main() -> None:
+    changes = maintain()
+    insert_log(
+        "agent_logs",
+        {
+            "agent": AGENT_NAME,
+            "event": "partitions_maintained",
+            "details": {
+                "created": [c["partition_name"] for c in changes if c["action"] == "created"],
+                "dropped": [c["partition_name"] for c in changes if c["action"] == "dropped"],
+            },
+        },
+    )
+
+
+if __name__ == "__main__":
+    main()
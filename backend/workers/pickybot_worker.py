@@ -1,26 +1,70 @@
 """PickyBot worker.
 
 PickyBot monitors efficiency metrics across the swarm and suggests
-optimisations.  It reads data from `faucet_logs`, `profit_ledger` and
-`swarm_state` and writes recommendations into Supabase.  This stub uses
-random values to simulate performance and flags agents below a threshold.
+optimisations.  It scores agents from the hourly rollups of `faucet_logs`
+and `profit_ledger` (see ``migrations/ledger_rollups.sql``), so each pass
+reads one row per hour and key rather than the raw logs, and flags agents
+below a threshold.
 """
 
-import random
-import time
+import datetime
 from typing import Dict
 
-from ..supabase_utils import get_client, insert_log, fetch_pending_directives, mark_directive_complete
+from ..supabase_utils import get_client, insert_log
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "PickyBot"
 
 
+ANALYSIS_WINDOW_HOURS = 24
+
+
 def analyse_performance() -> Dict[str, float]:
-    """Analyse agent performance and return a dict of agent → efficiency score."""
+    """Analyse agent performance and return a dict of agent → efficiency score.
+
+    An agent's score is the average of its claim success rate and its share
+    of the best agent's profit over the last ``ANALYSIS_WINDOW_HOURS``.
+    Agents that only appear in one of the rollups are scored on that part
+    alone.
+    """
     client = get_client()
-    # In a real implementation, compute scores based on logs and profits.
-    agents = ["FaucetHunter", "KeyHarvester", "Atlas", "FinSynapse", "AnomalyHunter"]
-    return {agent: random.uniform(0.5, 1.0) for agent in agents}
+    since = datetime.datetime.utcnow() - datetime.timedelta(hours=ANALYSIS_WINDOW_HOURS)
+    since_bucket = since.replace(minute=0, second=0, microsecond=0).isoformat()
+    claims_resp = (
+        client.table("faucet_logs_hourly")
+        .select("agent, claims, successes")
+        .gte("bucket", since_bucket)
+        .execute()
+    )
+    profit_resp = (
+        client.table("profit_ledger_hourly")
+        .select("agent, total")
+        .gte("bucket", since_bucket)
+        .execute()
+    )
+
+    claims: Dict[str, list] = {}
+    for row in claims_resp.data or []:
+        totals = claims.setdefault(row["agent"], [0, 0])
+        totals[0] += int(row.get("claims") or 0)
+        totals[1] += int(row.get("successes") or 0)
+    profits: Dict[str, float] = {}
+    for row in profit_resp.data or []:
+        profits[row["agent"]] = profits.get(row["agent"], 0.0) + float(row.get("total") or 0)
+
+    best_profit = max([p for p in profits.values() if p > 0], default=0.0)
+    scores: Dict[str, float] = {}
+    for agent in set(claims) | set(profits):
+        if not agent:
+            continue
+        parts = []
+        if agent in claims and claims[agent][0]:
+            parts.append(claims[agent][1] / claims[agent][0])
+        if agent in profits and best_profit:
+            parts.append(max(0.0, profits[agent]) / best_profit)
+        if parts:
+            scores[agent] = sum(parts) / len(parts)
+    return scores
 
 
 def suggest_actions(scores: Dict[str, float]) -> None:
@@ -34,29 +78,25 @@ def suggest_actions(scores: Dict[str, float]) -> None:
             )
 
 
-def process_directive(directive: Dict) -> None:
-    directive_id = directive["id"]
-    command = directive["command"]
-    if command == "ANALYSE_PERFORMANCE":
-        scores = analyse_performance()
-        suggest_actions(scores)
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "analysis_complete", "details": scores})
-    else:
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "unknown_directive", "details": command})
-    mark_directive_complete(directive_id)
+def run_analysis(payload: Dict) -> None:
+    """Handle ANALYSE_PERFORMANCE: score agents and suggest actions."""
+    scores = analyse_performance()
+    suggest_actions(scores)
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "analysis_complete", "details": scores})
+
+
+def daily_analysis() -> None:
+    """Run performance analysis daily."""
+    scores = analyse_performance()
+    suggest_actions(scores)
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "performance analysis"})
+
+
+HANDLERS = {"ANALYSE_PERFORMANCE": run_analysis}
 
 
 def run_worker() -> None:
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            process_directive(directives[0])
-        else:
-            # Run performance analysis daily
-            scores = analyse_performance()
-            suggest_actions(scores)
-            insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "performance analysis"})
-            time.sleep(86400)
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle=daily_analysis, idle_interval=86400).run()
 
 
 if __name__ == "__main__":
@@ -6,30 +6,17 @@ out to other agents by creating new directives.  It also manages
 periodic tasks such as writing memory checkpoints or scaling the swarm.
 """
 
-import time
 from typing import Dict, Any
 
-from ..supabase_utils import (
-    fetch_pending_directives,
-    insert_log,
-    mark_directive_complete,
-    get_client,
-)
+from ..supabase_utils import build_directive, dispatch_directives, insert_log
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "PromptWriter"
 
 
-def dispatch_directive(agent: str, command: str, payload: Dict[str, Any]) -> None:
-    """Create a new directive for another agent."""
-    client = get_client()
-    data = {
-        "agent": agent,
-        "command": command,
-        "payload": payload,
-        "status": "pending",
-        "timestamp": time.time(),
-    }
-    client.table("agent_directives").insert(data).execute()
+def dispatch_directive(agent: str, command: str, payload: Dict[str, Any]) -> int:
+    """Create a new directive for another agent and return its id."""
+    return dispatch_directives([build_directive(agent, command, payload)])[0]
 
 
 def process_initiate_protocol(payload: Dict[str, Any]) -> None:
@@ -57,43 +44,32 @@ def process_initiate_protocol(payload: Dict[str, Any]) -> None:
         },
     )
 
+    fan_out = []
     # Example: if Omega is in doctrines, start a replication of the swarm
     if "Omega Unified Unlock" in doctrines or "Infinity Alpha Prime Protocol" in doctrines:
-        dispatch_directive("Replicator", "REPLICATE_SWARM", {"agents": agents})
+        fan_out.append(build_directive("Replicator", "REPLICATE_SWARM", {"agents": agents}))
 
     # Always kick off a key harvest and compute provisioning at protocol start
-    dispatch_directive("KeyHarvester", "HARVEST_KEYS", {})
-    dispatch_directive("Atlas", "PROVISION_NODES", {"count": max(1, len(agents))})
-    dispatch_directive("FaucetHunter", "CLAIM_FAUCETS", {})
-    dispatch_directive("FinSynapse", "GENERATE_PROFITS", {})
-    dispatch_directive("Guardian", "RUN_AUDIT", {})
-    dispatch_directive("PickyBot", "ANALYSE_PERFORMANCE", {})
-
-
-def process_directive(directive: Dict[str, Any]) -> None:
-    directive_id = directive["id"]
-    command = directive["command"]
-    payload = directive.get("payload", {})
-    if command == "INITIATE_PROTOCOL":
-        process_initiate_protocol(payload)
-    else:
-        insert_log(
-            "agent_logs",
-            {"agent": AGENT_NAME, "event": "unknown_directive", "details": command},
-        )
-    mark_directive_complete(directive_id)
+    fan_out.extend([
+        build_directive("KeyHarvester", "HARVEST_KEYS"),
+        build_directive("Atlas", "PROVISION_NODES", {"count": max(1, len(agents))}),
+        build_directive("FaucetHunter", "CLAIM_FAUCETS"),
+        build_directive("FinSynapse", "GENERATE_PROFITS"),
+        build_directive("Guardian", "RUN_AUDIT"),
+        build_directive("PickyBot", "ANALYSE_PERFORMANCE"),
+    ])
+    # One insert for the whole fan‑out: either every agent is tasked or none is.
+    dispatch_directives(fan_out)
+
+
+HANDLERS = {"INITIATE_PROTOCOL": process_initiate_protocol}
 
 
 def run_worker() -> None:
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            process_directive(directives[0])
-        else:
-            # PromptWriter can perform maintenance tasks here, such as
-            # persisting memory or generating daily status reports.  For
-            # simplicity we just sleep.
-            time.sleep(120)
+    # PromptWriter can perform maintenance tasks while idle, such as
+    # persisting memory or generating daily status reports.  For
+    # simplicity it just waits for directives.
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle_interval=120).run()
 
 
 if __name__ == "__main__":
@@ -10,10 +10,10 @@ replication by logging which agents would be deployed to which nodes.
 
 import json
 import os
-import time
 from typing import Dict, List
 
-from ..supabase_utils import fetch_pending_directives, insert_log, mark_directive_complete
+from ..supabase_utils import insert_log
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "Replicator"
 
@@ -49,40 +49,29 @@ def replicate_agent(name: str, config: Dict[str, any]) -> List[Dict[str, str]]:
     return events
 
 
-def process_directive(directive: Dict) -> None:
-    directive_id = directive["id"]
-    command = directive["command"]
-    payload = directive.get("payload", {})
-
-    if command == "REPLICATE_SWARM":
-        # Load map and replicate specified agents; if no agents provided, replicate all
-        map_data = load_replicator_map()
-        agents_to_replicate = payload.get("agents") or list(map_data.keys())
-        all_events = []
-        for agent_name in agents_to_replicate:
-            cfg = map_data.get(agent_name)
-            if not cfg:
-                continue
-            events = replicate_agent(agent_name, cfg)
-            all_events.extend(events)
-            # Log replication details
-            for ev in events:
-                insert_log("replication_events", {"agent": AGENT_NAME, **ev})
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "replication_executed", "details": all_events})
-    else:
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "unknown_directive", "details": command})
-
-    mark_directive_complete(directive_id)
+def replicate_swarm(payload: Dict) -> None:
+    """Handle REPLICATE_SWARM: replicate the listed agents, or all of them."""
+    map_data = load_replicator_map()
+    agents_to_replicate = payload.get("agents") or list(map_data.keys())
+    all_events = []
+    for agent_name in agents_to_replicate:
+        cfg = map_data.get(agent_name)
+        if not cfg:
+            continue
+        events = replicate_agent(agent_name, cfg)
+        all_events.extend(events)
+        # Log replication details
+        for ev in events:
+            insert_log("replication_events", {"agent": AGENT_NAME, **ev})
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "replication_executed", "details": all_events})
+
+
+HANDLERS = {"REPLICATE_SWARM": replicate_swarm}
 
 
 def run_worker() -> None:
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            process_directive(directives[0])
-        else:
-            # Idle; replicator runs on demand
-            time.sleep(600)
+    # Idle; replicator runs on demand
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle_interval=600).run()
 
 
 if __name__ == "__main__":
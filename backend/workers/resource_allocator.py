@@ -2,7 +2,7 @@
 
 This worker monitors operational metrics to determine if additional agents
 should be spawned or scaled down.  It reads from the ``swarm_state`` and
-``profit_ledger`` tables to assess system performance and writes
+``profit_ledger_hourly`` tables to assess system performance and writes
 ``agent_directives`` entries to instruct the replicator to scale the
 swarm.  When profits are trending downward or the number of active
 agents falls below a desired threshold, new replicas are requested.
@@ -13,7 +13,7 @@ historical performance, resource usage and financial targets.
 """
 
 import datetime
-from ..supabase_utils import get_client
+from ..supabase_utils import dispatch_directives, get_client
 
 
 # Configuration constants.  Adjust these to tune scaling behaviour.
@@ -39,18 +39,19 @@ def main() -> None:
     else:
         active_agents = 0
 
-    # Calculate profit over the last 24 hours
+    # Calculate profit over the last 24 hours from the hourly rollup, which
+    # returns one row per hour and key instead of every ledger entry.
     twenty_four_hours_ago = datetime.datetime.utcnow() - datetime.timedelta(hours=24)
     profits_resp = (
-        client.table("profit_ledger")
-        .select("amount, ts")
-        .gte("ts", twenty_four_hours_ago.isoformat())
+        client.table("profit_ledger_hourly")
+        .select("total")
+        .gte("bucket", twenty_four_hours_ago.replace(minute=0, second=0, microsecond=0).isoformat())
         .execute()
     )
     total_profit = 0.0
     for record in profits_resp.data or []:
         try:
-            total_profit += float(record.get("amount", 0))
+            total_profit += float(record.get("total", 0))
         except Exception:
             continue
 
@@ -76,9 +77,8 @@ def main() -> None:
             "timestamp": datetime.datetime.utcnow().timestamp(),
         })
 
-    # Insert any directives into the database
-    for directive in directives:
-        client.table("agent_directives").insert(directive).execute()
+    # Insert any directives into the database in a single request
+    dispatch_directives(directives)
 
 
 if __name__ == "__main__":
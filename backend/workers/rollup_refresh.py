@@ -0,0 +1,44 @@
+"""Rollup refresh job for Infinity X One.
+
+``profit_ledger_hourly`` and ``faucet_logs_hourly`` (see
+``migrations/ledger_rollups.sql``) are kept current by insert triggers.
+Updates and deletes on the raw ledgers, or rows backfilled with an old
+``ts``, are not tracked incrementally, so this job periodically rebuilds the
+recent buckets from the base tables.  Pass ``--full`` to rebuild the entire
+history, e.g. after a manual data fix.
+
+Configuration (environment):
+
+* `ROLLUP_REFRESH_HOURS` – How many hours back to rebuild (default 48)
+"""
+
+import datetime
+import os
+import sys
+from typing import Optional
+
+from ..supabase_utils import get_client, insert_log
+
+AGENT_NAME = "RollupRefresh"
+
+
+def refresh(hours: Optional[float]) -> None:
+    """Rebuild rollup buckets from ``hours`` ago onwards, or all of them when ``None``."""
+    client = get_client()
+    since = None
+    if hours is not None:
+        since = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=hours)).isoformat()
+    client.rpc("refresh_ledger_rollups", {"p_since": since}).execute()
+    insert_log(
+        "agent_logs",
+        {"agent": AGENT_NAME, "event": "rollups_refreshed", "details": {"since": since or "all"}},
+    )
+
+
+def main() -> None:
+    hours = None if "--full" in sys.argv[1:] else float(os.getenv("ROLLUP_REFRESH_HOURS", "48"))
+    refresh(hours)
+
+
+if __name__ == "__main__":
+    main()
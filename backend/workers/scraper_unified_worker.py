@@ -1,101 +1,264 @@
-"""Unified scraper worker for Infinity X One.
+"""Unified scraper worker for Infinity X One.
 
-This worker executes configured scraping jobs stored in the ``scraper_jobs``
-table.  For each job it determines which underlying scraper module to
-invoke based on the ``source`` field.  Results are inserted into the
-specified ``results_table`` (usually ``scraper_results``) and the job
-metadata is updated to reflect the last run time and status.
+This worker executes the configured scraping jobs in the ``scraper_jobs``
+table that are due.  A job is due when its ``next_run_at`` has passed; after
+each run ``last_run`` is recorded and ``next_run_at`` is moved on by the
+job's ``frequency`` (see ``scraper_schedule``).  Jobs that are not due are
+never loaded, so the CronJob can run often and finds nothing to do most of
+the time.
+
+Due jobs run concurrently on one event loop with a bounded number in
+flight and a timeout per job.  They share one connection pool, and
+requests are paced per target host, so a slow or rate‑limited site only
+holds up its own jobs.  Targets are revalidated with conditional requests
+against a local response cache (see ``scraper_http``), kept per job and
+results table; a target that has not changed since the job last stored it
+costs a ``304`` and is neither parsed nor written.  A response is
+only added to the cache once the job's results are stored, so a failed
+job fetches its target in full on the next run.  For each job the
+worker picks a scraper based on the ``source`` field.  ``web`` fetches the
+job ``url`` and ``github`` searches repositories for the job ``query``.
+A ``web`` job's ``parse_rules`` (CSS selectors or JSON paths, see
+``parse_rules``) are applied to the response and stored under ``fields``.
+Results are stored in the job's ``results_table`` (usually
+``scraper_results``), one row per job and URL.  A row is only rewritten
+when its content changes (see ``content_hash``).  A custom results table
+needs the same ``url_hash`` and ``content_hash`` columns and unique key as
+``scraper_results``.
 
 Jobs can be created via the ``/api/scraper-jobs`` endpoint exposed by
 the handshake server.  The unified framework allows new scraping
 sources (e.g. Twitter, Discord) to be integrated by extending the
 ``run_scraper`` function below.
 
-Note: The concrete scraper functions imported here are stubbed out in
-the repository.  Replace them with real scraping logic as needed.
+Configuration (environment):
+
+* `SCRAPER_MAX_JOBS` – Due jobs picked up per run (default 500)
+* `GITHUB_TOKEN` – Optional token for the GitHub search API (higher rate limit)
+
+See ``scraper_schedule`` for concurrency, timeout and per‑host limits and
+``scraper_http`` for the connection pool and cache.
 """
 
+import asyncio
 import datetime
-import json
-from typing import Any, Dict
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from ..content_hash import fingerprint
+from ..parse_rules import compile_rules
+from ..scraper_http import ScraperHttp, default_cache
+from ..scraper_schedule import HostLimiter, next_run, run_bounded
+from ..supabase_async import close_clients, get_client, insert_log, upsert_changed
+
+AGENT_NAME = "ScraperUnified"
+GITHUB_API = "https://api.github.com"
+_TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_HEAD_BYTES = 64 * 1024
+
+
+def _cache_variant(job: Dict[str, Any], extra: str = "") -> str:
+    """Cache variant for a job's fetches.
+
+    A ``304`` is taken to mean the job's results are already stored, which
+    only holds for the job and results table that stored them.
+    """
+    return f"{job.get('id')}:{job.get('results_table') or 'scraper_results'}:{extra}"
 
-from ..supabase_utils import get_client
 
+async def scrape_web(job: Dict[str, Any], http: ScraperHttp) -> Optional[Dict[str, Any]]:
+    """Fetch the job ``url`` and summarise the page; ``None`` if it is unchanged."""
+    url = job.get("url")
+    if not url:
+        raise ValueError("web job has no url")
+    rules = compile_rules(job["parse_rules"]) if job.get("parse_rules") else None
+    # New rules must see the page again even if the page itself is unchanged.
+    variant = _cache_variant(job, rules.digest if rules is not None else "")
+    response = await http.get(url, variant=variant, hold=job.get("id"))
+    if response.not_modified:
+        return None
+    content_type = response.headers.get("content-type", "")
+    # Only the head is searched for the title, not the whole page.
+    title = None if "json" in content_type else _TITLE.search(
+        response.content[:_HEAD_BYTES].decode(response.charset, errors="replace")
+    )
+    summary: Dict[str, Any] = {
+        "status": response.status,
+        "content_type": content_type or None,
+        "length": len(response.content),
+        "title": title.group(1).strip() if title else None,
+    }
+    if rules is not None:
+        # Extraction is CPU bound on large pages; keep it off the event loop.
+        summary["fields"] = await asyncio.to_thread(rules.apply, response.content, content_type, response.charset)
+    return {response.url: summary}
 
-def run_scraper(job: Dict[str, Any]) -> Dict[str, Any]:
+
+async def scrape_github(job: Dict[str, Any], http: ScraperHttp) -> Optional[Dict[str, Any]]:
+    """Search GitHub repositories matching the job ``query``; ``None`` if unchanged."""
+    query = job.get("query")
+    if not query:
+        raise ValueError("github job has no query")
+    headers = {"Accept": "application/vnd.github+json"}
+    if os.getenv("GITHUB_TOKEN"):
+        headers["Authorization"] = f"Bearer {os.getenv('GITHUB_TOKEN')}"
+    response = await http.get(
+        f"{GITHUB_API}/search/repositories",
+        params={"q": query, "sort": "updated", "per_page": 50},
+        headers=headers,
+        variant=_cache_variant(job),
+        hold=job.get("id"),
+    )
+    if response.not_modified:
+        return None
+    return {
+        repo["html_url"]: {
+            "name": repo.get("full_name"),
+            "description": repo.get("description"),
+            "stars": repo.get("stargazers_count"),
+            "language": repo.get("language"),
+            "updated_at": repo.get("updated_at"),
+        }
+        for repo in response.json().get("items", [])
+    }
+
+
+async def run_scraper(job: Dict[str, Any], http: ScraperHttp) -> Optional[Dict[str, Any]]:
     """Dispatch to the appropriate scraper based on job source.
 
-    If the source is unrecognized or the scraper returns no data, an
-    empty dictionary is returned.  Extend this function to support
-    additional sources or custom parsing logic.
+    Returns a mapping of result URL to the fields scraped from it, or
+    ``None`` when the target answered ``304 Not Modified``.  If the source
+    is unrecognized or the scraper returns no data, an empty dictionary is
+    returned.  Extend this function to support additional
+    sources or custom parsing logic.
     """
     source = job.get("source")
-    # Lazy import to avoid unused dependencies
+    if source == "web":
+        return await scrape_web(job, http)
     if source == "github":
-        try:
-            from github_scraper import scrape_github_faucets  # type: ignore
-            return scrape_github_faucets() or {}
-        except Exception as exc:
-            print(f"[scraper_unified] error scraping GitHub: {exc}")
-    elif source == "web":
-        try:
-            from html_scraper import scrape_web_faucets  # type: ignore
-            return scrape_web_faucets() or {}
-        except Exception as exc:
-            print(f"[scraper_unified] error scraping Web: {exc}")
-    elif source == "darkweb":
+        return await scrape_github(job, http)
+    if source == "darkweb":
         try:
             from black_site_scanner import scan_darkweb  # type: ignore
-            scan_darkweb()
-            # No results returned for darkweb scanner stub
-            return {}
+            await asyncio.to_thread(scan_darkweb)
         except Exception as exc:
             print(f"[scraper_unified] error scanning dark web: {exc}")
+        # No results returned for darkweb scanner stub
+        return {}
     # Unknown source or unsupported
     print(f"[scraper_unified] unsupported source: {source}")
     return {}
 
 
-def main() -> None:
-    """Entry point for the unified scraper worker.
+async def due_jobs(client: Any, now: datetime.datetime) -> List[Dict[str, Any]]:
+    """Return the jobs whose ``next_run_at`` has passed, most overdue first."""
+    response = await (
+        client.table("scraper_jobs")
+        .select("*")
+        .lte("next_run_at", now.isoformat())
+        .order("next_run_at", desc=False)
+        .limit(int(os.getenv("SCRAPER_MAX_JOBS", "500")))
+        .execute()
+    )
+    return response.data or []
 
-    Fetches all scheduled jobs from ``scraper_jobs``, runs each one and
-    inserts the results into the configured results table.  Updates
-    ``last_run`` and ``status`` fields upon completion.  Errors are
-    printed to the console but do not stop the worker from processing
-    subsequent jobs.
+
+def result_rows(job: Dict[str, Any], outcome: Dict[str, Any], fetched_at: datetime.datetime) -> List[Dict[str, Any]]:
+    """Build fingerprinted result rows for a job's scraped records."""
+    rows = []
+    for url, value in outcome.items():
+        data = {"url": url, **value}
+        url_hash, content_hash = fingerprint(url, data)
+        rows.append(
+            {
+                "job_id": job["id"],
+                "data": data,
+                "fetched_at": fetched_at.isoformat(),
+                "url_hash": url_hash,
+                "content_hash": content_hash,
+            }
+        )
+    return rows
+
+
+async def _finish(client: Any, job: Dict[str, Any], started: datetime.datetime, status: str) -> None:
+    update = {"last_run": started.isoformat(), "status": status}
+    try:
+        update["next_run_at"] = next_run(job.get("frequency", ""), started).isoformat()
+    except ValueError as exc:
+        # Leave a bad frequency visible on the job and retry it in a day.
+        print(f"[scraper_unified] job {job['id']}: {exc}")
+        update["status"] = "invalid_frequency"
+        update["next_run_at"] = (started + datetime.timedelta(days=1)).isoformat()
+    await client.table("scraper_jobs").update(update).eq("id", job["id"]).execute()
+
+
+async def run_due_jobs() -> Dict[str, int]:
+    """Run every due job once and record its outcome.
+
+    Returns:
+        The number of jobs that ``completed`` (of which ``not_modified``
+        found their target unchanged), ``failed`` or ``timed_out``, the
+        number of ``results`` scraped and how many of those were new or
+        changed (``results_written``).
     """
-    client = get_client()
-    jobs_resp = client.table("scraper_jobs").select("*").execute()
-    jobs = jobs_resp.data or []
-    now = datetime.datetime.utcnow().isoformat()
-    for job in jobs:
+    client = await get_client()
+    started = datetime.datetime.now(datetime.timezone.utc)
+    jobs = await due_jobs(client, started)
+    counts = {"completed": 0, "failed": 0, "timed_out": 0, "not_modified": 0, "results": 0, "results_written": 0}
+    if not jobs:
+        return counts
+
+    async with ScraperHttp(HostLimiter(), default_cache()) as http:
+        outcomes = await run_bounded(jobs, lambda job: run_scraper(job, http))
+
+    for job, outcome in outcomes:
+        if isinstance(outcome, asyncio.TimeoutError):
+            status = "timed_out"
+        elif isinstance(outcome, Exception):
+            print(f"[scraper_unified] error processing job {job.get('id')}: {outcome}")
+            status = "failed"
+        else:
+            status = "completed"
+            # Unchanged targets cost a 304 and nothing else.
+            counts["not_modified"] += outcome is None
         try:
-            data = run_scraper(job)
-            if data:
-                # Insert results into target table
-                table_name = job.get("results_table", "scraper_results")
-                records = []
-                for key, value in data.items():
-                    records.append({
-                        "job_id": job["id"],
-                        "data": {"url": key, **value},
-                        "fetched_at": now,
-                    })
-                client.table(table_name).insert(records).execute()
-            # Update job metadata
-            client.table("scraper_jobs").update({
-                "last_run": now,
-                "status": "completed"
-            }).eq("id", job["id"]).execute()
+            if status == "completed" and outcome:
+                rows = result_rows(job, outcome, started)
+                counts["results"] += len(rows)
+                counts["results_written"] += await upsert_changed(
+                    job.get("results_table") or "scraper_results", rows, {"job_id": job["id"]}
+                )
         except Exception as exc:
-            print(f"[scraper_unified] error processing job {job.get('id')}: {exc}")
-            # Mark job as failed
-            client.table("scraper_jobs").update({
-                "last_run": now,
-                "status": "failed"
-            }).eq("id", job["id"]).execute()
+            print(f"[scraper_unified] could not store results of job {job.get('id')}: {exc}")
+            status = "failed"
+        # Trust the new validators only once the results they stand for are stored.
+        if status == "completed":
+            await http.commit(job.get("id"))
+        else:
+            http.discard(job.get("id"))
+        try:
+            await _finish(client, job, started, status)
+        except Exception as exc:
+            # The job keeps its old next_run_at and is retried on the next run.
+            print(f"[scraper_unified] could not update job {job.get('id')}: {exc}")
+        counts[status] += 1
+    await insert_log("agent_logs", {"agent": AGENT_NAME, "event": "scraper_run", "details": {"due": len(jobs), **counts}})
+    return counts
+
+
+def main() -> None:
+    """Entry point for the unified scraper worker."""
+
+    async def run() -> None:
+        try:
+            await run_due_jobs()
+        finally:
+            await close_clients()
+
+    asyncio.run(run())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
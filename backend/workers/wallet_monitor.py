@@ -9,11 +9,11 @@ logs stubbed balances to Supabase.
 """
 
 import os
-import time
 import random
 from typing import Dict
 
-from ..supabase_utils import fetch_pending_directives, insert_log, mark_directive_complete
+from ..supabase_utils import insert_log
+from ..worker_runtime import WorkerRuntime
 
 AGENT_NAME = "WalletMonitor"
 
@@ -36,33 +36,28 @@ def fetch_balances(addresses: Dict[str, str]) -> Dict[str, float]:
     return {addr: round(random.uniform(0.0, 1.0), 4) for addr in addresses.values()}
 
 
-def process_directive(directive: Dict) -> None:
-    directive_id = directive["id"]
-    command = directive["command"]
-    addresses = get_wallet_addresses()
-    if command == "CHECK_BALANCES":
-        balances = fetch_balances(addresses)
-        for addr, bal in balances.items():
-            insert_log("wallet_balances", {"agent": AGENT_NAME, "address": addr, "balance": bal})
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "balances_fetched", "details": balances})
-    else:
-        insert_log("agent_logs", {"agent": AGENT_NAME, "event": "unknown_directive", "details": command})
-    mark_directive_complete(directive_id)
+def check_balances(payload: Dict) -> None:
+    """Handle CHECK_BALANCES: fetch and record balances for every wallet."""
+    balances = fetch_balances(get_wallet_addresses())
+    for addr, bal in balances.items():
+        insert_log("wallet_balances", {"agent": AGENT_NAME, "address": addr, "balance": bal})
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "balances_fetched", "details": balances})
+
+
+def daily_balances() -> None:
+    """By default, log balances daily."""
+    balances = fetch_balances(get_wallet_addresses())
+    for addr, bal in balances.items():
+        insert_log("wallet_balances", {"agent": AGENT_NAME, "address": addr, "balance": bal})
+    insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "logged wallet balances"})
+
+
+HANDLERS = {"CHECK_BALANCES": check_balances}
 
 
 def run_worker() -> None:
-    while True:
-        directives = fetch_pending_directives(AGENT_NAME)
-        if directives:
-            process_directive(directives[0])
-        else:
-            # By default, log balances daily
-            addresses = get_wallet_addresses()
-            balances = fetch_balances(addresses)
-            for addr, bal in balances.items():
-                insert_log("wallet_balances", {"agent": AGENT_NAME, "address": addr, "balance": bal})
-            insert_log("agent_logs", {"agent": AGENT_NAME, "event": "heartbeat", "details": "logged wallet balances"})
-            time.sleep(86400)  # once per day
+    # once per day
+    WorkerRuntime(AGENT_NAME, HANDLERS, idle=daily_balances, idle_interval=86400).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,14 @@
+"""Benchmarks for Infinity X One.
+
+These scripts exercise the backend against local stand‑ins for Supabase so
+that throughput and latency can be measured without a live project.
+``postgrest_stub`` answers HTTP with canned rows.  ``fake_supabase`` is an
+in‑process SQLite store behind the supabase-py query builder, so data
+really flows between the handshake server and the workers.  Run
+them from the repository root, for example:
+
+```bash
+python -m benchmarks.handshake_concurrency
+python -m benchmarks.suite --json baseline.json
+```
+"""
@@ -0,0 +1,184 @@
+"""Plan regression check for ``migrations/query_indexes.sql``.
+
+Creates a scratch schema in a local Postgres, loads synthetic tables shaped
+like production (many processed rows, few pending ones, many agents and
+symbols), applies the index migration and runs ``EXPLAIN`` on the query
+shapes the backend issues.  Each case names the index its plan must use and
+whether the plan must be an index-only scan.  The schema is dropped
+afterwards.  The exit status is non-zero if any plan regresses, so the
+script can run in CI next to a throwaway Postgres container.
+
+Usage::
+
+    python -m benchmarks.explain_indexes --dsn postgresql://postgres@localhost/postgres
+
+``--dsn`` defaults to ``EXPLAIN_DB_URL``.  Needs ``psycopg``.
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+from typing import Any, Dict, Iterator, List, NamedTuple
+
+import psycopg
+
+MIGRATION = pathlib.Path(__file__).resolve().parent.parent / "migrations" / "query_indexes.sql"
+
+FIXTURE = """
+CREATE TABLE agent_directives (
+  id BIGSERIAL PRIMARY KEY, agent TEXT, command TEXT, payload JSONB, status TEXT, "timestamp" DOUBLE PRECISION,
+  lease_owner TEXT, lease_expires_at TIMESTAMP WITH TIME ZONE, attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX idx_agent_directives_status ON agent_directives(status, "timestamp");
+INSERT INTO agent_directives (agent, command, payload, status, "timestamp")
+SELECT 'agent-' || (g % 50), 'RUN', '{"n": 1}', CASE WHEN g % 100 = 0 THEN 'pending' ELSE 'complete' END, g
+  FROM generate_series(1, 200000) g;
+
+CREATE TABLE predictions (
+  id BIGSERIAL PRIMARY KEY, symbol TEXT NOT NULL, prediction JSONB NOT NULL, predicted_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+INSERT INTO predictions (symbol, prediction, predicted_at)
+SELECT 'SYM' || (g % 200), '{"p": 1}', NOW() - g * INTERVAL '1 minute' FROM generate_series(1, 100000) g;
+
+CREATE TABLE swarm_state (
+  id BIGSERIAL PRIMARY KEY, active_agents INT, swarm_mode TEXT, heartbeat TEXT, notes TEXT, "timestamp" DOUBLE PRECISION
+);
+INSERT INTO swarm_state (active_agents, swarm_mode, heartbeat, notes, "timestamp")
+SELECT g % 40, 'autonomous', 'ok', 'note', g FROM generate_series(1, 50000) g;
+
+CREATE TABLE faucet_yields (id BIGSERIAL PRIMARY KEY, yield_usd NUMERIC, "timestamp" DOUBLE PRECISION);
+INSERT INTO faucet_yields (yield_usd, "timestamp") SELECT g / 100.0, g FROM generate_series(1, 50000) g;
+
+CREATE TABLE portfolio_assets (id BIGSERIAL PRIMARY KEY, wallet_id BIGINT, coin TEXT, balance NUMERIC, usd_value NUMERIC);
+INSERT INTO portfolio_assets (wallet_id, coin, balance, usd_value)
+SELECT g % 10000, 'ETH', 1, 2 FROM generate_series(1, 100000) g;
+
+CREATE TABLE feedback (id BIGSERIAL PRIMARY KEY, message TEXT, sentiment TEXT, status TEXT);
+INSERT INTO feedback (message, sentiment, status)
+SELECT 'msg', 'neutral', CASE WHEN g % 200 = 0 THEN 'pending' ELSE 'processed' END FROM generate_series(1, 100000) g;
+
+CREATE TABLE mutation_queue (id BIGSERIAL PRIMARY KEY, config JSONB, status TEXT);
+INSERT INTO mutation_queue (config, status)
+SELECT '{}', CASE WHEN g % 200 = 0 THEN 'pending' ELSE 'complete' END FROM generate_series(1, 100000) g;
+"""
+
+
+class Case(NamedTuple):
+    name: str
+    sql: str
+    index: str
+    index_only: bool = False
+
+
+CASES: List[Case] = [
+    Case(
+        "fetch_directive",
+        "SELECT id, command, payload FROM agent_directives"
+        " WHERE agent = 'agent-7' AND status = 'pending' ORDER BY \"timestamp\" LIMIT 1",
+        "idx_agent_directives_pending",
+    ),
+    Case(
+        # The statement inside the claim_directives RPC (migrations/directive_queue.sql).
+        # Locking the rows visits the heap, so no index-only scan is expected.
+        "claim_directives",
+        "UPDATE agent_directives d SET status = 'claimed', lease_owner = 'worker-1',"
+        " lease_expires_at = NOW() + make_interval(secs => 300), attempts = d.attempts + 1"
+        " WHERE d.id IN (SELECT c.id FROM agent_directives c WHERE c.agent = 'agent-7' AND c.status = 'pending'"
+        " ORDER BY c.\"timestamp\" LIMIT 5 FOR UPDATE SKIP LOCKED)"
+        " RETURNING d.id, d.command, d.payload, d.attempts, d.lease_expires_at",
+        "idx_agent_directives_pending",
+    ),
+    Case(
+        "predictions_by_symbol",
+        "SELECT id, symbol, prediction, predicted_at FROM predictions"
+        " WHERE symbol = 'SYM7' ORDER BY predicted_at DESC LIMIT 50",
+        "idx_predictions_symbol_predicted_at",
+    ),
+    Case(
+        "predictions_latest",
+        "SELECT id, symbol, prediction, predicted_at FROM predictions ORDER BY predicted_at DESC LIMIT 50",
+        "idx_predictions_predicted_at",
+    ),
+    Case(
+        "swarm_state_latest",
+        "SELECT active_agents, \"timestamp\" FROM swarm_state ORDER BY \"timestamp\" DESC LIMIT 1",
+        "idx_swarm_state_timestamp",
+        index_only=True,
+    ),
+    Case(
+        "faucet_yields_recent",
+        "SELECT id, yield_usd, \"timestamp\" FROM faucet_yields ORDER BY \"timestamp\" DESC LIMIT 30",
+        "idx_faucet_yields_timestamp",
+        index_only=True,
+    ),
+    Case(
+        "wallet_assets",
+        "SELECT wallet_id, coin, balance, usd_value FROM portfolio_assets WHERE wallet_id IN (1, 2, 3, 4, 5)",
+        "idx_portfolio_assets_wallet",
+        index_only=True,
+    ),
+    Case(
+        "feedback_pending",
+        "SELECT id, message, sentiment FROM feedback WHERE status = 'pending'",
+        "idx_feedback_pending",
+    ),
+    Case(
+        "mutation_queue_pending",
+        "SELECT id, config FROM mutation_queue WHERE status = 'pending'",
+        "idx_mutation_queue_pending",
+    ),
+]
+
+
+def _nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def check(conn: psycopg.Connection, case: Case) -> str:
+    """Return an empty string if the plan for ``case`` is as expected, else a reason."""
+    plan = conn.execute(f"EXPLAIN (FORMAT JSON) {case.sql}").fetchone()[0][0]["Plan"]
+    nodes = list(_nodes(plan))
+    using = [node for node in nodes if node.get("Index Name") == case.index]
+    if not using:
+        found = sorted({f"{node['Node Type']} ({node['Index Name']})" if "Index Name" in node else node["Node Type"] for node in nodes})
+        return f"does not use {case.index}: {', '.join(found)}"
+    if case.index_only and not any(node["Node Type"] == "Index Only Scan" for node in using):
+        return f"{using[0]['Node Type']} instead of Index Only Scan"
+    return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", default=os.getenv("EXPLAIN_DB_URL"))
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("--dsn or EXPLAIN_DB_URL is required")
+
+    schema = f"explain_check_{os.getpid()}"
+    failures = 0
+    with psycopg.connect(args.dsn, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+        try:
+            conn.execute(f"SET search_path TO {schema}")
+            conn.execute(FIXTURE)
+            conn.execute(MIGRATION.read_text())
+            # Index-only scans need an up to date visibility map.
+            conn.execute(
+                "VACUUM ANALYZE agent_directives, predictions, swarm_state, faucet_yields,"
+                " portfolio_assets, feedback, mutation_queue"
+            )
+            print(f"{'case':<24} {'result':<6} detail")
+            for case in CASES:
+                reason = check(conn, case)
+                failures += bool(reason)
+                print(f"{case.name:<24} {'FAIL' if reason else 'ok':<6} {reason or case.index}")
+        finally:
+            conn.execute(f"DROP SCHEMA {schema} CASCADE")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
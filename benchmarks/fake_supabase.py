@@ -0,0 +1,563 @@
+"""In‑process stand‑in for the supabase-py table API, backed by SQLite.
+
+:class:`PostgrestStub` only measures client behaviour: every ``GET`` gets
+the same canned row.  Benchmarks that follow data through the system, such
+as a directive dispatched by the handshake server, claimed by a worker and
+marked complete, need a store that actually filters, orders and updates.
+:class:`FakeDatabase` is that store.  It is an in‑memory SQLite database
+with the query builder surface used in ``backend``::
+
+    db.client().table("agent_directives").select("id, command").eq("agent", a) \\
+        .order("timestamp").limit(5).execute().data
+
+The supported calls are ``select`` (with ``count="exact"``), ``insert``,
+``update``, ``delete`` and ``upsert``, plus the filters ``eq``, ``neq``,
+``gt``, ``gte``, ``lt``, ``lte``, ``in_`` and ``is_``, and ``order``,
+``limit`` and ``range``.  Tables and columns are created the first time they
+are written or read, and dict and list values come back as JSON.  ``rpc``
+implements the directive queue functions from
+``migrations/directive_queue.sql`` and the ``/api/metrics`` rollups.
+Further functions can be added with :meth:`FakeDatabase.register_rpc`.
+
+Every request sleeps for ``latency`` plus up to ``jitter`` seconds, which
+stands in for the network round trip to Supabase.  The async client awaits
+the delay, so concurrent requests overlap as they would over HTTP.
+:func:`install` registers both clients in the ``supabase_utils`` and
+``supabase_async`` pools.  After that, unchanged backend code talks to the
+fake.  Those calls bypass the instrumented HTTP transport, so they do not
+show up in the Supabase metrics or spans.
+"""
+
+import asyncio
+import datetime
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Rpc = Callable[["FakeDatabase", Dict[str, Any]], Any]
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _quote(name: str) -> str:
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"unsupported identifier {name!r}")
+    return f'"{name}"'
+
+
+class FakeResponse:
+    """Result of ``execute()``, shaped like supabase-py's ``APIResponse``."""
+
+    def __init__(self, data: Any, count: Optional[int] = None) -> None:
+        self.data = data
+        self.count = count
+
+
+class FakeDatabase:
+    """SQLite store shared by the sync and async fake clients.
+
+    Args:
+        latency: Seconds added to every request.
+        jitter: Upper bound of a random extra delay per request.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.calls: Counter = Counter()
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        # Column names per table, and the columns holding JSON or booleans.
+        self._columns: Dict[str, List[str]] = {}
+        self._json: Dict[str, set] = {}
+        self._bool: Dict[str, set] = {}
+        self._rpcs: Dict[str, Rpc] = dict(_RPCS)
+
+    # -- clients --------------------------------------------------------------
+
+    def client(self) -> "FakeClient":
+        """Return a synchronous client for this database."""
+        return FakeClient(self)
+
+    def async_client(self) -> "AsyncFakeClient":
+        """Return an asyncio client for this database."""
+        return AsyncFakeClient(self)
+
+    def register_rpc(self, name: str, function: Rpc) -> None:
+        """Serve ``client.rpc(name, params)`` with ``function(db, params)``."""
+        self._rpcs[name] = function
+
+    def delay(self) -> float:
+        """Return the simulated round trip for one request."""
+        return self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    # -- schema ---------------------------------------------------------------
+
+    def _ensure(self, table: str, columns: List[str]) -> None:
+        known = self._columns.get(table)
+        if known is None:
+            self._conn.execute(f"CREATE TABLE {_quote(table)} (id INTEGER PRIMARY KEY AUTOINCREMENT)")
+            known = self._columns[table] = ["id"]
+            self._json[table] = set()
+            self._bool[table] = set()
+        for column in columns:
+            if column not in known:
+                self._conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)}")
+                known.append(column)
+
+    def _encode(self, table: str, column: str, value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            self._json[table].add(column)
+            return json.dumps(value)
+        if isinstance(value, bool):
+            self._bool[table].add(column)
+            return int(value)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        return value
+
+    def _decode(self, table: str, row: sqlite3.Row) -> Dict[str, Any]:
+        result = dict(row)
+        for column in self._json.get(table, set()) & result.keys():
+            if isinstance(result[column], str):
+                result[column] = json.loads(result[column])
+        for column in self._bool.get(table, set()) & result.keys():
+            if result[column] is not None:
+                result[column] = bool(result[column])
+        return result
+
+    # -- execution ------------------------------------------------------------
+
+    def query(self, table: str, sql: str, params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
+        """Run raw SQL against the store and decode the rows of ``table``."""
+        with self._lock:
+            return [self._decode(table, row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def _run(self, request: "_Request") -> FakeResponse:
+        self.calls[(request.table, request.operation)] += 1
+        with self._lock:
+            return request.run(self)
+
+    def _call_rpc(self, name: str, params: Dict[str, Any]) -> FakeResponse:
+        self.calls[(name, "rpc")] += 1
+        function = self._rpcs.get(name)
+        if function is None:
+            raise LookupError(f"function {name} is not implemented by FakeDatabase")
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                data = function(self, params or {})
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return FakeResponse(data)
+
+    def seed(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """Insert ``rows`` without latency, for setting up a benchmark."""
+        if rows:
+            with self._lock:
+                _Request(table, "insert", rows=rows).run(self)
+
+
+class _Request:
+    """One PostgREST request under construction."""
+
+    def __init__(self, table: str, operation: str, rows: Optional[List[Dict[str, Any]]] = None,
+                 values: Optional[Dict[str, Any]] = None, columns: str = "*", count: Optional[str] = None,
+                 on_conflict: str = "", ignore_duplicates: bool = False) -> None:
+        self.table = table
+        self.operation = operation
+        self.rows = rows
+        self.values = values
+        self.columns = columns
+        self.count = count
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.orders: List[Tuple[str, bool, Optional[bool]]] = []
+        self.limit_rows: Optional[int] = None
+        self.offset_rows = 0
+
+    # -- filters and modifiers ------------------------------------------------
+
+    def _filter(self, column: str, operator: str, value: Any) -> "_Request":
+        self.filters.append((column, operator, value))
+        return self
+
+    def eq(self, column: str, value: Any) -> "_Request":
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any) -> "_Request":
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any) -> "_Request":
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any) -> "_Request":
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any) -> "_Request":
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any) -> "_Request":
+        return self._filter(column, "lte", value)
+
+    def in_(self, column: str, values: List[Any]) -> "_Request":
+        return self._filter(column, "in", list(values))
+
+    def is_(self, column: str, value: Any) -> "_Request":
+        return self._filter(column, "is", value)
+
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None) -> "_Request":
+        self.orders.append((column, desc, nullsfirst))
+        return self
+
+    def limit(self, size: int) -> "_Request":
+        self.limit_rows = size
+        return self
+
+    def range(self, start: int, end: int) -> "_Request":
+        self.offset_rows = start
+        self.limit_rows = end - start + 1
+        return self
+
+    # -- SQL ------------------------------------------------------------------
+
+    def _select_list(self) -> List[str]:
+        if self.columns.strip() == "*":
+            return []
+        return [column.strip() for column in self.columns.split(",") if column.strip()]
+
+    def _where(self, db: FakeDatabase) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for column, operator, value in self.filters:
+            name = _quote(column)
+            if operator == "in":
+                if not value:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{name} IN ({', '.join('?' * len(value))})")
+                params.extend(db._encode(self.table, column, v) for v in value)
+            elif operator == "is":
+                keyword = {"null": "NULL", "true": "1", "false": "0"}[str(value).lower()]
+                clauses.append(f"{name} IS {keyword}")
+            else:
+                clauses.append(f"{name} {_OPERATORS[operator]} ?")
+                params.append(db._encode(self.table, column, value))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _order_by(self) -> str:
+        if not self.orders:
+            return ""
+        terms = []
+        for column, desc, nullsfirst in self.orders:
+            # PostgreSQL sorts NULLs as larger than any value.
+            nulls = nullsfirst if nullsfirst is not None else desc
+            terms.append(f"{_quote(column)} {'DESC' if desc else 'ASC'} NULLS {'FIRST' if nulls else 'LAST'}")
+        return " ORDER BY " + ", ".join(terms)
+
+    def run(self, db: FakeDatabase) -> FakeResponse:
+        referenced = [column for column, _, _ in self.filters] + [column for column, _, _ in self.orders]
+        if self.operation in ("insert", "upsert"):
+            referenced += [column for row in self.rows for column in row]
+        elif self.operation == "update":
+            referenced += list(self.values)
+        else:
+            referenced += self._select_list()
+        db._ensure(self.table, list(dict.fromkeys(referenced)))
+        return getattr(self, f"_{self.operation}")(db)
+
+    def _returning(self, db: FakeDatabase, cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+        return [db._decode(self.table, row) for row in cursor.fetchall()]
+
+    def _select(self, db: FakeDatabase) -> FakeResponse:
+        columns = self._select_list()
+        select = ", ".join(_quote(c) for c in columns) if columns else "*"
+        where, params = self._where(db)
+        sql = f"SELECT {select} FROM {_quote(self.table)}{where}{self._order_by()}"
+        if self.limit_rows is not None:
+            sql += f" LIMIT {int(self.limit_rows)} OFFSET {int(self.offset_rows)}"
+        rows = self._returning(db, db._conn.execute(sql, params))
+        total = None
+        if self.count:
+            total = db._conn.execute(f"SELECT COUNT(*) FROM {_quote(self.table)}{where}", params).fetchone()[0]
+        return FakeResponse(rows, total)
+
+    def _insert(self, db: FakeDatabase) -> FakeResponse:
+        # Like PostgREST, a bulk insert uses the union of keys and fills gaps with NULL.
+        columns = list(dict.fromkeys(column for row in self.rows for column in row))
+        names = ", ".join(_quote(c) for c in columns)
+        sql = f"INSERT INTO {_quote(self.table)} ({names}) VALUES ({', '.join('?' * len(columns))})"
+        if self.operation == "upsert":
+            keys = [k.strip() for k in (self.on_conflict or "id").split(",")]
+            db._conn.execute(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote('uq_' + self.table + '_' + '_'.join(keys))}"
+                f" ON {_quote(self.table)} ({', '.join(_quote(k) for k in keys)})"
+            )
+            updates = ", ".join(f"{_quote(c)} = excluded.{_quote(c)}" for c in columns if c not in keys)
+            action = "NOTHING" if self.ignore_duplicates or not updates else f"UPDATE SET {updates}"
+            sql += f" ON CONFLICT ({', '.join(_quote(k) for k in keys)}) DO {action}"
+        sql += " RETURNING *"
+        stored = []
+        db._conn.execute("BEGIN")
+        try:
+            for row in self.rows:
+                params = [db._encode(self.table, c, row.get(c)) for c in columns]
+                stored.extend(self._returning(db, db._conn.execute(sql, params)))
+        except BaseException:
+            db._conn.execute("ROLLBACK")
+            raise
+        db._conn.execute("COMMIT")
+        return FakeResponse(stored)
+
+    _upsert = _insert
+
+    def _update(self, db: FakeDatabase) -> FakeResponse:
+        assignments = ", ".join(f"{_quote(c)} = ?" for c in self.values)
+        where, params = self._where(db)
+        values = [db._encode(self.table, c, v) for c, v in self.values.items()]
+        sql = f"UPDATE {_quote(self.table)} SET {assignments}{where} RETURNING *"
+        return FakeResponse(self._returning(db, db._conn.execute(sql, values + params)))
+
+    def _delete(self, db: FakeDatabase) -> FakeResponse:
+        where, params = self._where(db)
+        sql = f"DELETE FROM {_quote(self.table)}{where} RETURNING *"
+        return FakeResponse(self._returning(db, db._conn.execute(sql, params)))
+
+
+class _SyncRequest(_Request):
+    def __init__(self, db: FakeDatabase, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.db = db
+
+    def execute(self) -> FakeResponse:
+        time.sleep(self.db.delay())
+        return self.db._run(self)
+
+
+class _AsyncRequest(_Request):
+    def __init__(self, db: FakeDatabase, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.db = db
+
+    async def execute(self) -> FakeResponse:
+        await asyncio.sleep(self.db.delay())
+        return self.db._run(self)
+
+
+class _Table:
+    def __init__(self, db: FakeDatabase, name: str, request: type) -> None:
+        self.db = db
+        self.name = name
+        self.request = request
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> Any:
+        return self.request(self.db, self.name, "select", columns=columns, count=count)
+
+    def insert(self, json: Any, **_: Any) -> Any:
+        return self.request(self.db, self.name, "insert", rows=json if isinstance(json, list) else [json])
+
+    def upsert(self, json: Any, on_conflict: str = "", ignore_duplicates: bool = False, **_: Any) -> Any:
+        return self.request(
+            self.db, self.name, "upsert", rows=json if isinstance(json, list) else [json],
+            on_conflict=on_conflict, ignore_duplicates=ignore_duplicates,
+        )
+
+    def update(self, json: Dict[str, Any], **_: Any) -> Any:
+        return self.request(self.db, self.name, "update", values=json)
+
+    def delete(self, **_: Any) -> Any:
+        return self.request(self.db, self.name, "delete")
+
+
+class _SyncRpc:
+    def __init__(self, db: FakeDatabase, name: str, params: Dict[str, Any]) -> None:
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self) -> FakeResponse:
+        time.sleep(self.db.delay())
+        return self.db._call_rpc(self.name, self.params)
+
+
+class _AsyncRpc(_SyncRpc):
+    async def execute(self) -> FakeResponse:  # type: ignore[override]
+        await asyncio.sleep(self.db.delay())
+        return self.db._call_rpc(self.name, self.params)
+
+
+class FakeClient:
+    """Synchronous stand‑in for ``supabase.Client``."""
+
+    def __init__(self, db: FakeDatabase) -> None:
+        self.db = db
+
+    def table(self, name: str) -> _Table:
+        return _Table(self.db, name, _SyncRequest)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _SyncRpc:
+        return _SyncRpc(self.db, name, params or {})
+
+
+class AsyncFakeClient:
+    """Asyncio stand‑in for ``supabase.AsyncClient``."""
+
+    def __init__(self, db: FakeDatabase) -> None:
+        self.db = db
+
+    def table(self, name: str) -> _Table:
+        return _Table(self.db, name, _AsyncRequest)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _AsyncRpc:
+        return _AsyncRpc(self.db, name, params or {})
+
+    async def aclose(self) -> None:
+        """Nothing to release; lets ``supabase_async.close_clients`` treat this as its HTTP client."""
+
+
+# -- RPC functions ------------------------------------------------------------
+
+
+def _now_iso(offset: float = 0.0) -> str:
+    return datetime.datetime.fromtimestamp(time.time() + offset, datetime.timezone.utc).isoformat()
+
+
+_LEASE_COLUMNS = ["agent", "command", "payload", "status", "timestamp", "lease_owner", "lease_expires_at", "attempts"]
+
+
+def _requeue_expired(db: FakeDatabase, params: Dict[str, Any]) -> int:
+    db._ensure("agent_directives", _LEASE_COLUMNS)
+    agent = params.get("p_agent")
+    cursor = db._conn.execute(
+        "UPDATE agent_directives SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL"
+        " WHERE status = 'claimed' AND lease_expires_at < ? AND (? IS NULL OR agent = ?)",
+        (_now_iso(), agent, agent),
+    )
+    return cursor.rowcount
+
+
+def _claim_directives(db: FakeDatabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    _requeue_expired(db, params)
+    rows = db._conn.execute(
+        "UPDATE agent_directives SET status = 'claimed', lease_owner = ?, lease_expires_at = ?,"
+        " attempts = COALESCE(attempts, 0) + 1"
+        " WHERE id IN (SELECT id FROM agent_directives WHERE agent = ? AND status = 'pending'"
+        " ORDER BY \"timestamp\" LIMIT ?)"
+        " RETURNING id, command, payload, attempts, lease_expires_at",
+        (
+            params["p_worker"],
+            _now_iso(float(params.get("p_visibility_seconds", 300))),
+            params["p_agent"],
+            int(params.get("p_limit", 1)),
+        ),
+    ).fetchall()
+    return [db._decode("agent_directives", row) for row in rows]
+
+
+def _extend_lease(db: FakeDatabase, params: Dict[str, Any]) -> bool:
+    db._ensure("agent_directives", _LEASE_COLUMNS)
+    cursor = db._conn.execute(
+        "UPDATE agent_directives SET lease_expires_at = ? WHERE id = ? AND status = 'claimed' AND lease_owner = ?",
+        (_now_iso(float(params.get("p_visibility_seconds", 300))), params["p_id"], params["p_worker"]),
+    )
+    return cursor.rowcount > 0
+
+
+def _release(db: FakeDatabase, params: Dict[str, Any]) -> bool:
+    db._ensure("agent_directives", _LEASE_COLUMNS)
+    cursor = db._conn.execute(
+        "UPDATE agent_directives SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL"
+        " WHERE id = ? AND status = 'claimed' AND lease_owner = ?",
+        (params["p_id"], params["p_worker"]),
+    )
+    return cursor.rowcount > 0
+
+
+def _queue_stats(db: FakeDatabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    db._ensure("agent_directives", _LEASE_COLUMNS)
+    rows = db._conn.execute(
+        "SELECT agent, SUM(status = 'pending') AS pending, SUM(status = 'claimed') AS claimed,"
+        " ? - MIN(CASE WHEN status = 'pending' THEN \"timestamp\" END) AS oldest_age_seconds"
+        " FROM agent_directives WHERE status IN ('pending', 'claimed') GROUP BY agent",
+        (time.time(),),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+# SQLite expressions truncating an ISO‑8601 text timestamp to a bucket start.
+_BUCKETS = {
+    "day": "date(substr({0}, 1, 10))",
+    "week": "date(substr({0}, 1, 10), '-6 days', 'weekday 1')",
+    "month": "date(substr({0}, 1, 10), 'start of month')",
+}
+
+
+def _naive_iso(value: str) -> str:
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+def _profit_buckets(db: FakeDatabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    db._ensure("profit_ledger", ["ts", "chain", "amount"])
+    bucket = _BUCKETS[params["p_interval"]].format("ts")
+    rows = db._conn.execute(
+        f"SELECT {bucket} AS bucket, COALESCE(chain, 'unknown') AS chain, COALESCE(SUM(amount), 0) AS total,"
+        " COUNT(*) AS entries FROM profit_ledger WHERE ts >= ? AND ts < ? GROUP BY 1, 2 ORDER BY 1, 2",
+        (_naive_iso(params["p_since"]), _naive_iso(params["p_until"])),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _revenue_buckets(db: FakeDatabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    db._ensure("revenues", ["timestamp", "reward"])
+    bucket = _BUCKETS[params["p_interval"]].format("datetime(\"timestamp\", 'unixepoch')")
+    rows = db._conn.execute(
+        f"SELECT {bucket} AS bucket, COALESCE(SUM(reward), 0) AS total, COUNT(*) AS entries FROM revenues"
+        " WHERE \"timestamp\" >= ? AND \"timestamp\" < ? GROUP BY 1 ORDER BY 1",
+        (
+            datetime.datetime.fromisoformat(params["p_since"]).timestamp(),
+            datetime.datetime.fromisoformat(params["p_until"]).timestamp(),
+        ),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+_RPCS: Dict[str, Rpc] = {
+    "requeue_expired_directives": _requeue_expired,
+    "claim_directives": _claim_directives,
+    "extend_directive_lease": _extend_lease,
+    "release_directive": _release,
+    "directive_queue_stats": _queue_stats,
+    "metrics_profit_buckets": _profit_buckets,
+    "metrics_revenue_buckets": _revenue_buckets,
+}
+
+
+def install(db: FakeDatabase, url: str = "http://fake-supabase.invalid", key: str = "fake-service-role-key") -> None:
+    """Make ``supabase_utils.get_client`` and ``supabase_async.get_client`` return fakes for ``db``.
+
+    Sets `SUPABASE_URL` and `SUPABASE_SERVICE_ROLE_KEY` and places the fake
+    clients in both client pools.  The pools still check that supabase-py is
+    importable.  ``close_clients`` removes the fakes again.
+    """
+    from backend import supabase_async, supabase_utils
+
+    os.environ["SUPABASE_URL"] = url
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = key
+    supabase_utils._clients[(url, key)] = (os.getpid(), db.client(), None)
+    async_client = db.async_client()
+    supabase_async._clients[(url, key, os.getpid())] = (async_client, async_client)
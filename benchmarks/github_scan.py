@@ -0,0 +1,181 @@
+"""Offline run of the GitHub scanner against a simulated search API.
+
+``GitHubStub`` is an in‑process stand‑in for ``/search/repositories``.  It
+holds thousands of synthetic repositories, and it honours ``pushed:`` and
+``topic:`` qualifiers, the 1,000 result cap and ETags.  It also enforces
+a scaled‑down rate limit with ``X-RateLimit-*`` headers and ``403``
+answers.  The scanner writes into ``fake_supabase``.  Four runs show the
+crawl's behaviour:
+
+* ``backfill`` – no cursors yet; a week of history, with windows split
+  around the result cap.  Responses are recorded as fixtures.
+* ``pushes`` – some repositories were pushed to; only the overlap window
+  since the cursors is searched.
+* ``settle`` – the cursors have moved to the new pushes.
+* ``idle`` – nothing changed; every page is revalidated with its ETag and
+  answered ``304``, which does not count against the rate limit.
+
+Finally the backfill is replayed from the recorded fixtures into an empty
+database with no network access, and must write the same repositories.
+
+Usage::
+
+    python -m benchmarks.github_scan --repos 8000 --rate-limit 30 --rate-window 2
+"""
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from .fake_supabase import FakeDatabase, install
+
+TOPICS = ["machine-learning", "llm", "ai-agents", "cryptocurrency", "defi"]
+_WINDOW = re.compile(r"^(pushed|created):(>=)?([^.]+?)(?:\.\.(.+))?$")
+
+
+class GitHubStub:
+    """Simulated GitHub repository search with a rate limit."""
+
+    def __init__(self, repos: int, rate_limit: int, rate_window: float, days: int = 7, seed: int = 7) -> None:
+        rng = random.Random(seed)
+        now = time.time()
+        self.repos: List[Dict[str, Any]] = []
+        for i in range(repos):
+            pushed = now - rng.random() * days * 86400
+            self.repos.append(
+                {
+                    "id": i,
+                    "name": f"repo-{i}",
+                    "full_name": f"org{i % 97}/repo-{i}",
+                    "html_url": f"https://github.com/org{i % 97}/repo-{i}",
+                    "description": f"Project {i} about {TOPICS[i % len(TOPICS)]}",
+                    "topics": [TOPICS[i % len(TOPICS)]],
+                    "created_at": _stamp(pushed - rng.random() * 365 * 86400),
+                    "pushed_at": _stamp(pushed),
+                }
+            )
+        self.rate_limit, self.rate_window = rate_limit, rate_window
+        self.remaining, self.reset = rate_limit, now + rate_window
+        self.counters = {"calls": 0, "counted": 0, "not_modified": 0, "rejected": 0}
+
+    def push(self, count: int) -> None:
+        for repo in random.Random(count).sample(self.repos, count):
+            repo["pushed_at"] = _stamp(time.time())
+            repo["description"] += " (updated)"
+
+    def _search(self, query: str) -> List[Dict[str, Any]]:
+        matches = self.repos
+        for term in query.split():
+            if term.startswith("topic:"):
+                matches = [repo for repo in matches if term[6:] in repo["topics"]]
+                continue
+            window = _WINDOW.match(term)
+            if window:
+                field, _, start, end = window.groups()
+                key = f"{field}_at"
+                matches = [repo for repo in matches if repo[key] >= start and (end is None or repo[key] <= end)]
+        return sorted(matches, key=lambda repo: repo["pushed_at"])
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.counters["calls"] += 1
+        now = time.time()
+        if now >= self.reset:
+            self.remaining, self.reset = self.rate_limit, now + self.rate_window
+        params = request.url.params
+        page, per_page = int(params.get("page", 1)), int(params.get("per_page", 30))
+        if page * per_page > 1000:
+            return httpx.Response(422, json={"message": "Only the first 1000 search results are available"})
+        matches = self._search(params["q"])
+        body = json.dumps(
+            {"total_count": len(matches), "incomplete_results": False,
+             "items": matches[(page - 1) * per_page:page * per_page]}
+        ).encode()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        headers = {"ETag": etag, "X-RateLimit-Reset": str(int(self.reset) + 1)}
+        if request.headers.get("if-none-match") == etag:
+            self.counters["not_modified"] += 1
+            return httpx.Response(304, headers={**headers, "X-RateLimit-Remaining": str(self.remaining)})
+        if self.remaining <= 0:
+            self.counters["rejected"] += 1
+            return httpx.Response(403, json={"message": "API rate limit exceeded"},
+                                  headers={**headers, "X-RateLimit-Remaining": "0"})
+        self.remaining -= 1
+        self.counters["counted"] += 1
+        headers["X-RateLimit-Remaining"] = str(self.remaining)
+        return httpx.Response(200, content=body, headers={**headers, "Content-Type": "application/json"})
+
+
+def _stamp(seconds: float) -> str:
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _scan(stub: Any, now: datetime.datetime) -> Dict[str, Any]:
+    from backend.workers.github_scanner_worker import run_scan
+
+    start = time.perf_counter()
+    details = asyncio.run(run_scan(httpx.MockTransport(stub) if stub is not None else None, now))
+    details["seconds"] = time.perf_counter() - start
+    return details
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repos", type=int, default=8000)
+    parser.add_argument("--pushes", type=int, default=300, help="repositories pushed to before the second run")
+    parser.add_argument("--rate-limit", type=int, default=30, help="searches per rate window")
+    parser.add_argument("--rate-window", type=float, default=2.0, help="seconds per rate window")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="github-scan-")
+    fixtures = os.path.join(workdir, "fixtures")
+    os.environ.update(
+        GITHUB_SCAN_QUERIES=",".join(f"topic:{topic}" for topic in TOPICS),
+        GITHUB_SCAN_MAX_PAGES="1000",
+        SCRAPER_CACHE_DIR=os.path.join(workdir, "cache"),
+        GITHUB_RECORD_FIXTURES=fixtures,
+    )
+    os.environ.pop("GITHUB_FIXTURES", None)
+    stub = GitHubStub(args.repos, args.rate_limit, args.rate_window)
+    db = FakeDatabase()
+    install(db)
+    backfill_at = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+
+    print(f"{'run':<9} {'repos':>6} {'written':>8} {'counted':>8} {'304s':>6} {'403s':>5} {'waits':>6} {'splits':>7} {'s':>6}")
+    for label in ("backfill", "pushes", "settle", "idle"):
+        if label == "pushes":
+            stub.push(args.pushes)
+        before = dict(stub.counters)
+        details = _scan(stub, backfill_at if label == "backfill" else None)
+        os.environ.pop("GITHUB_RECORD_FIXTURES", None)
+        delta = {key: stub.counters[key] - before[key] for key in stub.counters}
+        print(
+            f"{label:<9} {details['repos']:>6} {details['written']:>8} {delta['counted']:>8} {delta['not_modified']:>6}"
+            f" {delta['rejected']:>5} {details['rate_waits']:>6} {details['splits']:>7} {details['seconds']:>6.1f}"
+        )
+        if label == "backfill":
+            recorded = {row["url"] for row in db.query("knowledge_base", "SELECT url FROM knowledge_base")}
+
+    # Replay the backfill offline: empty database, fresh cache, no stub.
+    os.environ.update(GITHUB_FIXTURES=fixtures, SCRAPER_CACHE_DIR=os.path.join(workdir, "replay-cache"))
+    replay_db = FakeDatabase()
+    install(replay_db)
+    calls = stub.counters["calls"]
+    details = _scan(None, backfill_at)
+    replayed = {row["url"] for row in replay_db.query("knowledge_base", "SELECT url FROM knowledge_base")}
+    if replayed != recorded or stub.counters["calls"] != calls:
+        raise SystemExit("offline replay of the recorded fixtures did not reproduce the backfill")
+    print(f"replay    {details['repos']:>6} {details['written']:>8} from {len(os.listdir(fixtures))} fixtures, offline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Load test: blocking vs. asyncio Supabase access in the handshake server.
+
+Starts a :class:`PostgrestStub` with injected latency, then serves two
+FastAPI apps with Uvicorn and hammers ``GET /directive/{agent}`` with many
+concurrent requests:
+
+* ``blocking`` – an ``async def`` route that calls the synchronous
+  ``supabase_utils`` client, as the server did before ``supabase_async``.
+* ``asyncio`` – the real ``handshake_server.app``.
+
+Usage::
+
+    python -m benchmarks.handshake_concurrency --requests 400 --concurrency 50 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import threading
+import time
+from typing import Any, Dict, List
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from .postgrest_stub import PostgrestStub
+
+
+def _blocking_app() -> FastAPI:
+    from backend.supabase_utils import get_client
+
+    app = FastAPI()
+
+    @app.get("/directive/{agent}")
+    async def fetch_directive(agent: str):
+        client = get_client()
+        response = (
+            client.table("agent_directives")
+            .select("id, command, payload")
+            .eq("agent", agent)
+            .eq("status", "pending")
+            .order("timestamp", desc=False)
+            .limit(1)
+            .execute()
+        )
+        directives = response.data or []
+        return directives[0] if directives else {"status": "no_directives"}
+
+    return app
+
+
+def _asyncio_app() -> FastAPI:
+    from backend.handshake_server import app
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def _drive(url: str, total: int, concurrency: int) -> List[float]:
+    latencies: List[float] = []
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as http:
+        await http.get("/directive/warmup")
+
+        async def one(i: int) -> None:
+            async with sem:
+                start = time.perf_counter()
+                resp = await http.get(f"/directive/agent-{i % 8}")
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies
+
+
+def run_case(name: str, app: FastAPI, total: int, concurrency: int) -> Dict[str, Any]:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        start = time.perf_counter()
+        latencies = asyncio.run(_drive(f"http://127.0.0.1:{port}", total, concurrency))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.should_exit = True
+        thread.join()
+    return {
+        "case": name,
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="injected PostgREST latency in seconds")
+    args = parser.parse_args()
+
+    with PostgrestStub(latency=args.latency) as stub:
+        os.environ["SUPABASE_URL"] = stub.url
+        os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "benchmark-service-role-key")
+        results = [
+            run_case("blocking", _blocking_app(), args.requests, args.concurrency),
+            run_case("asyncio", _asyncio_app(), args.requests, args.concurrency),
+        ]
+    print(f"{'case':<10} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for row in results:
+        print(f"{row['case']:<10} {row['rps']:>9.1f} {row['p50_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Benchmark: streaming ``parse_rules`` vs. naive full‑DOM parsing.
+
+Generates multi‑megabyte HTML and JSON pages shaped like scraper targets
+(a product listing and an API search response) and extracts the same
+fields two ways:
+
+* ``streaming`` – ``backend.parse_rules``: compiled rules applied while
+  the document streams through the parser; nothing is built but the
+  selected values, and first‑match rules stop reading early.
+* ``naive`` – the whole document is parsed first (a DOM tree from
+  ``html.parser``, or ``json.loads``), then the same selectors are
+  evaluated over it.
+
+Both sides must produce identical fields.  Each case reports the median
+time over ``--repeat`` runs and the ``tracemalloc`` peak of one run.
+
+Usage::
+
+    python -m benchmarks.parse_rules --megabytes 4 --repeat 5
+"""
+
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Tuple
+
+from backend.parse_rules import CssSelector, RuleSet, compile_json_path, compile_rules
+
+CASES: List[Tuple[str, str, Dict[str, Any]]] = [
+    ("html_first", "html", {"title": "head > title::text", "first_price": "div.product span.price::text"}),
+    ("html_all", "html", {"prices": {"selector": "div.product span.price", "all": True},
+                          "links": {"selector": "div.product > a::attr(href)", "all": True}}),
+    ("json_first", "json", {"total": "$.total_count", "first": "$.items[0].full_name"}),
+    ("json_tail", "json", {"next": "$.links.next"}),
+    ("json_all", "json", {"names": {"selector": "$.items[*].full_name", "all": True}}),
+]
+
+
+def html_page(megabytes: float) -> bytes:
+    parts = ["<!doctype html><html><head><title>Catalogue</title></head><body><main>"]
+    size, i = 0, 0
+    while size < megabytes * 1024 * 1024:
+        item = (
+            f'<div class="product" data-id="{i}"><a href="/p/{i}">Product {i}</a>'
+            f'<p class="blurb">Hand‑made item number {i}, with <b>free</b> shipping &amp; returns.</p>'
+            f'<span class="price">{i % 97}.99</span><img src="/img/{i}.png"><ul><li>a<li>b</ul></div>\n'
+        )
+        parts.append(item)
+        size += len(item)
+        i += 1
+    parts.append("</main></body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def json_page(megabytes: float) -> bytes:
+    items, size, i = [], 0, 0
+    while size < megabytes * 1024 * 1024:
+        item = {
+            "id": i,
+            "full_name": f"org{i % 50}/repo-{i}",
+            "description": f"Repository {i} – tools for \"things\" [v{i}]",
+            "owner": {"login": f"org{i % 50}", "id": i % 50, "type": "Organization"},
+            "topics": ["scraping", "data", f"t{i % 13}"],
+            "stargazers_count": i * 7 % 1000,
+        }
+        items.append(item)
+        size += len(json.dumps(item))
+        i += 1
+    return json.dumps({"total_count": len(items), "items": items, "links": {"next": "/page/2"}}).encode("utf-8")
+
+
+class _TreeBuilder(HTMLParser):
+    """Builds the full element tree, as a DOM library would."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.root: Dict[str, Any] = {"tag": "#document", "attrs": {}, "children": []}
+        self.open = [self.root]
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Any]]) -> None:
+        if tag in ("li", "p") and self.open[-1]["tag"] == tag:
+            self.open.pop()
+        node = {"tag": tag, "attrs": dict(attrs), "children": []}
+        self.open[-1]["children"].append(node)
+        if tag not in ("img", "br", "meta", "link", "input", "hr"):
+            self.open.append(node)
+
+    def handle_endtag(self, tag: str) -> None:
+        for depth in range(len(self.open) - 1, 0, -1):
+            if self.open[depth]["tag"] == tag:
+                del self.open[depth:]
+                return
+
+    def handle_data(self, data: str) -> None:
+        self.open[-1]["children"].append(data)
+
+
+def _text(node: Dict[str, Any]) -> str:
+    return "".join(child if isinstance(child, str) else _text(child) for child in node["children"])
+
+
+def naive(rules: Dict[str, Any], content: bytes, kind: str) -> Dict[str, Any]:
+    if kind == "json":
+        document = json.loads(content)
+        result = {}
+        for name, rule in rules.items():
+            selector, many = (rule["selector"], True) if isinstance(rule, dict) else (rule, False)
+            found = [document]
+            for step in compile_json_path(selector):
+                nxt = []
+                for value in found:
+                    if isinstance(step, tuple):
+                        nxt.extend(value.values() if isinstance(value, dict) else value)
+                    elif isinstance(step, int):
+                        nxt.extend([value[step]] if isinstance(value, list) and step < len(value) else [])
+                    elif isinstance(value, dict) and step in value:
+                        nxt.append(value[step])
+                found = nxt
+            result[name] = found if many else (found[0] if found else None)
+        return result
+
+    builder = _TreeBuilder()
+    builder.feed(content.decode("utf-8"))
+    builder.close()
+    compiled = {
+        name: ((CssSelector(rule["selector"]), True) if isinstance(rule, dict) else (CssSelector(rule), False))
+        for name, rule in rules.items()
+    }
+    result: Dict[str, Any] = {name: [] if many else None for name, (_, many) in compiled.items()}
+
+    def walk(node: Dict[str, Any], stack: List[Tuple[str, Dict[str, Any]]]) -> None:
+        for child in node["children"]:
+            if isinstance(child, str):
+                continue
+            stack.append((child["tag"], child["attrs"]))
+            for name, (selector, many) in compiled.items():
+                if (many or result[name] is None) and selector.matches(stack):
+                    if selector.attribute is not None:
+                        value = child["attrs"].get(selector.attribute)
+                    else:
+                        value = " ".join(_text(child).split())
+                    if value is not None:
+                        if many:
+                            result[name].append(value)
+                        else:
+                            result[name] = value
+            walk(child, stack)
+            stack.pop()
+
+    walk(builder.root, [])
+    return result
+
+
+def _measure(func: Callable[[], Any], repeat: int) -> Tuple[Any, float, float]:
+    tracemalloc.start()
+    output = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return output, statistics.median(times) * 1000, peak / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=float, default=4, help="size of each generated page")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = {"html": html_page(args.megabytes), "json": json_page(args.megabytes)}
+    content_types = {"html": "text/html", "json": "application/json"}
+    print(f"{'case':<11} {'MiB':>5} {'stream ms':>10} {'naive ms':>10} {'stream KiB':>11} {'naive KiB':>11}")
+    for name, kind, rules in CASES:
+        content = pages[kind]
+        ruleset: RuleSet = compile_rules(rules)
+        fast, fast_ms, fast_kib = _measure(lambda: ruleset.apply(content, content_types[kind]), args.repeat)
+        slow, slow_ms, slow_kib = _measure(lambda: naive(rules, content, kind), args.repeat)
+        if fast != slow:
+            raise SystemExit(f"{name}: streaming and naive results differ")
+        print(
+            f"{name:<11} {len(content) / 1048576:>5.1f} {fast_ms:>10.1f} {slow_ms:>10.1f} {fast_kib:>11.0f} {slow_kib:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
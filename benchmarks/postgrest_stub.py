@@ -0,0 +1,70 @@
+"""Minimal HTTP stand‑in for a PostgREST endpoint.
+
+The stub answers every ``/rest/v1/<table>`` request after an injected delay.
+``GET`` returns a single canned row and write methods return an empty JSON
+array, which is enough for the supabase-py clients to complete a round trip.
+It is deliberately dumb: it measures client behaviour, not query semantics.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DEFAULT_ROW: Dict[str, Any] = {"id": 1, "command": "PING", "payload": {}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "PostgrestStub"
+
+    def _reply(self, rows: List[Dict[str, Any]]) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(self.server.latency)
+        self.server.requests += 1
+        body = json.dumps(rows).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self._reply([self.server.row])
+
+    def do_POST(self) -> None:
+        self._reply([])
+
+    do_PATCH = do_POST
+    do_DELETE = do_POST
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class PostgrestStub(ThreadingHTTPServer):
+    """Threaded PostgREST stand‑in listening on ``127.0.0.1``."""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.05, row: Optional[Dict[str, Any]] = None, port: int = 0) -> None:
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.row = row or DEFAULT_ROW
+        self.requests = 0
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def __enter__(self) -> "PostgrestStub":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,361 @@
+"""End‑to‑end benchmark suite on the in‑process Supabase fake.
+
+Runs the handshake server and directive workers against
+:class:`FakeDatabase`, so data really flows between them, with an injected
+per‑request latency standing in for the Supabase round trip.  Scenarios:
+
+* ``routes`` – Concurrent requests to each handshake server route through
+  an in‑process ASGI transport.  The response cache is bypassed unless
+  ``--cache`` is given, so the handlers themselves are measured.
+* ``round_trip`` – ``POST /directive`` followed by a ``WorkerRuntime``
+  claiming the directive, running a no‑op handler and marking it complete.
+  Latency is measured from the POST to the end of the handler.
+* ``drain`` – Several runtimes per agent working off a pre‑filled queue.
+  Latency is the cycle time between consecutive directives on a worker
+  thread (claim, handler and completion).
+
+Each scenario reports throughput, p50/p99 latency and Supabase calls per
+operation.  A second, smaller pass under ``tracemalloc`` reports the peak
+traced memory and the memory blocks still allocated afterwards per
+operation.  CPython has no cheap per‑allocation counter, so growth in
+retained blocks is the allocation signal to watch.  ``--json`` saves the
+results.  With ``--baseline`` the run exits non‑zero when throughput drops,
+p99 latency rises or blocks per operation grow by more than ``--tolerance``
+against a saved run, so it can gate a deploy.
+
+Usage::
+
+    python -m benchmarks.suite --latency 0.002 --json baseline.json
+    python -m benchmarks.suite --latency 0.002 --baseline baseline.json --tolerance 0.25
+
+Needs ``fastapi``, ``httpx`` and ``supabase`` (the client pools check that it
+is importable).
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .fake_supabase import FakeDatabase, install
+
+# Loop over ``ops`` operations; returns per‑operation latencies in seconds.
+Scenario = Callable[[int], List[float]]
+
+ROUTES: List[Tuple[str, str, Optional[Dict[str, Any]]]] = [
+    ("GET", "/directive/Bench", None),
+    ("POST", "/directive", {"agent": "BenchIdle", "command": "BENCH", "payload": {"n": 1}}),
+    ("POST", "/complete/1", None),
+    ("POST", "/initiate_protocol", {"doctrines": ["bench"], "agents": ["BenchIdle"], "layers": []}),
+    ("GET", "/api/faucets", None),
+    ("GET", "/api/wallets", None),
+    ("GET", "/api/agents", None),
+    ("GET", "/api/predictions?symbol=SYM1", None),
+    ("GET", "/api/metrics", None),
+]
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def seed(db: FakeDatabase, rows: int) -> None:
+    """Fill the tables read by the dashboard routes with ``rows`` rows each."""
+    now = time.time()
+    db.seed("faucets", [{"name": f"faucet-{i}", "url": f"https://faucet{i}.example", "chain": "eth"} for i in range(rows)])
+    db.seed("faucet_yields", [{"yield_usd": i / 100, "timestamp": now - i} for i in range(rows)])
+    db.seed("wallets", [{"address": f"0x{i:040x}", "balance": i, "chain": "eth"} for i in range(rows)])
+    db.seed(
+        "portfolio_assets",
+        [{"wallet_id": i % rows + 1, "coin": "ETH", "balance": 1, "usd_value": 2} for i in range(rows * 2)],
+    )
+    db.seed(
+        "swarm_state",
+        [{"active_agents": 8, "swarm_mode": "bench", "heartbeat": "active", "notes": "", "timestamp": now - i} for i in range(rows)],
+    )
+    db.seed("swarm_activity", [{"nodes": 4, "tasks_completed": i, "success_ratio": 0.9} for i in range(rows)])
+    db.seed(
+        "predictions",
+        [{"symbol": f"SYM{i % 20}", "prediction": {"p": i}, "predicted_at": f"2026-01-01T00:00:{i % 60:02d}"} for i in range(rows)],
+    )
+    db.seed(
+        "profit_ledger",
+        [
+            {"ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now - i * 3600)), "chain": "eth", "amount": 1.5}
+            for i in range(rows)
+        ],
+    )
+    db.seed("revenues", [{"timestamp": now - i * 3600, "reward": 0.5} for i in range(rows)])
+    db.seed(
+        "agent_directives",
+        [
+            {"agent": "Bench", "command": "BENCH", "payload": {}, "status": "pending", "timestamp": now, "attempts": 0},
+            *(
+                {"agent": f"Other{i % 50}", "command": "BENCH", "payload": {}, "status": "complete", "timestamp": now - i, "attempts": 1}
+                for i in range(rows)
+            ),
+        ],
+    )
+
+
+async def _send(http: httpx.AsyncClient, method: str, path: str, body: Optional[Dict[str, Any]]) -> None:
+    response = await http.request(method, path, json=body)
+    response.raise_for_status()
+
+
+async def _drive(app: Any, calls: List[Tuple[str, str, Optional[Dict[str, Any]]]], concurrency: int) -> List[float]:
+    latencies: List[float] = []
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as http:
+
+        async def one(method: str, path: str, body: Optional[Dict[str, Any]]) -> None:
+            async with sem:
+                start = time.perf_counter()
+                await _send(http, method, path, body)
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(one(*call) for call in calls))
+    return latencies
+
+
+def route_scenario(app: Any, method: str, path: str, body: Optional[Dict[str, Any]], concurrency: int) -> Scenario:
+    """Send ``ops`` concurrent requests to one route."""
+
+    def run(ops: int) -> List[float]:
+        return asyncio.run(_drive(app, [(method, path, body)] * ops, concurrency))
+
+    return run
+
+
+class Workers:
+    """``WorkerRuntime`` instances for a set of agents, each on its own thread."""
+
+    def __init__(self, agents: List[str], per_agent: int, concurrency: int, poll: float, handler: Callable) -> None:
+        from backend.worker_runtime import WorkerRuntime
+
+        self.runtimes = []
+        for agent in agents:
+            for index in range(per_agent):
+                runtime = WorkerRuntime(agent, {"BENCH": handler}, idle_interval=poll, concurrency=concurrency, drain_timeout=5)
+                runtime.worker_id = f"{agent}-{index}"
+                self.runtimes.append(runtime)
+        self.threads = [threading.Thread(target=r.run, daemon=True) for r in self.runtimes]
+
+    def __enter__(self) -> "Workers":
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        for runtime in self.runtimes:
+            runtime.stop()
+        for thread in self.threads:
+            thread.join()
+
+
+def _wait_complete(db: FakeDatabase, agents: List[str], total: int, timeout: float = 300) -> None:
+    placeholders = ", ".join("?" * len(agents))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        rows = db.query(
+            "agent_directives",
+            f"SELECT COUNT(*) AS n FROM agent_directives WHERE status = 'complete' AND agent IN ({placeholders})",
+            tuple(agents),
+        )
+        if rows[0]["n"] >= total:
+            return
+        time.sleep(0.005)
+    raise TimeoutError(f"only {rows[0]['n']} of {total} directives completed")
+
+
+def round_trip_scenario(app: Any, db: FakeDatabase, args: argparse.Namespace) -> Scenario:
+    """Dispatch directives over HTTP and wait for workers to complete them."""
+    runs = [0]
+
+    def run(ops: int) -> List[float]:
+        runs[0] += 1
+        agent = f"BenchEcho{runs[0]}"
+        latencies: List[float] = []
+
+        def handler(payload: Dict[str, Any]) -> None:
+            time.sleep(args.work)
+            latencies.append(time.perf_counter() - payload["sent"])
+
+        with Workers([agent], args.workers, args.worker_concurrency, args.poll, handler):
+            # The send time is filled in as late as possible, when the request body is built.
+            async def dispatch() -> None:
+                sem = asyncio.Semaphore(args.concurrency)
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+
+                    async def one() -> None:
+                        async with sem:
+                            body = {"agent": agent, "command": "BENCH", "payload": {"sent": time.perf_counter()}}
+                            await _send(http, "POST", "/directive", body)
+
+                    await asyncio.gather(*(one() for _ in range(ops)))
+
+            asyncio.run(dispatch())
+            _wait_complete(db, [agent], ops)
+        return latencies
+
+    return run
+
+
+def drain_scenario(db: FakeDatabase, args: argparse.Namespace) -> Scenario:
+    """Let runtimes for several agents work off a pre‑filled queue."""
+    runs = [0]
+
+    def run(ops: int) -> List[float]:
+        runs[0] += 1
+        agents = [f"BenchDrain{runs[0]}-{i}" for i in range(args.agents)]
+        now = time.time()
+        db.seed(
+            "agent_directives",
+            [
+                {"agent": agents[i % len(agents)], "command": "BENCH", "payload": {}, "status": "pending",
+                 "timestamp": now + i / 1e6, "attempts": 0}
+                for i in range(ops)
+            ],
+        )
+        latencies: List[float] = []
+        last: Dict[int, float] = {}
+
+        def handler(payload: Dict[str, Any]) -> None:
+            now = time.perf_counter()
+            previous = last.get(threading.get_ident())
+            if previous is not None:
+                latencies.append(now - previous)
+            last[threading.get_ident()] = now
+            time.sleep(args.work)
+
+        with Workers(agents, args.workers, args.worker_concurrency, args.poll, handler):
+            _wait_complete(db, agents, ops)
+        return latencies
+
+    return run
+
+
+def measure(name: str, scenario: Scenario, db: FakeDatabase, ops: int, alloc_ops: int) -> Dict[str, Any]:
+    """Time ``scenario`` over ``ops`` operations, then profile memory over ``alloc_ops``."""
+    calls_before = sum(db.calls.values())
+    start = time.perf_counter()
+    latencies = scenario(ops)
+    elapsed = time.perf_counter() - start
+    calls = sum(db.calls.values()) - calls_before
+
+    gc.collect()
+    tracemalloc.start()
+    baseline_bytes = tracemalloc.get_traced_memory()[0]
+    blocks_before = sys.getallocatedblocks()
+    scenario(alloc_ops)
+    gc.collect()
+    blocks_after = sys.getallocatedblocks()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "ops": ops,
+        "ops_per_s": ops / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": _percentile(latencies, 99) * 1000 if latencies else 0.0,
+        "calls_per_op": calls / ops,
+        "peak_kib": (peak - baseline_bytes) / 1024,
+        "blocks_per_op": max(0, blocks_after - blocks_before) / alloc_ops,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """Return a description of every metric that regressed beyond ``tolerance``."""
+    previous = {row["scenario"]: row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get(row["scenario"])
+        if before is None:
+            continue
+        if row["ops_per_s"] < before["ops_per_s"] * (1 - tolerance):
+            regressions.append(f"{row['scenario']}: ops/s {before['ops_per_s']:.1f} -> {row['ops_per_s']:.1f}")
+        if row["p99_ms"] > before["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{row['scenario']}: p99 {before['p99_ms']:.1f} ms -> {row['p99_ms']:.1f} ms")
+        # A few blocks per operation is noise from caches warming up.
+        if row["blocks_per_op"] > before["blocks_per_op"] * (1 + tolerance) + 5:
+            regressions.append(
+                f"{row['scenario']}: blocks/op {before['blocks_per_op']:.1f} -> {row['blocks_per_op']:.1f}"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default="routes,round_trip,drain")
+    parser.add_argument("--latency", type=float, default=0.002, help="injected Supabase latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency up to this many seconds")
+    parser.add_argument("--rows", type=int, default=1000, help="rows seeded into each dashboard table")
+    parser.add_argument("--requests", type=int, default=500, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--cache", action="store_true", help="serve cached routes from the response cache")
+    parser.add_argument("--directives", type=int, default=1000, help="directives per worker scenario")
+    parser.add_argument("--agents", type=int, default=4, help="agents in the drain scenario")
+    parser.add_argument("--workers", type=int, default=2, help="runtimes per agent")
+    parser.add_argument("--worker-concurrency", type=int, default=4)
+    parser.add_argument("--poll", type=float, default=0.01, help="worker idle interval in seconds")
+    parser.add_argument("--work", type=float, default=0.0, help="seconds each directive handler sleeps")
+    parser.add_argument("--alloc-ops", type=int, default=100, help="operations in the tracemalloc pass")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="fail if results regress against this file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Without a database URL workers poll instead of waiting on LISTEN/NOTIFY.
+    os.environ.pop("SUPABASE_DB_URL", None)
+    db = FakeDatabase(latency=args.latency, jitter=args.jitter)
+    install(db)
+    seed(db, args.rows)
+
+    from backend.handshake_server import app, response_cache
+
+    if not args.cache:
+        response_cache.ttls = {}
+
+    scenarios = args.scenarios.split(",")
+    results = []
+    if "routes" in scenarios:
+        for method, path, body in ROUTES:
+            scenario = route_scenario(app, method, path, body, args.concurrency)
+            results.append(measure(f"{method} {path}", scenario, db, args.requests, args.alloc_ops))
+    if "round_trip" in scenarios:
+        results.append(measure("round_trip", round_trip_scenario(app, db, args), db, args.directives, args.alloc_ops))
+    if "drain" in scenarios:
+        results.append(measure("drain", drain_scenario(db, args), db, args.directives, args.alloc_ops))
+
+    print(f"{'scenario':<36} {'ops/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'calls/op':>9} {'peak KiB':>9} {'blocks/op':>10}")
+    for row in results:
+        print(
+            f"{row['scenario']:<36} {row['ops_per_s']:>9.1f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f}"
+            f" {row['calls_per_op']:>9.2f} {row['peak_kib']:>9.1f} {row['blocks_per_op']:>10.1f}"
+        )
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"args": vars(args), "results": results}, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle)["results"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
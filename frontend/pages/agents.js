@@ -31,6 +31,20 @@ export default function Agents() {
       }
     };
     fetchMetrics();
+
+    // Apply live swarm updates pushed by the handshake server instead of
+    // re-querying on an interval.
+    const source = new EventSource(`${handshakeUrl}/api/stream?topics=swarm_state,swarm_activity`);
+    source.addEventListener('swarm_state', (e) => {
+      const { row } = JSON.parse(e.data);
+      setMetrics((prev) => ({ activity: [], ...prev, state: row }));
+    });
+    source.addEventListener('swarm_activity', (e) => {
+      const { row } = JSON.parse(e.data);
+      setMetrics((prev) => ({ state: {}, ...prev, activity: [row, ...((prev && prev.activity) || [])].slice(0, 10) }));
+    });
+    source.addEventListener('lagged', fetchMetrics);
+    return () => source.close();
   }, []);
 
   const deployAgents = async () => {
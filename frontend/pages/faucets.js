@@ -6,25 +6,31 @@ export default function Faucets() {
   const [data, setData] = useState(null);
   const [loading, setLoading] = useState(true);
 
+  // The registry is paged; pass the last page's next_cursor to append the next one.
+  const fetchData = async (cursor) => {
+    setLoading(true);
+    try {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const res = await fetch(`${handshakeUrl}/api/faucets${query}`);
+      const json = await res.json();
+      setData((prev) =>
+        cursor && prev ? { ...prev, faucets: [...prev.faucets, ...json.faucets], next_cursor: json.next_cursor } : json
+      );
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const res = await fetch(`${handshakeUrl}/api/faucets`);
-        const json = await res.json();
-        setData(json);
-      } catch (err) {
-        console.error(err);
-      } finally {
-        setLoading(false);
-      }
-    };
     fetchData();
   }, []);
 
   return (
     <div className="p-4 space-y-4">
       <h1 className="text-2xl font-bold text-primary-cyan mb-2">Faucet Registry</h1>
-      {loading && <p>Loading...</p>}
+      {loading && !data && <p>Loading...</p>}
       {data && (
         <div className="overflow-x-auto">
           <table className="min-w-full text-sm text-left text-gray-400">
@@ -47,6 +53,15 @@ export default function Faucets() {
               ))}
             </tbody>
           </table>
+          {data.next_cursor && (
+            <button
+              className="mt-2 px-4 py-2 bg-primary-blue hover:bg-primary-cyan text-black font-semibold rounded-lg"
+              onClick={() => fetchData(data.next_cursor)}
+              disabled={loading}
+            >
+              {loading ? 'Loading…' : 'Load more'}
+            </button>
+          )}
           <h2 className="mt-4 text-lg font-semibold text-primary-lime">Recent Yields</h2>
           <ul className="text-sm list-disc pl-6">
             {data.yields.map((y) => (
@@ -1,12 +1,7 @@
 import { useState, useEffect } from 'react';
-import { createClient } from '@supabase/supabase-js';
-
-// Initialise Supabase client using NEXT_PUBLIC_* env variables
-const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL;
-const supabaseAnonKey = process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY;
-const supabase = supabaseUrl && supabaseAnonKey ? createClient(supabaseUrl, supabaseAnonKey) : null;
 
 const handshakeUrl = process.env.NEXT_PUBLIC_HANDSHAKE_URL || 'http://localhost:8000';
+const wsUrl = handshakeUrl.replace(/^http/, 'ws');
 
 export default function Home() {
   const [selectedAgent, setSelectedAgent] = useState('PromptWriter');
@@ -27,19 +22,15 @@ export default function Home() {
   ]);
 
   useEffect(() => {
-    // Subscribe to agent_logs via Supabase and stream new messages
-    if (!supabase) return;
-    const channel = supabase.channel('agent_logs_changes').on(
-      'postgres_changes',
-      { event: 'INSERT', schema: 'public', table: 'agent_logs' },
-      (payload) => {
-        const { new: log } = payload;
-        setMessages((prev) => [...prev, { sender: log.agent, content: JSON.stringify(log) }]);
-      },
-    );
-    channel.subscribe();
+    // Stream new agent_logs from the handshake server's shared feed
+    const socket = new WebSocket(`${wsUrl}/ws?topics=agent_logs`);
+    socket.onmessage = (e) => {
+      const { topic, row: log } = JSON.parse(e.data);
+      if (topic !== 'agent_logs') return;
+      setMessages((prev) => [...prev, { sender: log.agent, content: JSON.stringify(log) }]);
+    };
     return () => {
-      channel.unsubscribe();
+      socket.close();
     };
   }, []);
 
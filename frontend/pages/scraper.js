@@ -4,6 +4,7 @@ const handshakeUrl = process.env.NEXT_PUBLIC_HANDSHAKE_URL || 'http://localhost:
 
 export default function ScraperManager() {
   const [jobs, setJobs] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [form, setForm] = useState({
     source: 'web',
@@ -14,12 +15,15 @@ export default function ScraperManager() {
   });
   const [status, setStatus] = useState('');
 
-  // Fetch existing jobs from the API
-  const fetchJobs = async () => {
+  // Fetch existing jobs from the API.  Jobs are paged; with a cursor the
+  // next page is appended, without one the list starts over.
+  const fetchJobs = async (cursor) => {
     try {
-      const res = await fetch(`${handshakeUrl}/api/scraper-jobs`);
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const res = await fetch(`${handshakeUrl}/api/scraper-jobs${query}`);
       const data = await res.json();
-      setJobs(data.jobs || []);
+      setJobs((prev) => (cursor ? [...prev, ...(data.jobs || [])] : data.jobs || []));
+      setNextCursor(data.next_cursor || null);
     } catch (err) {
       console.error(err);
     }
@@ -182,6 +186,14 @@ export default function ScraperManager() {
             </tbody>
           </table>
         )}
+        {nextCursor && (
+          <button
+            className="mt-2 px-4 py-2 bg-primary-blue hover:bg-primary-cyan text-black font-semibold rounded-lg"
+            onClick={() => fetchJobs(nextCursor)}
+          >
+            Load more
+          </button>
+        )}
       </div>
     </div>
   );
@@ -6,18 +6,30 @@ export default function Wallets() {
   const [data, setData] = useState(null);
   const [loading, setLoading] = useState(true);
 
+  // Wallets are paged; each page carries the assets of its own wallets.
+  const fetchData = async (cursor) => {
+    setLoading(true);
+    try {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const res = await fetch(`${handshakeUrl}/api/wallets${query}`);
+      const json = await res.json();
+      setData((prev) =>
+        cursor && prev
+          ? {
+              wallets: [...prev.wallets, ...json.wallets],
+              assets: [...(prev.assets || []), ...(json.assets || [])],
+              next_cursor: json.next_cursor,
+            }
+          : json
+      );
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const res = await fetch(`${handshakeUrl}/api/wallets`);
-        const json = await res.json();
-        setData(json);
-      } catch (err) {
-        console.error(err);
-      } finally {
-        setLoading(false);
-      }
-    };
     fetchData();
   }, []);
 
@@ -29,7 +41,7 @@ export default function Wallets() {
   return (
     <div className="p-4 space-y-4">
       <h1 className="text-2xl font-bold text-primary-cyan mb-2">Wallets</h1>
-      {loading && <p>Loading...</p>}
+      {loading && !data && <p>Loading...</p>}
       {data && (
         <div className="space-y-6">
           {data.wallets.map((wallet) => (
@@ -50,6 +62,15 @@ export default function Wallets() {
               </div>
             </div>
           ))}
+          {data.next_cursor && (
+            <button
+              className="px-4 py-2 bg-primary-blue hover:bg-primary-cyan text-black font-semibold rounded-lg"
+              onClick={() => fetchData(data.next_cursor)}
+              disabled={loading}
+            >
+              {loading ? 'Loading…' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
       {data && data.wallets.length === 0 && <p>No wallets found.</p>}
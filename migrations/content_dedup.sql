@@ -0,0 +1,53 @@
+-- Content fingerprints for scraper_results and knowledge_base
+--
+-- The unified scraper and the GitHub scanner used to insert a new row for
+-- every record on every run, so unchanged pages and repos piled up as
+-- duplicates.  Each row now carries ``url_hash`` (SHA-256 of the
+-- normalised URL) and ``content_hash`` (SHA-256 of the URL and payload),
+-- computed in ``backend/content_hash.py``.  The unique indexes below let the
+-- writers upsert one row per job (or source) and URL, and the writers skip
+-- rows whose ``content_hash`` is unchanged.
+--
+-- Existing rows keep a NULL ``url_hash``, which the unique indexes allow,
+-- until ``backend/workers/content_backfill.py`` keys them with the same
+-- ``normalize_url`` the writers use and deletes the older duplicates.  Run
+-- it once after this file.  The ``DELETE`` statements below only see keyed
+-- rows, so running this file again after the backfill is safe.
+--
+-- An earlier version of this file keyed rows in SQL with a copy of
+-- ``normalize_url``; that copy is dropped.
+
+DROP FUNCTION IF EXISTS normalize_url(TEXT);
+DROP FUNCTION IF EXISTS url_quote_plus(TEXT);
+DROP FUNCTION IF EXISTS url_unquote_plus(TEXT);
+
+ALTER TABLE scraper_results ADD COLUMN IF NOT EXISTS url_hash TEXT;
+ALTER TABLE scraper_results ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+DELETE FROM scraper_results older
+ USING scraper_results newer
+ WHERE older.job_id = newer.job_id
+   AND older.url_hash = newer.url_hash
+   AND older.id < newer.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_scraper_results_job_url ON scraper_results(job_id, url_hash);
+
+-- knowledge_base was created outside the migrations; define it if missing.
+CREATE TABLE IF NOT EXISTS knowledge_base (
+  id BIGSERIAL PRIMARY KEY,
+  source TEXT NOT NULL,
+  name TEXT,
+  url TEXT,
+  summary TEXT,
+  "timestamp" DOUBLE PRECISION
+);
+ALTER TABLE knowledge_base ADD COLUMN IF NOT EXISTS url_hash TEXT;
+ALTER TABLE knowledge_base ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+DELETE FROM knowledge_base older
+ USING knowledge_base newer
+ WHERE older.source = newer.source
+   AND older.url_hash = newer.url_hash
+   AND older.id < newer.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_knowledge_base_source_url ON knowledge_base(source, url_hash);
@@ -0,0 +1,28 @@
+-- Push notifications for new directives
+--
+-- Emits a NOTIFY on the ``agent_directives`` channel whenever a directive
+-- becomes pending, either by insert or because a lease was released or
+-- expired (see directive_queue.sql).  The payload is a small JSON object
+-- ``{"agent": ..., "id": ...}``; workers listening through
+-- ``backend/directive_listener.py`` wake up and claim the row immediately
+-- instead of waiting for their next poll.
+
+CREATE OR REPLACE FUNCTION notify_agent_directive()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM pg_notify(
+    'agent_directives',
+    json_build_object('agent', NEW.agent, 'id', NEW.id)::text
+  );
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS agent_directives_notify ON agent_directives;
+CREATE TRIGGER agent_directives_notify
+  AFTER INSERT OR UPDATE OF status ON agent_directives
+  FOR EACH ROW
+  WHEN (NEW.status = 'pending')
+  EXECUTE FUNCTION notify_agent_directive();
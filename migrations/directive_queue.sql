@@ -0,0 +1,140 @@
+-- Lease-based directive queue for Infinity X One
+--
+-- Workers used to read every pending directive for their agent, process
+-- the first one and mark it complete.  Two replicas of the same agent could
+-- therefore pick up the same row.  This migration adds lease columns to
+-- ``agent_directives`` and RPC functions that claim rows atomically with
+-- ``FOR UPDATE SKIP LOCKED``, so each directive is handed to exactly one
+-- worker at a time.  A claimed directive whose lease expires (because its
+-- worker crashed or stalled) becomes claimable again.
+--
+-- Status lifecycle: pending -> claimed -> complete
+--                            \-> pending (lease expired or released)
+
+ALTER TABLE agent_directives ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE agent_directives ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE agent_directives ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+
+-- Expired leases are found by scanning claimed rows only.
+CREATE INDEX IF NOT EXISTS idx_agent_directives_lease
+  ON agent_directives(lease_expires_at)
+  WHERE status = 'claimed';
+
+-- Return expired claims to the pending state.  When ``p_agent`` is NULL
+-- every agent is swept.  Returns the number of requeued directives.
+CREATE OR REPLACE FUNCTION requeue_expired_directives(p_agent TEXT DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  requeued INTEGER;
+BEGIN
+  UPDATE agent_directives d
+     SET status = 'pending',
+         lease_owner = NULL,
+         lease_expires_at = NULL
+   WHERE d.id IN (
+     SELECT id
+       FROM agent_directives
+      WHERE status = 'claimed'
+        AND lease_expires_at < NOW()
+        AND (p_agent IS NULL OR agent = p_agent)
+      FOR UPDATE SKIP LOCKED
+   );
+  GET DIAGNOSTICS requeued = ROW_COUNT;
+  RETURN requeued;
+END;
+$$;
+
+-- Atomically claim up to ``p_limit`` pending directives for ``p_agent``.
+-- Rows locked by a concurrent claimer are skipped rather than waited on.
+CREATE OR REPLACE FUNCTION claim_directives(
+  p_agent TEXT,
+  p_worker TEXT,
+  p_limit INTEGER DEFAULT 1,
+  p_visibility_seconds INTEGER DEFAULT 300
+)
+RETURNS TABLE (
+  id BIGINT,
+  command TEXT,
+  payload JSONB,
+  attempts INTEGER,
+  lease_expires_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  PERFORM requeue_expired_directives(p_agent);
+  RETURN QUERY
+  UPDATE agent_directives d
+     SET status = 'claimed',
+         lease_owner = p_worker,
+         lease_expires_at = NOW() + make_interval(secs => p_visibility_seconds),
+         attempts = d.attempts + 1
+   WHERE d.id IN (
+     SELECT c.id
+       FROM agent_directives c
+      WHERE c.agent = p_agent
+        AND c.status = 'pending'
+      ORDER BY c."timestamp"
+      LIMIT p_limit
+      FOR UPDATE SKIP LOCKED
+   )
+  RETURNING d.id, d.command, d.payload, d.attempts, d.lease_expires_at;
+END;
+$$;
+
+-- Push back the lease deadline of a directive still held by ``p_worker``.
+-- Returns FALSE when the lease was lost (expired and reclaimed elsewhere).
+CREATE OR REPLACE FUNCTION extend_directive_lease(
+  p_id BIGINT,
+  p_worker TEXT,
+  p_visibility_seconds INTEGER DEFAULT 300
+)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+  WITH extended AS (
+    UPDATE agent_directives
+       SET lease_expires_at = NOW() + make_interval(secs => p_visibility_seconds)
+     WHERE id = p_id
+       AND status = 'claimed'
+       AND lease_owner = p_worker
+    RETURNING 1
+  )
+  SELECT EXISTS (SELECT 1 FROM extended);
+$$;
+
+-- Hand a claimed directive back to the queue without waiting for expiry.
+CREATE OR REPLACE FUNCTION release_directive(p_id BIGINT, p_worker TEXT)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+  WITH released AS (
+    UPDATE agent_directives
+       SET status = 'pending',
+           lease_owner = NULL,
+           lease_expires_at = NULL
+     WHERE id = p_id
+       AND status = 'claimed'
+       AND lease_owner = p_worker
+    RETURNING 1
+  )
+  SELECT EXISTS (SELECT 1 FROM released);
+$$;
+
+-- Backlog per agent for the Prometheus queue gauges (see backend/telemetry.py)
+-- and queue-depth autoscaling.  ``timestamp`` holds epoch seconds.
+CREATE OR REPLACE FUNCTION directive_queue_stats()
+RETURNS TABLE (agent TEXT, pending BIGINT, claimed BIGINT, oldest_age_seconds DOUBLE PRECISION)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT d.agent,
+         COUNT(*) FILTER (WHERE d.status = 'pending'),
+         COUNT(*) FILTER (WHERE d.status = 'claimed'),
+         EXTRACT(EPOCH FROM NOW())::DOUBLE PRECISION - MIN(d."timestamp") FILTER (WHERE d.status = 'pending')
+    FROM agent_directives d
+   WHERE d.status IN ('pending', 'claimed')
+   GROUP BY d.agent;
+$$;
@@ -0,0 +1,27 @@
+-- Incremental cursors for the GitHub scanner and the core improver
+--
+-- Both workers used to have nothing to fetch (their GitHub calls were
+-- placeholders).  They now search GitHub incrementally: every query keeps
+-- the newest ``pushed_at`` (or ``created_at``) it has seen, and the next run
+-- only asks for repositories after it (see ``backend/github_crawler.py``).
+-- ``scanner`` separates the cursors of the two workers.
+
+CREATE TABLE IF NOT EXISTS github_scan_cursors (
+  scanner TEXT NOT NULL,
+  query TEXT NOT NULL,
+  since TIMESTAMP WITH TIME ZONE NOT NULL,
+  updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (scanner, query)
+);
+
+-- innovation_queue was created outside the migrations; define it if missing.
+CREATE TABLE IF NOT EXISTS innovation_queue (
+  id BIGSERIAL PRIMARY KEY,
+  title TEXT,
+  description TEXT,
+  source TEXT,
+  "timestamp" DOUBLE PRECISION
+);
+
+-- The core improver skips repositories that are already queued.
+CREATE INDEX IF NOT EXISTS idx_innovation_queue_source ON innovation_queue(source);
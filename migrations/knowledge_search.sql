@@ -0,0 +1,254 @@
+-- Full-text search over knowledge_base and innovation_queue
+--
+-- The GitHub scanner and the core improver fill these tables, but nothing
+-- could search them.  Each table gets a ``search_vector`` column kept
+-- current by a trigger: the name/title weighs more (A) than the
+-- summary/description (B).  GIN indexes serve ``@@`` matches, and
+-- ``search_knowledge`` ranks the matches of both tables inside Postgres.
+-- It returns one page with highlighted snippets; ``ts_headline`` only runs
+-- on the rows of that page.  Pages are keyset-paginated on
+-- (rank, kind, id), so deep pages do not re-send earlier rows.
+--
+-- Ranking reads every candidate row, so a term found in millions of rows
+-- cannot be ranked in full within a request.  Candidates are the matches
+-- in a band of the newest ids (see ``knowledge_search_band``), widened
+-- until a page is full.  Once a band runs out of matches, paging goes on
+-- in the next older band, ranked below the earlier ones, so every match is
+-- reached.  The bands come back with each row and go into the next page's
+-- cursor, so a search pages through a stable set of rows.
+--
+-- Queries use web search syntax (``websearch_to_tsquery``): quoted
+-- phrases, ``or`` and ``-exclusions``.  The text search configuration is
+-- ``english``.
+--
+-- Run after content_dedup.sql and github_scan_cursors.sql, which create the
+-- tables if they are missing.  The backfill rewrites every existing row
+-- once.
+
+ALTER TABLE knowledge_base ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+ALTER TABLE innovation_queue ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+CREATE OR REPLACE FUNCTION knowledge_base_search_vector()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.search_vector :=
+    setweight(to_tsvector('english', COALESCE(NEW.name, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(NEW.summary, '')), 'B');
+  RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION innovation_queue_search_vector()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.search_vector :=
+    setweight(to_tsvector('english', COALESCE(NEW.title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(NEW.description, '')), 'B');
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_knowledge_base_search_vector ON knowledge_base;
+CREATE TRIGGER trg_knowledge_base_search_vector
+  BEFORE INSERT OR UPDATE OF name, summary ON knowledge_base
+  FOR EACH ROW EXECUTE FUNCTION knowledge_base_search_vector();
+
+DROP TRIGGER IF EXISTS trg_innovation_queue_search_vector ON innovation_queue;
+CREATE TRIGGER trg_innovation_queue_search_vector
+  BEFORE INSERT OR UPDATE OF title, description ON innovation_queue
+  FOR EACH ROW EXECUTE FUNCTION innovation_queue_search_vector();
+
+-- Backfill before indexing; building the GIN index once is much faster
+-- than maintaining it row by row.
+UPDATE knowledge_base SET name = name WHERE search_vector IS NULL;
+UPDATE innovation_queue SET title = title WHERE search_vector IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_knowledge_base_search ON knowledge_base USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_innovation_queue_search ON innovation_queue USING GIN (search_vector);
+
+-- Earlier versions of the functions below; their signatures changed.
+DROP FUNCTION IF EXISTS knowledge_search_candidates(REGCLASS, TSQUERY, BIGINT, BIGINT, INT);
+DROP FUNCTION IF EXISTS search_knowledge(TEXT, TEXT[], INT, REAL, TEXT, BIGINT, BIGINT, BIGINT, BIGINT);
+
+-- The next band of ids of p_table to rank for p_query: ids in
+-- (floor, ceiling] below p_ceiling (or the newest id).  The band starts
+-- p_window ids wide and widens tenfold until it holds p_want matches or
+-- reaches the oldest row, so a common term only ranks recent rows while a
+-- rare one reaches back through the whole table.  ``exhausted`` is set
+-- when there are no older rows below the band.
+CREATE OR REPLACE FUNCTION knowledge_search_band(
+  p_table REGCLASS,
+  p_query TSQUERY,
+  p_ceiling BIGINT,
+  p_window BIGINT,
+  p_want INT,
+  OUT floor BIGINT,
+  OUT ceiling BIGINT,
+  OUT exhausted BOOLEAN
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  v_min BIGINT;
+  v_span BIGINT := GREATEST(p_window, 1);
+  v_count INT;
+BEGIN
+  EXECUTE format('SELECT min(id), max(id) FROM %s', p_table) INTO v_min, ceiling;
+  ceiling := LEAST(ceiling, p_ceiling);
+  IF ceiling IS NULL OR ceiling < v_min THEN
+    floor := COALESCE(ceiling, p_ceiling, 0);
+    ceiling := floor;
+    exhausted := TRUE;
+    RETURN;
+  END IF;
+  LOOP
+    floor := GREATEST(ceiling - v_span, v_min - 1);
+    -- Dynamic SQL is planned with the actual query and band each time.
+    EXECUTE format(
+      'SELECT count(*) FROM (SELECT 1 FROM %s WHERE id > $2 AND id <= $3 AND search_vector @@ $1 LIMIT $4) m',
+      p_table
+    ) INTO v_count USING p_query, floor, ceiling, p_want;
+    EXIT WHEN floor < v_min OR v_count >= p_want;
+    v_span := v_span * 10;
+  END LOOP;
+  exhausted := floor < v_min;
+END;
+$$;
+
+-- Matches of p_query in p_table with ids in (p_floor, p_ceiling], ranked.
+CREATE OR REPLACE FUNCTION knowledge_search_candidates(
+  p_table REGCLASS,
+  p_query TSQUERY,
+  p_floor BIGINT,
+  p_ceiling BIGINT
+)
+RETURNS TABLE (id BIGINT, rank REAL)
+LANGUAGE plpgsql
+STABLE
+AS $$
+BEGIN
+  RETURN QUERY EXECUTE format(
+    'SELECT id, ts_rank(search_vector, $1) FROM %s WHERE id > $2 AND id <= $3 AND search_vector @@ $1',
+    p_table
+  ) USING p_query, p_floor, p_ceiling;
+END;
+$$;
+
+-- One page of matches.  Results are ranked within tiers: tier 0 is the
+-- first band of each table, and every later tier is the next older band,
+-- ranked below all earlier tiers.  A page that runs out of matches in its
+-- tier continues into the next one, so paging reaches every match.  The
+-- tier and bands come back with every row; pass them with the last row's
+-- position to continue after it.
+CREATE OR REPLACE FUNCTION search_knowledge(
+  p_query TEXT,
+  p_kinds TEXT[] DEFAULT ARRAY['knowledge', 'innovation'],
+  p_limit INT DEFAULT 20,
+  p_after_tier INT DEFAULT NULL,
+  p_after_rank REAL DEFAULT NULL,
+  p_after_kind TEXT DEFAULT NULL,
+  p_after_id BIGINT DEFAULT NULL,
+  p_knowledge_floor BIGINT DEFAULT NULL,
+  p_knowledge_ceiling BIGINT DEFAULT NULL,
+  p_innovation_floor BIGINT DEFAULT NULL,
+  p_innovation_ceiling BIGINT DEFAULT NULL,
+  p_window BIGINT DEFAULT 20000
+)
+RETURNS TABLE (
+  kind TEXT, id BIGINT, title TEXT, url TEXT, source TEXT, rank REAL, snippet TEXT,
+  tier INT, knowledge_floor BIGINT, knowledge_ceiling BIGINT,
+  innovation_floor BIGINT, innovation_ceiling BIGINT
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_query TSQUERY := websearch_to_tsquery('english', p_query);
+  v_left INT := LEAST(GREATEST(p_limit, 1), 101);
+  v_tier INT := COALESCE(p_after_tier, 0);
+  v_k RECORD;
+  v_i RECORD;
+  v_rows INT;
+BEGIN
+  IF numnode(v_query) = 0 THEN
+    RETURN;  -- empty, or only stop words
+  END IF;
+  -- Kinds not searched get an empty band.
+  IF NOT 'knowledge' = ANY(p_kinds) THEN
+    SELECT 0::BIGINT AS floor, 0::BIGINT AS ceiling, TRUE AS exhausted INTO v_k;
+  ELSIF p_knowledge_floor IS NULL THEN
+    SELECT * INTO v_k FROM knowledge_search_band('knowledge_base', v_query, NULL, p_window, v_left);
+  ELSE
+    SELECT p_knowledge_floor AS floor, p_knowledge_ceiling AS ceiling, FALSE AS exhausted INTO v_k;
+  END IF;
+  IF NOT 'innovation' = ANY(p_kinds) THEN
+    SELECT 0::BIGINT AS floor, 0::BIGINT AS ceiling, TRUE AS exhausted INTO v_i;
+  ELSIF p_innovation_floor IS NULL THEN
+    SELECT * INTO v_i FROM knowledge_search_band('innovation_queue', v_query, NULL, p_window, v_left);
+  ELSE
+    SELECT p_innovation_floor AS floor, p_innovation_ceiling AS ceiling, FALSE AS exhausted INTO v_i;
+  END IF;
+
+  LOOP
+    RETURN QUERY
+    WITH hits AS (
+      SELECT 'knowledge'::TEXT AS kind, c.id, c.rank
+        FROM knowledge_search_candidates('knowledge_base', v_query, v_k.floor, v_k.ceiling) c
+      UNION ALL
+      SELECT 'innovation'::TEXT, c.id, c.rank
+        FROM knowledge_search_candidates('innovation_queue', v_query, v_i.floor, v_i.ceiling) c
+    ),
+    page AS (
+      SELECT hits.kind, hits.id, hits.rank
+        FROM hits
+       WHERE v_tier IS DISTINCT FROM p_after_tier OR p_after_rank IS NULL
+          OR (hits.rank, hits.kind, hits.id) < (p_after_rank, p_after_kind, p_after_id)
+       ORDER BY hits.rank DESC, hits.kind DESC, hits.id DESC
+       LIMIT v_left
+    )
+    SELECT page.kind,
+           page.id,
+           COALESCE(k.name, i.title),
+           COALESCE(k.url, i.source),
+           k.source,
+           page.rank,
+           ts_headline(
+             'english',
+             COALESCE(NULLIF(k.summary, ''), NULLIF(i.description, ''), k.name, i.title, ''),
+             v_query,
+             'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2'
+           ),
+           v_tier,
+           v_k.floor,
+           v_k.ceiling,
+           v_i.floor,
+           v_i.ceiling
+      FROM page
+      LEFT JOIN knowledge_base k ON page.kind = 'knowledge' AND k.id = page.id
+      LEFT JOIN innovation_queue i ON page.kind = 'innovation' AND i.id = page.id
+     ORDER BY page.rank DESC, page.kind DESC, page.id DESC;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    v_left := v_left - v_rows;
+    EXIT WHEN v_left = 0 OR (v_k.exhausted AND v_i.exhausted);
+
+    -- Continue into the next older band of each table.
+    v_tier := v_tier + 1;
+    IF NOT v_k.exhausted THEN
+      SELECT * INTO v_k FROM knowledge_search_band('knowledge_base', v_query, v_k.floor, p_window, v_left);
+    ELSE
+      v_k.ceiling := v_k.floor;
+    END IF;
+    IF NOT v_i.exhausted THEN
+      SELECT * INTO v_i FROM knowledge_search_band('innovation_queue', v_query, v_i.floor, p_window, v_left);
+    ELSE
+      v_i.ceiling := v_i.floor;
+    END IF;
+  END LOOP;
+END;
+$$;
@@ -0,0 +1,128 @@
+-- Hourly rollups for profit_ledger and faucet_logs
+--
+-- ``resource_allocator`` and PickyBot only need totals per agent over a
+-- time window, but used to read every raw ledger row to get them.  These
+-- tables hold one row per hour and key, maintained incrementally by
+-- statement-level triggers so a bulk insert updates each affected bucket
+-- once.  ``refresh_ledger_rollups`` rebuilds them from the base tables,
+-- either completely or from a given point in time.
+--
+-- Key columns are NOT NULL; missing values are stored as ''.
+
+CREATE TABLE IF NOT EXISTS profit_ledger_hourly (
+  bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+  agent TEXT NOT NULL DEFAULT '',
+  chain TEXT NOT NULL DEFAULT '',
+  wallet TEXT NOT NULL DEFAULT '',
+  total NUMERIC NOT NULL DEFAULT 0,
+  entries BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (bucket, agent, chain, wallet)
+);
+
+-- faucet_logs has no chain column; claims are keyed by faucet instead.
+CREATE TABLE IF NOT EXISTS faucet_logs_hourly (
+  bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+  agent TEXT NOT NULL DEFAULT '',
+  faucet TEXT NOT NULL DEFAULT '',
+  wallet TEXT NOT NULL DEFAULT '',
+  claims BIGINT NOT NULL DEFAULT 0,
+  successes BIGINT NOT NULL DEFAULT 0,
+  amount NUMERIC NOT NULL DEFAULT 0,
+  PRIMARY KEY (bucket, agent, faucet, wallet)
+);
+
+CREATE INDEX IF NOT EXISTS idx_profit_ledger_hourly_agent ON profit_ledger_hourly(agent, bucket);
+CREATE INDEX IF NOT EXISTS idx_faucet_logs_hourly_agent ON faucet_logs_hourly(agent, bucket);
+
+CREATE OR REPLACE FUNCTION rollup_profit_ledger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO profit_ledger_hourly AS h (bucket, agent, chain, wallet, total, entries)
+  SELECT date_trunc('hour', n.ts, 'UTC'),
+         COALESCE(n.agent, ''),
+         COALESCE(n.chain, ''),
+         COALESCE(n.wallet, ''),
+         COALESCE(SUM(n.amount), 0),
+         COUNT(*)
+    FROM new_rows n
+   WHERE n.ts IS NOT NULL
+   GROUP BY 1, 2, 3, 4
+  ON CONFLICT (bucket, agent, chain, wallet) DO UPDATE
+     SET total = h.total + EXCLUDED.total,
+         entries = h.entries + EXCLUDED.entries;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION rollup_faucet_logs()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO faucet_logs_hourly AS h (bucket, agent, faucet, wallet, claims, successes, amount)
+  SELECT date_trunc('hour', n.ts, 'UTC'),
+         COALESCE(n.agent, ''),
+         COALESCE(n.faucet, ''),
+         COALESCE(n.wallet, ''),
+         COUNT(*),
+         COUNT(*) FILTER (WHERE n.claimed),
+         COALESCE(SUM(n.amount), 0)
+    FROM new_rows n
+   WHERE n.ts IS NOT NULL
+   GROUP BY 1, 2, 3, 4
+  ON CONFLICT (bucket, agent, faucet, wallet) DO UPDATE
+     SET claims = h.claims + EXCLUDED.claims,
+         successes = h.successes + EXCLUDED.successes,
+         amount = h.amount + EXCLUDED.amount;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS profit_ledger_rollup ON profit_ledger;
+CREATE TRIGGER profit_ledger_rollup
+  AFTER INSERT ON profit_ledger
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION rollup_profit_ledger();
+
+DROP TRIGGER IF EXISTS faucet_logs_rollup ON faucet_logs;
+CREATE TRIGGER faucet_logs_rollup
+  AFTER INSERT ON faucet_logs
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION rollup_faucet_logs();
+
+-- Rebuild both rollups from the base tables.  With ``p_since`` only buckets
+-- from that hour onwards are rebuilt; NULL rebuilds everything.  The
+-- rollup tables are locked for the duration so concurrent inserts are
+-- applied after the rebuild instead of being counted twice or lost.
+CREATE OR REPLACE FUNCTION refresh_ledger_rollups(p_since TIMESTAMP WITH TIME ZONE DEFAULT NULL)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_from TIMESTAMP WITH TIME ZONE := date_trunc('hour', COALESCE(p_since, '-infinity'::TIMESTAMPTZ), 'UTC');
+BEGIN
+  LOCK TABLE profit_ledger_hourly, faucet_logs_hourly IN EXCLUSIVE MODE;
+
+  DELETE FROM profit_ledger_hourly WHERE bucket >= v_from;
+  INSERT INTO profit_ledger_hourly (bucket, agent, chain, wallet, total, entries)
+  SELECT date_trunc('hour', ts, 'UTC'), COALESCE(agent, ''), COALESCE(chain, ''), COALESCE(wallet, ''),
+         COALESCE(SUM(amount), 0), COUNT(*)
+    FROM profit_ledger
+   WHERE ts >= v_from
+   GROUP BY 1, 2, 3, 4;
+
+  DELETE FROM faucet_logs_hourly WHERE bucket >= v_from;
+  INSERT INTO faucet_logs_hourly (bucket, agent, faucet, wallet, claims, successes, amount)
+  SELECT date_trunc('hour', ts, 'UTC'), COALESCE(agent, ''), COALESCE(faucet, ''), COALESCE(wallet, ''),
+         COUNT(*), COUNT(*) FILTER (WHERE claimed), COALESCE(SUM(amount), 0)
+    FROM faucet_logs
+   WHERE ts >= v_from
+   GROUP BY 1, 2, 3, 4;
+END;
+$$;
+
+SELECT refresh_ledger_rollups();
@@ -0,0 +1,63 @@
+-- Server-side aggregation for /api/metrics
+--
+-- The handshake server used to return the last 100 raw ``profit_ledger``
+-- and ``revenues`` rows and leave any rollup to the browser.  These
+-- functions bucket both tables by day, week or month (UTC) inside Postgres
+-- so the API only ships one row per bucket (and chain) regardless of how
+-- much history is requested.
+
+CREATE OR REPLACE FUNCTION metrics_profit_buckets(
+  p_interval TEXT,
+  p_since TIMESTAMP WITH TIME ZONE,
+  p_until TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+)
+RETURNS TABLE (bucket TIMESTAMP WITH TIME ZONE, chain TEXT, total NUMERIC, entries BIGINT)
+LANGUAGE plpgsql
+STABLE
+AS $$
+BEGIN
+  IF p_interval NOT IN ('day', 'week', 'month') THEN
+    RAISE EXCEPTION 'unsupported interval %', p_interval USING ERRCODE = '22023';
+  END IF;
+  RETURN QUERY
+  SELECT date_trunc(p_interval, p.ts, 'UTC') AS bucket,
+         COALESCE(p.chain, 'unknown') AS chain,
+         COALESCE(SUM(p.amount), 0)::NUMERIC AS total,
+         COUNT(*) AS entries
+    FROM profit_ledger p
+   WHERE p.ts >= p_since
+     AND p.ts < p_until
+   GROUP BY 1, 2
+   ORDER BY 1, 2;
+END;
+$$;
+
+-- ``revenues.timestamp`` holds epoch seconds, so the range is converted
+-- once instead of per row to keep the predicate indexable.
+CREATE OR REPLACE FUNCTION metrics_revenue_buckets(
+  p_interval TEXT,
+  p_since TIMESTAMP WITH TIME ZONE,
+  p_until TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+)
+RETURNS TABLE (bucket TIMESTAMP WITH TIME ZONE, total NUMERIC, entries BIGINT)
+LANGUAGE plpgsql
+STABLE
+AS $$
+BEGIN
+  IF p_interval NOT IN ('day', 'week', 'month') THEN
+    RAISE EXCEPTION 'unsupported interval %', p_interval USING ERRCODE = '22023';
+  END IF;
+  RETURN QUERY
+  SELECT date_trunc(p_interval, to_timestamp(r."timestamp"), 'UTC') AS bucket,
+         COALESCE(SUM(r.reward), 0)::NUMERIC AS total,
+         COUNT(*) AS entries
+    FROM revenues r
+   WHERE r."timestamp" >= EXTRACT(EPOCH FROM p_since)
+     AND r."timestamp" < EXTRACT(EPOCH FROM p_until)
+   GROUP BY 1
+   ORDER BY 1;
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_profit_ledger_ts ON profit_ledger(ts);
+CREATE INDEX IF NOT EXISTS idx_revenues_timestamp ON revenues("timestamp");
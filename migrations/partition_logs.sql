@@ -0,0 +1,271 @@
+-- Range partitioning for agent_logs, faucet_logs and profit_ledger
+--
+-- The append-only log tables are converted into tables partitioned by
+-- ``ts`` so time-window queries (``/api/metrics``, the rollup refresh and
+-- the archiver) only touch the relevant partitions, and retention becomes a
+-- ``DROP`` of whole partitions instead of a large ``DELETE``.
+--
+-- The conversion is online: existing rows are not copied.  The current
+-- table is renamed to ``<table>_legacy`` and attached as the partition for
+-- everything before a switch point one or two intervals ahead.  A validated
+-- CHECK constraint proves the rows fit, so the attach does not scan the
+-- table, and writes are only blocked for the rename and attach.  New rows
+-- from the switch point on land in per-day or per-month partitions, and a
+-- default partition catches anything outside the pre-created range.  The
+-- legacy partition is dropped by retention like any other partition once
+-- its upper bound has aged out.
+--
+-- Run this file with psql (``psql -f migrations/partition_logs.sql``) so
+-- each CALL is its own top-level statement; ``partition_by_time`` commits
+-- between its steps.  Apply it after ledger_rollups.sql and
+-- realtime_feed.sql; their triggers are moved onto the new parent tables.
+--
+-- ``maintain_time_partitions()`` creates upcoming partitions and applies
+-- retention.  The ``partition-maintenance-job`` CronJob calls it daily; on
+-- projects with pg_cron it can be scheduled in the database instead.
+
+CREATE TABLE IF NOT EXISTS time_partitioned_tables (
+  table_name TEXT PRIMARY KEY,
+  part_interval TEXT NOT NULL CHECK (part_interval IN ('day', 'month')),
+  premake INT NOT NULL DEFAULT 7,
+  retention INTERVAL
+);
+
+-- Range partitions of ``p_table`` with their upper bounds (NULL for the
+-- default partition).
+CREATE OR REPLACE FUNCTION time_partition_bounds(p_table TEXT)
+RETURNS TABLE (partition_name TEXT, upper_bound TIMESTAMP WITH TIME ZONE)
+LANGUAGE sql STABLE
+AS $$
+  SELECT c.relname::TEXT,
+         substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \(''([^'']+)''\)')::TIMESTAMP WITH TIME ZONE
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+   WHERE i.inhparent = p_table::REGCLASS;
+$$;
+
+-- Create the partition of ``p_table`` starting at ``p_start`` unless that
+-- range is already covered.  Rows already routed to the default partition
+-- for that range are moved into it first, otherwise the attach would fail.
+CREATE OR REPLACE FUNCTION create_time_partition(p_table TEXT, p_start TIMESTAMP WITH TIME ZONE, p_interval TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_end TIMESTAMP WITH TIME ZONE := p_start + ('1 ' || p_interval)::INTERVAL;
+  v_name TEXT := p_table || '_p' || to_char(p_start AT TIME ZONE 'UTC', CASE p_interval WHEN 'day' THEN 'YYYYMMDD' ELSE 'YYYYMM' END);
+  v_default TEXT := p_table || '_default';
+BEGIN
+  IF to_regclass(v_name) IS NOT NULL
+     OR p_start < (SELECT max(upper_bound) FROM time_partition_bounds(p_table)) THEN
+    RETURN NULL;
+  END IF;
+  EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS)', v_name, p_table);
+  IF to_regclass(v_default) IS NOT NULL THEN
+    EXECUTE format(
+      'WITH moved AS (DELETE FROM %I WHERE ts >= $1 AND ts < $2 RETURNING *) INSERT INTO %I SELECT * FROM moved',
+      v_default, v_name
+    ) USING p_start, v_end;
+  END IF;
+  EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id)', v_name);
+  EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', p_table, v_name, p_start, v_end);
+  RETURN v_name;
+END;
+$$;
+
+-- Pre-create upcoming partitions and drop the ones past retention for every
+-- table registered in ``time_partitioned_tables``.
+CREATE OR REPLACE FUNCTION maintain_time_partitions()
+RETURNS TABLE (action TEXT, partition_name TEXT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_cfg RECORD;
+  v_part RECORD;
+  v_start TIMESTAMP WITH TIME ZONE;
+  v_created TEXT;
+BEGIN
+  FOR v_cfg IN SELECT * FROM time_partitioned_tables LOOP
+    v_start := date_trunc(v_cfg.part_interval, now(), 'UTC');
+    FOR i IN 0..v_cfg.premake LOOP
+      v_created := create_time_partition(
+        v_cfg.table_name, v_start + (i || ' ' || v_cfg.part_interval)::INTERVAL, v_cfg.part_interval
+      );
+      IF v_created IS NOT NULL THEN
+        action := 'created';
+        partition_name := v_created;
+        RETURN NEXT;
+      END IF;
+    END LOOP;
+
+    CONTINUE WHEN v_cfg.retention IS NULL;
+    FOR v_part IN
+      SELECT * FROM time_partition_bounds(v_cfg.table_name) b
+       WHERE b.upper_bound <= now() - v_cfg.retention
+    LOOP
+      EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', v_cfg.table_name, v_part.partition_name);
+      EXECUTE format('DROP TABLE %I', v_part.partition_name);
+      action := 'dropped';
+      partition_name := v_part.partition_name;
+      RETURN NEXT;
+    END LOOP;
+  END LOOP;
+END;
+$$;
+
+-- Convert ``p_table`` (which must have ``id`` and ``ts`` columns) into a
+-- table range-partitioned on ``ts``.  Safe to call again: an already
+-- partitioned table only has its settings updated.
+CREATE OR REPLACE PROCEDURE partition_by_time(
+  p_table TEXT,
+  p_interval TEXT,
+  p_premake INT DEFAULT 7,
+  p_retention INTERVAL DEFAULT NULL
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_legacy TEXT := p_table || '_legacy';
+  v_check TEXT := p_table || '_legacy_bound';
+  v_switch TIMESTAMP WITH TIME ZONE;
+  v_seq TEXT;
+  v_identity BOOLEAN;
+  v_last BIGINT;
+  v_triggers TEXT[] := '{}';
+  v_indexes TEXT[] := '{}';
+  v_def TEXT;
+  v_row RECORD;
+BEGIN
+  IF p_interval NOT IN ('day', 'month') THEN
+    RAISE EXCEPTION 'unsupported interval %', p_interval USING ERRCODE = '22023';
+  END IF;
+  INSERT INTO time_partitioned_tables (table_name, part_interval, premake, retention)
+  VALUES (p_table, p_interval, p_premake, p_retention)
+  ON CONFLICT (table_name) DO UPDATE
+     SET part_interval = EXCLUDED.part_interval, premake = EXCLUDED.premake, retention = EXCLUDED.retention;
+  IF (SELECT relkind FROM pg_class WHERE oid = p_table::REGCLASS) = 'p' THEN
+    COMMIT;
+    RETURN;
+  END IF;
+
+  -- 1. Constrain new rows to end before the switch point.  The switch is at
+  --    least a day away, so writes keep succeeding while we work.
+  v_switch := date_trunc(p_interval, now() + INTERVAL '1 day', 'UTC') + ('1 ' || p_interval)::INTERVAL;
+  EXECUTE format('ALTER TABLE %I DROP CONSTRAINT IF EXISTS %I', p_table, v_check);
+  EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I CHECK (ts IS NOT NULL AND ts < %L) NOT VALID', p_table, v_check, v_switch);
+  COMMIT;
+
+  -- 2. Rows without a timestamp cannot be routed; file them at the epoch so
+  --    they stay out of every recent time window, as they did before.
+  EXECUTE format('UPDATE %I SET ts = to_timestamp(0) WHERE ts IS NULL', p_table);
+  COMMIT;
+
+  -- 3. Prove the existing rows fit.  VALIDATE does not block writes.
+  EXECUTE format('ALTER TABLE %I VALIDATE CONSTRAINT %I', p_table, v_check);
+  COMMIT;
+
+  -- 4. Swap in the partitioned parent.  Everything below holds the table
+  --    lock only for catalog changes; no step scans the legacy rows.
+  EXECUTE format('LOCK TABLE %I IN ACCESS EXCLUSIVE MODE', p_table);
+  EXECUTE format('ALTER TABLE %I ALTER COLUMN ts SET NOT NULL', p_table);
+
+  FOR v_row IN
+    SELECT t.tgname, pg_get_triggerdef(t.oid) AS def
+      FROM pg_trigger t
+     WHERE t.tgrelid = p_table::REGCLASS AND NOT t.tgisinternal
+  LOOP
+    v_triggers := v_triggers || v_row.def;
+    EXECUTE format('DROP TRIGGER %I ON %I', v_row.tgname, p_table);
+  END LOOP;
+
+  FOR v_row IN
+    SELECT ic.relname, pg_get_indexdef(i.indexrelid) AS def
+      FROM pg_index i
+      JOIN pg_class ic ON ic.oid = i.indexrelid
+     WHERE i.indrelid = p_table::REGCLASS AND NOT i.indisunique
+  LOOP
+    -- The parent index takes over the original name; the legacy index is
+    -- attached to it instead of being rebuilt.
+    v_indexes := v_indexes || regexp_replace(v_row.def, '^CREATE INDEX \S+ ON \S+ ', format('CREATE INDEX %I ON %I ', v_row.relname, p_table));
+    EXECUTE format('ALTER INDEX %I RENAME TO %I', v_row.relname, left(v_row.relname, 55) || '_legacy');
+  END LOOP;
+
+  EXECUTE format('ALTER TABLE %I RENAME TO %I', p_table, v_legacy);
+  EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS) PARTITION BY RANGE (ts)', p_table, v_legacy);
+
+  -- Keep issuing ids from the existing sequence so ids stay unique across
+  -- partitions.  Identity sequences belong to their column, and a partition
+  -- may not have an identity its parent lacks, so the legacy identity is
+  -- dropped (taking its sequence and name with it) and replaced by a
+  -- sequence continuing from the same value.
+  v_seq := pg_get_serial_sequence(v_legacy, 'id');
+  SELECT a.attidentity <> '' INTO v_identity
+    FROM pg_attribute a
+   WHERE a.attrelid = v_legacy::REGCLASS AND a.attname = 'id';
+  IF v_identity THEN
+    v_last := pg_sequence_last_value(v_seq::REGCLASS);
+    EXECUTE format('ALTER TABLE %I ALTER COLUMN id DROP IDENTITY', v_legacy);
+    EXECUTE format('CREATE SEQUENCE %I OWNED BY %I.id', p_table || '_id_seq', p_table);
+    PERFORM setval(quote_ident(p_table || '_id_seq'), COALESCE(v_last, 0) + 1, false);
+    EXECUTE format('ALTER TABLE %I ALTER COLUMN id SET DEFAULT nextval(%L)', p_table, p_table || '_id_seq');
+  ELSIF v_seq IS NOT NULL THEN
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.id', v_seq, p_table);
+  END IF;
+
+  EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (MINVALUE) TO (%L)', p_table, v_legacy, v_switch);
+  FOREACH v_def IN ARRAY v_indexes LOOP
+    EXECUTE v_def;
+  END LOOP;
+  -- Matching foreign keys on the legacy partition are attached, not rechecked.
+  FOR v_row IN
+    SELECT conname, pg_get_constraintdef(oid) AS def
+      FROM pg_constraint
+     WHERE conrelid = v_legacy::REGCLASS AND contype = 'f'
+  LOOP
+    EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I %s', p_table, v_row.conname, v_row.def);
+  END LOOP;
+  EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', p_table || '_default', p_table);
+  EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id)', p_table || '_default');
+  -- Row triggers on a partitioned table are cloned onto every partition, so
+  -- inside them TG_TABLE_NAME is the partition's name (``agent_logs_p...``),
+  -- not the parent's.  notify_swarm_feed takes its topic as an argument.
+  FOREACH v_def IN ARRAY v_triggers LOOP
+    EXECUTE regexp_replace(v_def, ' ON \S+ ', format(' ON %I ', p_table));
+  END LOOP;
+
+  -- Carry over privileges and row level security for API access.
+  FOR v_row IN
+    SELECT grantee, privilege_type
+      FROM information_schema.role_table_grants
+     WHERE table_schema = current_schema() AND table_name = v_legacy
+  LOOP
+    EXECUTE format(
+      'GRANT %s ON %I TO %s', v_row.privilege_type, p_table,
+      CASE WHEN v_row.grantee = 'PUBLIC' THEN 'PUBLIC' ELSE quote_ident(v_row.grantee) END
+    );
+  END LOOP;
+  IF (SELECT relrowsecurity FROM pg_class WHERE oid = v_legacy::REGCLASS) THEN
+    EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', p_table);
+    FOR v_row IN SELECT * FROM pg_policies WHERE schemaname = current_schema() AND tablename = v_legacy LOOP
+      EXECUTE format(
+        'CREATE POLICY %I ON %I AS %s FOR %s TO %s%s%s',
+        v_row.policyname, p_table, v_row.permissive, v_row.cmd,
+        (SELECT string_agg(CASE WHEN r = 'public' THEN 'PUBLIC' ELSE quote_ident(r) END, ', ') FROM unnest(v_row.roles) r),
+        COALESCE(' USING (' || v_row.qual || ')', ''),
+        COALESCE(' WITH CHECK (' || v_row.with_check || ')', '')
+      );
+    END LOOP;
+  END IF;
+  COMMIT;
+
+  -- 5. Partitions from the switch point on.
+  PERFORM maintain_time_partitions();
+  COMMIT;
+END;
+$$;
+
+-- agent_logs rows older than 30 days are archived to Parquet by the
+-- log-archiver job; the partitions go a few days later.
+CALL partition_by_time('agent_logs', 'day', 7, INTERVAL '35 days');
+CALL partition_by_time('faucet_logs', 'day', 7, NULL);
+CALL partition_by_time('profit_ledger', 'month', 3, NULL);
@@ -0,0 +1,49 @@
+-- Partial and covering indexes for the queries the backend issues
+--
+-- Each index below is shaped after a specific query in the code, noted in
+-- the comment above it.  Partial indexes (``WHERE status = 'pending'``)
+-- only hold the rows a queue reader is looking for, so they stay small no
+-- matter how much processed history accumulates.  ``INCLUDE`` columns let
+-- the planner answer a query from the index alone (an index-only scan)
+-- when every selected column is small; wide JSON columns such as
+-- ``payload`` and ``prediction`` are deliberately not included.
+--
+-- ``benchmarks/explain_indexes.py`` checks the resulting plans against a
+-- local Postgres.
+
+-- fetch_directive (handshake server, supabase_utils, supabase_async) and
+-- the claim_directives subquery: agent = ? AND status = 'pending'
+-- ORDER BY timestamp.  The older (status, timestamp) index cannot use the
+-- agent filter and scans every agent's pending rows.
+CREATE INDEX IF NOT EXISTS idx_agent_directives_pending
+  ON agent_directives(agent, "timestamp") INCLUDE (id)
+  WHERE status = 'pending';
+
+-- /api/predictions: symbol = ? ORDER BY predicted_at DESC LIMIT 50, and the
+-- unfiltered latest-50 listing.
+CREATE INDEX IF NOT EXISTS idx_predictions_symbol_predicted_at ON predictions(symbol, predicted_at);
+CREATE INDEX IF NOT EXISTS idx_predictions_predicted_at ON predictions(predicted_at);
+
+-- Latest swarm state (/api/agents, resource_allocator, wallet_rotator):
+-- ORDER BY timestamp DESC LIMIT 1.  The workers only read active_agents.
+CREATE INDEX IF NOT EXISTS idx_swarm_state_timestamp ON swarm_state("timestamp") INCLUDE (active_agents);
+
+-- /api/faucets yields: id, yield_usd ORDER BY timestamp DESC LIMIT 30.
+CREATE INDEX IF NOT EXISTS idx_faucet_yields_timestamp ON faucet_yields("timestamp") INCLUDE (id, yield_usd);
+
+-- /api/wallets assets for one page of wallets: wallet_id IN (...).
+CREATE INDEX IF NOT EXISTS idx_portfolio_assets_wallet
+  ON portfolio_assets(wallet_id) INCLUDE (coin, balance, usd_value);
+
+-- echo_feedback and sandbox_mutator poll for status = 'pending'.  These
+-- tables are created outside the migrations, so only index them if present.
+DO $$
+BEGIN
+  IF to_regclass('feedback') IS NOT NULL THEN
+    CREATE INDEX IF NOT EXISTS idx_feedback_pending ON feedback(id) WHERE status = 'pending';
+  END IF;
+  IF to_regclass('mutation_queue') IS NOT NULL THEN
+    CREATE INDEX IF NOT EXISTS idx_mutation_queue_pending ON mutation_queue(id) WHERE status = 'pending';
+  END IF;
+END;
+$$;
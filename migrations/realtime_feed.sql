@@ -0,0 +1,50 @@
+-- Change feed for the handshake server's realtime hub
+--
+-- Each new row in ``agent_logs``, ``swarm_state`` or ``swarm_activity`` is
+-- announced on the ``swarm_feed`` channel as
+-- ``{"topic": <table>, "id": <id>, "row": {...}}``.  One listener per
+-- handshake server replica fans the notifications out to every connected
+-- dashboard over WebSocket or Server-Sent Events.
+--
+-- NOTIFY payloads are limited to 8000 bytes, so rows larger than that are
+-- announced without ``row`` and the hub reads them by id.
+--
+-- The topic is passed as a trigger argument rather than taken from
+-- ``TG_TABLE_NAME``: once partition_logs.sql partitions ``agent_logs`` the
+-- trigger fires on the partitions, whose names are not topics.  Triggers
+-- created without an argument fall back to the partition root's name.
+
+CREATE OR REPLACE FUNCTION notify_swarm_feed()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_topic TEXT := TG_ARGV[0];
+  v_payload TEXT;
+BEGIN
+  IF v_topic IS NULL THEN
+    SELECT relname INTO v_topic FROM pg_class WHERE oid = pg_partition_root(TG_RELID);
+  END IF;
+  v_payload := json_build_object('topic', v_topic, 'id', NEW.id, 'row', row_to_json(NEW))::TEXT;
+  IF octet_length(v_payload) > 7900 THEN
+    v_payload := json_build_object('topic', v_topic, 'id', NEW.id)::TEXT;
+  END IF;
+  PERFORM pg_notify('swarm_feed', v_payload);
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS agent_logs_feed ON agent_logs;
+CREATE TRIGGER agent_logs_feed
+  AFTER INSERT ON agent_logs
+  FOR EACH ROW EXECUTE FUNCTION notify_swarm_feed('agent_logs');
+
+DROP TRIGGER IF EXISTS swarm_state_feed ON swarm_state;
+CREATE TRIGGER swarm_state_feed
+  AFTER INSERT ON swarm_state
+  FOR EACH ROW EXECUTE FUNCTION notify_swarm_feed('swarm_state');
+
+DROP TRIGGER IF EXISTS swarm_activity_feed ON swarm_activity;
+CREATE TRIGGER swarm_activity_feed
+  AFTER INSERT ON swarm_activity
+  FOR EACH ROW EXECUTE FUNCTION notify_swarm_feed('swarm_activity');
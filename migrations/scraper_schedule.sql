@@ -0,0 +1,27 @@
+-- Due-time scheduling for scraper_jobs
+--
+-- The unified scraper used to load and run every job on every CronJob run,
+-- whatever its ``frequency``.  ``next_run_at`` records when a job is due
+-- again; the worker sets it to ``last_run`` plus the frequency after each
+-- run (see ``backend/scraper_schedule.py``) and only selects jobs whose
+-- time has passed.  New jobs default to NOW(), so they run on the next pass.
+
+ALTER TABLE scraper_jobs ADD COLUMN IF NOT EXISTS next_run_at TIMESTAMP WITH TIME ZONE;
+
+-- Existing jobs keep their cadence; jobs that never ran are due now.
+UPDATE scraper_jobs
+   SET next_run_at = COALESCE(
+         last_run + CASE lower(frequency)
+                      WHEN 'hourly' THEN INTERVAL '1 hour'
+                      WHEN 'daily' THEN INTERVAL '1 day'
+                      WHEN 'weekly' THEN INTERVAL '1 week'
+                      WHEN 'monthly' THEN INTERVAL '30 days'
+                    END,
+         NOW())
+ WHERE next_run_at IS NULL;
+
+ALTER TABLE scraper_jobs ALTER COLUMN next_run_at SET DEFAULT NOW();
+ALTER TABLE scraper_jobs ALTER COLUMN next_run_at SET NOT NULL;
+
+-- due_jobs: next_run_at <= NOW() ORDER BY next_run_at LIMIT n.
+CREATE INDEX IF NOT EXISTS idx_scraper_jobs_next_run_at ON scraper_jobs(next_run_at);